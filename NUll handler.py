@@ -2,454 +2,1497 @@
 # AdventureWorks Null Handler
 # =============================================================================
 
+import numpy as np
 import pandas as pd
+import argparse
+import cProfile
+import hashlib
+import html
+import inspect
+import io
+import json
 import os
+import re
+import shutil
+import sqlite3
+import sys
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext, redirect_stdout
 from datetime import datetime
+from functools import partial
+from xml.etree import ElementTree
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module
+    resource = None
 
 # =============================================================================
-# Individual Table Handler Functions
+# Instrumentation
 # =============================================================================
 
-def clean_workorder(file_path, output_path=None):
-    """Clean nulls in Production WorkOrder table"""
-    df = pd.read_excel(file_path, sheet_name="Production WorkOrder")
-    print(f"Production WorkOrder: {len(df)} rows")
-    
-    # ScrapReasonID has 71,862 nulls out of 72,591 rows (98.9%)
-    # Since almost all rows have null ScrapReasonID, this appears to be
-    # an optional field that's only populated when a product is scrapped
-    
-    # Option 1: Keep nulls (recommended for analysis)
-    df_clean = df.copy()
-    print("Keeping ScrapReasonID nulls as they represent non-scrapped items")
-    
-    # Option 2: Fill with 0 (if you need a numeric value for all rows)
-    # df_clean = df.copy()
-    # df_clean["ScrapReasonID"] = df_clean["ScrapReasonID"].fillna(0)
-    # print("Filled ScrapReasonID nulls with 0")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+def peak_rss_bytes():
+    """Peak resident set size of this process so far, or None when unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
 
-def clean_productinventory(file_path, output_path=None):
-    """Clean nulls in Production ProductInventory table"""
-    df = pd.read_excel(file_path, sheet_name="Production ProductInventory")
-    print(f"Production ProductInventory: {len(df)} rows")
-    
-    # Shelf has 290 nulls out of 1,069 rows (27.1%)
-    # This is a significant number but not the majority
-    
-    # Analyze the pattern of nulls
-    null_pattern = df[df["Shelf"].isnull()]
-    print(f"Shelf nulls: {len(null_pattern)} out of {len(df)} rows")
-    
-    # Check if nulls are associated with particular locations
-    if "LocationID" in df.columns:
-        location_counts = null_pattern["LocationID"].value_counts()
-        print("Nulls by LocationID:")
-        print(location_counts)
-    
-    # Option 1: Fill with a placeholder indicating "No Shelf Assigned"
-    df_clean = df.copy()
-    df_clean["Shelf"] = df_clean["Shelf"].fillna("NONE")
-    print("Filled Shelf nulls with 'NONE'")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+def format_bytes(size):
+    """Human readable byte count, like 1.5 MB"""
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
 
-def clean_product(file_path, output_path=None):
-    """Clean nulls in Production Product table"""
-    df = pd.read_excel(file_path, sheet_name="Production Product")
-    print(f"Production Product: {len(df)} rows")
-    
-    # Multiple columns have nulls, analyze each
-    null_counts = df.isnull().sum()
-    print("Null counts per column:")
-    for col in null_counts[null_counts > 0].index:
-        print(f"  {col}: {null_counts[col]} nulls ({null_counts[col]/len(df)*100:.1f}%)")
-    
-    df_clean = df.copy()
-    
-    # Handle optional descriptive fields (Color, Size, etc.)
-    # These are likely not applicable for all products
-    for col in ["Color", "Size", "SizeUnitMeasureCode", "WeightUnitMeasureCode", 
-                "ProductLine", "Class", "Style"]:
-        if col in df.columns and null_counts.get(col, 0) > 0:
-            # Keep nulls for these fields as they are legitimately N/A for some products
-            print(f"Keeping nulls in {col} as they represent 'Not Applicable'")
-    
-    # Handle Weight - fill with 0 for products with no weight
-    if "Weight" in df.columns and null_counts.get("Weight", 0) > 0:
-        df_clean["Weight"] = df_clean["Weight"].fillna(0)
-        print("Filled Weight nulls with 0")
-    
-    # Handle category IDs - use -1 to indicate uncategorized
-    for col in ["ProductSubcategoryID", "ProductModelID"]:
-        if col in df.columns and null_counts.get(col, 0) > 0:
-            df_clean[col] = df_clean[col].fillna(-1)
-            print(f"Filled {col} nulls with -1 (uncategorized)")
-    
-    # SellEndDate nulls indicate products still being sold
-    if "SellEndDate" in df.columns and null_counts.get("SellEndDate", 0) > 0:
-        print("Keeping SellEndDate nulls as they indicate 'Still selling'")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+@contextmanager
+def measure_stage(stats, stage):
+    """Record wall time, CPU time, peak memory and rows/sec of one stage
 
-def clean_salesorderheader(file_path, output_path=None):
-    """Clean nulls in Sales SalesOrderHeader table"""
-    df = pd.read_excel(file_path, sheet_name="Sales SalesOrderHeader")
-    print(f"Sales SalesOrderHeader: {len(df)} rows")
-    
-    # Multiple columns have nulls
-    null_counts = df.isnull().sum()
-    cols_with_nulls = null_counts[null_counts > 0].index.tolist()
-    
-    print("Null counts per column:")
-    for col in cols_with_nulls:
-        percent = null_counts[col]/len(df)*100
-        print(f"  {col}: {null_counts[col]} nulls ({percent:.1f}%)")
-    
-    df_clean = df.copy()
-    
-    # PurchaseOrderNumber - Null for 27,659 out of 31,465 rows (87.9%)
-    # This field is likely only used for certain types of orders
-    if "PurchaseOrderNumber" in cols_with_nulls:
-        # Leave as null since it's a legitimate business case
-        print("Keeping PurchaseOrderNumber nulls as they represent orders without POs")
-    
-    # SalesPersonID - Null for 27,659 rows (87.9%)
-    # These are likely online orders without a specific salesperson
-    if "SalesPersonID" in cols_with_nulls:
-        df_clean["SalesPersonID"] = df_clean["SalesPersonID"].fillna(-1)
-        print("Filled SalesPersonID nulls with -1 (no salesperson)")
-    
-    # CreditCardID and CreditCardApprovalCode - Null for 1,131 rows (3.6%)
-    # These likely represent orders not paid by credit card
-    if "CreditCardID" in cols_with_nulls:
-        df_clean["CreditCardID"] = df_clean["CreditCardID"].fillna(-1)
-        print("Filled CreditCardID nulls with -1 (no credit card)")
-    
-    if "CreditCardApprovalCode" in cols_with_nulls:
-        # Keep as null or use a specific code
-        print("Keeping CreditCardApprovalCode nulls as they represent non-credit card transactions")
-    
-    # CurrencyRateID - Null for 17,489 rows (55.6%)
-    # Likely represents transactions in the default currency
-    if "CurrencyRateID" in cols_with_nulls:
-        df_clean["CurrencyRateID"] = df_clean["CurrencyRateID"].fillna(-1)
-        print("Filled CurrencyRateID nulls with -1 (default currency)")
+    Yields a record the caller can set "rows" on. Repeated stages, like
+    the chunks of a streamed table, are summed into one record under
+    stats["stages"], and stats["timings"] keeps the wall seconds. The
+    tracemalloc peak is only measured while tracemalloc is tracing.
+    """
+    record = {}
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
     
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+    try:
+        yield record
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        
+        total = stats.setdefault("stages", {}).setdefault(
+            stage, {"wall_seconds": 0.0, "cpu_seconds": 0.0, "rows": 0}
+        )
+        total["wall_seconds"] += wall
+        total["cpu_seconds"] += cpu
+        total["rows"] += record.get("rows", 0)
+        if tracing:
+            total["peak_traced_bytes"] = max(total.get("peak_traced_bytes", 0),
+                                             tracemalloc.get_traced_memory()[1])
+        total["peak_rss_bytes"] = peak_rss_bytes()
+        total["rows_per_second"] = (total["rows"] / total["wall_seconds"]
+                                    if total["rows"] and total["wall_seconds"] else None)
+        
+        stats.setdefault("timings", {})[stage] = total["wall_seconds"]
 
-def clean_salesorderdetail(file_path, output_path=None):
-    """Clean nulls in Sales SalesOrderDetail table"""
-    df = pd.read_excel(file_path, sheet_name="Sales SalesOrderDetail")
-    print(f"Sales SalesOrderDetail: {len(df)} rows")
-    
-    # CarrierTrackingNumber - 60,398 nulls out of 121,317 rows (49.8%)
-    # This is likely legitimately missing for items not yet shipped
-    
-    df_clean = df.copy()
-    
-    # Option 1: Fill with a placeholder indicating "Not Yet Shipped"
-    df_clean["CarrierTrackingNumber"] = df_clean["CarrierTrackingNumber"].fillna("PENDING")
-    print("Filled CarrierTrackingNumber nulls with 'PENDING'")
-    
-    # Option 2: Keep nulls (if you want to distinguish between shipped and unshipped)
-    # print("Keeping CarrierTrackingNumber nulls to distinguish shipped vs unshipped items")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+def profile_records(summary):
+    """Flatten the per-table and run-level stages of a run summary"""
+    records = []
+    for result in summary["tables"]:
+        for stage, values in result.get("stages", {}).items():
+            records.append(dict(table=result["table"], stage=stage, **values))
+    for stage, values in summary.get("stages", {}).items():
+        records.append(dict(table=None, stage=stage, **values))
+    return records
 
-def clean_address(file_path, output_path=None):
-    """Clean nulls in Person Address table"""
-    df = pd.read_excel(file_path, sheet_name="Person Address")
-    print(f"Person Address: {len(df)} rows")
-    
-    # AddressLine2 - 19,252 nulls out of 19,614 rows (98.2%)
-    # This field is clearly optional and rarely used
-    
-    df_clean = df.copy()
-    
-    # Since almost all rows have null AddressLine2, we have two main options:
-    
-    # Option 1: Keep the nulls (recommended since it's standard for addresses)
-    print("Keeping AddressLine2 nulls as this is a standard optional address field")
-    
-    # Option 2: Drop the column entirely since it's rarely used
-    # df_clean = df_clean.drop(columns=["AddressLine2"])
-    # print("Dropped AddressLine2 column as it's rarely used (98.2% null)")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+def write_profile(summary, profile_path):
+    """Write the stage profile of a run as JSON or, for a .csv path, CSV"""
+    records = profile_records(summary)
+    if profile_path.lower().endswith(".csv"):
+        pd.DataFrame(records).to_csv(profile_path, index=False)
+    else:
+        with open(profile_path, "w") as handle:
+            json.dump(records, handle, indent=2)
+    print(f"Stage profile saved to {profile_path}")
 
-def clean_person(file_path, output_path=None):
-    """Clean nulls in Person Person table"""
-    df = pd.read_excel(file_path, sheet_name="Person Person")
-    print(f"Person Person: {len(df)} rows")
-    
-    # Title - 18,963 nulls out of 19,972 rows (94.9%)
-    # MiddleName - 8,499 nulls out of 19,972 rows (42.6%)
-    # These are standard optional name fields
-    
-    df_clean = df.copy()
-    
-    # Keep nulls for these name fields as they're legitimately missing
-    print("Keeping Title and MiddleName nulls as they're standard optional name fields")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+# =============================================================================
+# Database Sources
+# =============================================================================
 
-def clean_billofmaterials(file_path, output_path=None):
-    """Clean nulls in Production BillOfMaterials table"""
-    df = pd.read_excel(file_path, sheet_name="Production BillOfMaterials")
-    print(f"Production BillOfMaterials: {len(df)} rows")
-    
-    # ProductAssemblyID - 103 nulls out of 2,679 rows (3.8%)
-    # EndDate - 2,480 nulls out of 2,679 rows (92.6%)
-    
-    df_clean = df.copy()
-    
-    # ProductAssemblyID is null for top-level components (not part of an assembly)
-    # Fill with -1 to indicate this special case
-    df_clean["ProductAssemblyID"] = df_clean["ProductAssemblyID"].fillna(-1)
-    print("Filled ProductAssemblyID nulls with -1 (top-level components)")
-    
-    # EndDate null means the BOM is still active
-    print("Keeping EndDate nulls as they indicate 'Still active'")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+# A source like "sqlite:///AdventureWorks.db" reads the tables straight
+# from a database instead of the Excel export. Each scheme maps to a
+# function opening a DB-API connection to the rest of the URL; another
+# driver is one more entry, e.g. "mssql": lambda target: pyodbc.connect(target)
+def connect_sqlite(target):
+    """Open a SQLite database read-only so a wrong path is not created empty"""
+    return sqlite3.connect(f"file:{target}?mode=ro", uri=True, check_same_thread=False)
+
+def connect_duckdb(target):
+    """Open a DuckDB database read-only"""
+    import duckdb
+    return duckdb.connect(target, read_only=True)
+
+DB_CONNECTORS = {
+    "sqlite": connect_sqlite,
+    "duckdb": connect_duckdb
+}
 
-def clean_customer(file_path, output_path=None):
-    """Clean nulls in Sales Customer table"""
-    df = pd.read_excel(file_path, sheet_name="Sales Customer")
-    print(f"Sales Customer: {len(df)} rows")
+# Schemes whose target is a local database file
+DB_FILE_SCHEMES = ("sqlite", "duckdb")
+
+# Idle connections kept per source and process
+DB_POOL_SIZE = 4
+DB_POOLS = {}
+
+def parse_db_source(source):
+    """Split "scheme://target" into (scheme, target), or None for file sources"""
+    if not isinstance(source, str) or "://" not in source:
+        return None
+    scheme, target = source.split("://", 1)
+    scheme = scheme.lower()
+    if scheme not in DB_CONNECTORS:
+        raise ValueError(f"Unsupported database scheme: {scheme} (supported: {', '.join(DB_CONNECTORS)})")
+    # Like SQLAlchemy URLs, sqlite:///aw.db is relative and sqlite:////data/aw.db absolute
+    if scheme in DB_FILE_SCHEMES and target.startswith("/"):
+        target = target[1:]
+    return scheme, target
+
+def is_db_source(source):
+    """Whether a source is a database URL rather than a workbook or directory"""
+    return parse_db_source(source) is not None
+
+def source_exists(source):
+    """Whether a workbook, table directory or local database file exists"""
+    db = parse_db_source(source)
+    if db is None:
+        return os.path.exists(source)
+    scheme, target = db
+    return scheme not in DB_FILE_SCHEMES or os.path.exists(target)
+
+def source_dir(source):
+    """Directory next to which the default output directory is created"""
+    db = parse_db_source(source)
+    if db is None:
+        return os.path.dirname(source)
+    scheme, target = db
+    return os.path.dirname(target) if scheme in DB_FILE_SCHEMES else ""
+
+def source_label(source):
+    """How a source is recorded in manifests and run summaries"""
+    return source if is_db_source(source) else os.path.abspath(source)
+
+def db_table_name(table_name, scheme):
+    """Quote a sheet name like "Sales SalesOrderDetail" as the table Sales.SalesOrderDetail"""
+    schema, _, table = table_name.partition(" ")
+    if scheme == "sqlite":
+        # SQLite has no schemas, so local copies keep the dotted name as one identifier
+        return f'"{schema}.{table}"'
+    return f'"{schema}"."{table}"'
+
+@contextmanager
+def db_connection(source):
+    """Borrow a connection from the source's pool, opening one when none is idle"""
+    scheme, target = parse_db_source(source)
+    # Keyed by process so forked workers never share a parent's connection
+    pool = DB_POOLS.setdefault((os.getpid(), source), [])
+    try:
+        connection = pool.pop()
+    except IndexError:
+        connection = DB_CONNECTORS[scheme](target)
     
-    # PersonID - 701 nulls out of 19,820 rows (3.5%)
-    # StoreID - 18,484 nulls out of 19,820 rows (93.3%)
+    try:
+        yield connection
+    except BaseException:
+        connection.close()
+        raise
+    if len(pool) < DB_POOL_SIZE:
+        pool.append(connection)
+    else:
+        connection.close()
+
+def close_db_pools():
+    """Close every idle pooled connection"""
+    for pool in DB_POOLS.values():
+        while pool:
+            pool.pop().close()
+    DB_POOLS.clear()
+
+def db_query(source, table_name):
+    """SELECT statement and date columns of a table, read from an empty result"""
+    scheme, _ = parse_db_source(source)
+    table = db_table_name(table_name, scheme)
+    with db_connection(source) as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {table} WHERE 1 = 0")
+            columns = [column[0] for column in cursor.description]
+        except Exception as e:
+            # Drivers raise their own error types; pandas reports them as DatabaseError too
+            raise pd.errors.DatabaseError(f"Could not read {table}: {str(e)}") from e
+        finally:
+            cursor.close()
+    
+    # SQLite stores dates as text, so they are parsed like the Excel reader does
+    date_columns = [column for column in columns if column.endswith("Date")]
+    return f"SELECT * FROM {table}", date_columns
+
+def read_db_table(source, table_name, chunk_rows=None):
+    """Read a table with read_sql, or with chunk_rows set yield it in chunks"""
+    query, date_columns = db_query(source, table_name)
+    if not chunk_rows:
+        with db_connection(source) as connection:
+            return pd.read_sql(query, connection, parse_dates=date_columns)
+    return iter_db_chunks(source, query, date_columns, chunk_rows)
+
+def iter_db_chunks(source, query, date_columns, chunk_rows):
+    """Yield query results in chunks, holding one pooled connection throughout"""
+    with db_connection(source) as connection:
+        yield from pd.read_sql(query, connection, parse_dates=date_columns, chunksize=chunk_rows)
+
+# =============================================================================
+# Workbook Loading
+# =============================================================================
+
+def read_table_file(table_file):
+    """Read one table stored as a .parquet or .csv file"""
+    if table_file.lower().endswith(".parquet"):
+        return pd.read_parquet(table_file)
+    return pd.read_csv(table_file)
+
+def load_sheets(file_path, sheet_names):
+    """Parse all requested sheets from the workbook in a single pass"""
+    if is_db_source(file_path):
+        frames = {}
+        print(f"Loading {len(sheet_names)} tables from {file_path}")
+        for name in sheet_names:
+            try:
+                frames[name] = read_db_table(file_path, name)
+            except pd.errors.DatabaseError:
+                print(f"Table not found in database: {name}")
+        return frames
+    
+    if os.path.isdir(file_path):
+        # A directory source holds one <Table_Name>.parquet/.csv file per table
+        frames = {}
+        for name in sheet_names:
+            try:
+                frames[name] = read_table_file(find_table_source(file_path, name))
+            except FileNotFoundError:
+                print(f"Table file not found in {file_path}: {name}")
+        return frames
+    
+    with pd.ExcelFile(file_path) as workbook:
+        available = [name for name in sheet_names if name in workbook.sheet_names]
+        for name in sheet_names:
+            if name not in workbook.sheet_names:
+                print(f"Sheet not found in workbook: {name}")
+        
+        if not available:
+            return {}
+        
+        # A list of sheet names makes pandas open the file once and
+        # return a {sheet_name: DataFrame} dict
+        print(f"Loading {len(available)} sheets from {file_path}")
+        return pd.read_excel(workbook, sheet_name=available)
+
+def read_sheet(file_path, sheet_name, df=None):
+    """Return the preloaded DataFrame, or read the sheet when none was given"""
+    if df is not None:
+        return df
+    if is_db_source(file_path):
+        return read_db_table(file_path, sheet_name)
+    if os.path.isdir(file_path):
+        return read_table_file(find_table_source(file_path, sheet_name))
+    return pd.read_excel(file_path, sheet_name=sheet_name)
+
+# =============================================================================
+# Output Writing
+# =============================================================================
+
+# File extension for each supported output format. Every table is its own
+# file with its own schema; "parquet" is the columnar format downstream
+# scripts read, one table at a time with cleaned_tables.load_tables.
+OUTPUT_FORMATS = {
+    "xlsx": ".xlsx",
+    "parquet": ".parquet",
+    "feather": ".feather",
+    "csv": ".csv"
+}
+
+def table_output_path(output_dir, table_name, output_format="xlsx"):
+    """Build the output file path for a cleaned table"""
+    file_stem = table_name.replace(' ', '_')
+    return os.path.join(output_dir, f"{file_stem}_clean{OUTPUT_FORMATS[output_format]}")
+
+def arrow_safe(df):
+    """Stringify columns that mix types, which Arrow cannot store"""
+    def is_mixed(values):
+        return pd.api.types.infer_dtype(values, skipna=True).startswith("mixed")
+    
+    mixed = [col for col in df.columns if df[col].dtype == object and is_mixed(df[col])]
+    mixed_categories = [
+        col for col in df.columns
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and is_mixed(df[col].cat.categories)
+    ]
+    if not mixed and not mixed_categories:
+        return df
+    
+    # Excel exports store values like Size ("M", 58) as a mix of str and int
+    safe = df.copy(deep=False)
+    for col in mixed:
+        safe[col] = safe[col].map(lambda value: value if pd.isna(value) else str(value))
+    for col in mixed_categories:
+        safe[col] = safe[col].cat.rename_categories(safe[col].cat.categories.map(str))
+    return safe
+
+def write_table(df, output_path, output_format=None):
+    """Write a cleaned table as xlsx, parquet, feather or csv"""
+    # Infer the format from the file extension when none is given
+    if output_format is None:
+        output_format = os.path.splitext(output_path)[1].lstrip('.').lower() or "xlsx"
+    
+    if output_format == "xlsx":
+        df.to_excel(output_path, index=False)
+    elif output_format == "parquet":
+        arrow_safe(df).to_parquet(output_path, index=False)
+    elif output_format == "feather":
+        arrow_safe(df).reset_index(drop=True).to_feather(output_path)
+    elif output_format == "csv":
+        df.to_csv(output_path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
     
-    # This pattern indicates two types of customers:
+    print(f"Saved to {output_path}")
+
+# =============================================================================
+# Null Handling Rules
+# =============================================================================
+
+# Categories of the CustomerType column derived for Sales Customer
+CUSTOMER_TYPES = ["Individual", "Store", "Unknown"]
+
+def derive_customer_type(df, report=True):
+    """Add a categorical CustomerType column based on which of PersonID/StoreID is set"""
+    # PersonID and StoreID nulls indicate two types of customers:
     # 1. Store customers (have StoreID, no PersonID)
     # 2. Individual customers (have PersonID, no StoreID)
-    
-    df_clean = df.copy()
-    
-    # Add a CustomerType column for clarity
-    df_clean["CustomerType"] = "Unknown"
-    df_clean.loc[df_clean["StoreID"].notnull(), "CustomerType"] = "Store"
-    df_clean.loc[df_clean["PersonID"].notnull(), "CustomerType"] = "Individual"
-    
-    print("Added CustomerType column instead of filling nulls")
-    print("Keep both PersonID and StoreID nulls as they indicate customer type")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+    # PersonID wins when both are set, as np.select takes the first match
+    df["CustomerType"] = pd.Categorical(
+        np.select(
+            [df["PersonID"].notnull(), df["StoreID"].notnull()],
+            ["Individual", "Store"],
+            default="Unknown"
+        ),
+        categories=CUSTOMER_TYPES
+    )
+    if report:
+        print("Added CustomerType column instead of filling nulls")
+    return df
 
-def clean_salesperson(file_path, output_path=None):
-    """Clean nulls in Sales SalesPerson table"""
-    df = pd.read_excel(file_path, sheet_name="Sales SalesPerson")
-    print(f"Sales SalesPerson: {len(df)} rows")
-    
-    # TerritoryID - 3 nulls out of 17 rows (17.6%)
-    # SalesQuota - 3 nulls out of 17 rows (17.6%)
-    
-    df_clean = df.copy()
-    
-    # TerritoryID null indicates a salesperson not assigned to a territory
-    df_clean["TerritoryID"] = df_clean["TerritoryID"].fillna(-1)
-    print("Filled TerritoryID nulls with -1 (unassigned)")
-    
-    # SalesQuota null indicates no quota assigned
-    df_clean["SalesQuota"] = df_clean["SalesQuota"].fillna(0)
-    print("Filled SalesQuota nulls with 0 (no quota)")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+# Each table maps to a rule set:
+#   "fill"      column -> (value, meaning); applied in one DataFrame.fillna(dict) call
+#   "keep"      column -> meaning; nulls that are left as they are
+#   "profile"   print the null count of every column before cleaning
+#   "breakdown" (null column, by column); show where the nulls of a column fall
+#   "derive"    function(df, report) that adds columns after the fills
+#   "category"  low-cardinality string columns stored as pandas Categoricals
+# Adding a table only needs a new entry here.
+NULL_RULES = {
+    "Production WorkOrder": {
+        # ScrapReasonID has 71,862 nulls out of 72,591 rows (98.9%), it is
+        # only populated when a product is scrapped
+        "keep": {"ScrapReasonID": "they represent non-scrapped items"}
+    },
+    "Production ProductInventory": {
+        # Shelf has 290 nulls out of 1,069 rows (27.1%)
+        "breakdown": ("Shelf", "LocationID"),
+        "fill": {"Shelf": ("NONE", "no shelf assigned")},
+        "category": ["Shelf"]
+    },
+    "Production Product": {
+        "profile": True,
+        "fill": {
+            "Weight": (0, "no weight"),
+            "ProductSubcategoryID": (-1, "uncategorized"),
+            "ProductModelID": (-1, "uncategorized")
+        },
+        "keep": {
+            # Descriptive fields are legitimately N/A for some products
+            "Color": "they represent 'Not Applicable'",
+            "Size": "they represent 'Not Applicable'",
+            "SizeUnitMeasureCode": "they represent 'Not Applicable'",
+            "WeightUnitMeasureCode": "they represent 'Not Applicable'",
+            "ProductLine": "they represent 'Not Applicable'",
+            "Class": "they represent 'Not Applicable'",
+            "Style": "they represent 'Not Applicable'",
+            "SellEndDate": "they indicate 'Still selling'"
+        },
+        "category": ["Color", "Size", "ProductLine", "Class", "Style"]
+    },
+    "Sales SalesOrderHeader": {
+        # PurchaseOrderNumber and SalesPersonID - 27,659 nulls out of 31,465 rows (87.9%)
+        # CreditCardID and CreditCardApprovalCode - 1,131 nulls (3.6%)
+        # CurrencyRateID - 17,489 nulls (55.6%)
+        "profile": True,
+        "fill": {
+            "SalesPersonID": (-1, "no salesperson"),
+            "CreditCardID": (-1, "no credit card"),
+            "CurrencyRateID": (-1, "default currency")
+        },
+        "keep": {
+            "PurchaseOrderNumber": "they represent orders without POs",
+            "CreditCardApprovalCode": "they represent non-credit card transactions"
+        }
+    },
+    "Sales SalesOrderDetail": {
+        # CarrierTrackingNumber - 60,398 nulls out of 121,317 rows (49.8%)
+        "fill": {"CarrierTrackingNumber": ("PENDING", "not yet shipped")},
+        "category": ["CarrierTrackingNumber"]
+    },
+    "Person Address": {
+        # AddressLine2 - 19,252 nulls out of 19,614 rows (98.2%)
+        "keep": {"AddressLine2": "this is a standard optional address field"}
+    },
+    "Person Person": {
+        # Title - 18,963 nulls and MiddleName - 8,499 nulls out of 19,972 rows
+        "keep": {
+            "Title": "it's a standard optional name field",
+            "MiddleName": "it's a standard optional name field"
+        }
+    },
+    "Production BillOfMaterials": {
+        # ProductAssemblyID - 103 nulls and EndDate - 2,480 nulls out of 2,679 rows
+        "fill": {"ProductAssemblyID": (-1, "top-level components")},
+        "keep": {"EndDate": "they indicate 'Still active'"}
+    },
+    "Sales Customer": {
+        # PersonID - 701 nulls and StoreID - 18,484 nulls out of 19,820 rows
+        "keep": {
+            "PersonID": "they indicate customer type",
+            "StoreID": "they indicate customer type"
+        },
+        "derive": derive_customer_type
+    },
+    "Sales SalesPerson": {
+        # TerritoryID and SalesQuota - 3 nulls out of 17 rows (17.6%)
+        "fill": {
+            "TerritoryID": (-1, "unassigned"),
+            "SalesQuota": (0, "no quota")
+        }
+    },
+    "Purchasing Vendor": {
+        # PurchasingWebServiceURL - 98 nulls out of 104 rows (94.2%)
+        "keep": {"PurchasingWebServiceURL": "this is an optional field"}
+    },
+    "HumanResources Employee": {
+        # OrganizationNode and OrganizationLevel - 1 null out of 290 rows,
+        # the top executive with no superior
+        "breakdown": ("OrganizationNode", "JobTitle"),
+        "keep": {
+            "OrganizationNode": "they indicate top of hierarchy",
+            "OrganizationLevel": "they indicate top of hierarchy"
+        }
+    },
+    "Sales vStoreWithAddresses": {
+        # AddressLine2 - 679 nulls out of 712 rows (95.4%)
+        "keep": {"AddressLine2": "this is a standard optional address field"}
+    },
+    "Sales vSalesPerson": {
+        "profile": True,
+        "fill": {"SalesQuota": (0, "no quota")},
+        "keep": {
+            "Title": "these are optional name fields",
+            "MiddleName": "these are optional name fields",
+            "Suffix": "these are optional name fields",
+            "AddressLine2": "this is an optional address field",
+            "TerritoryName": "they indicate salespeople without territory",
+            "TerritoryGroup": "they indicate salespeople without territory"
+        }
+    },
+    "Sales vIndividualCustomer": {
+        "profile": True,
+        "keep": {
+            "Title": "these are optional name fields",
+            "MiddleName": "these are optional name fields",
+            "Suffix": "these are optional name fields",
+            "AddressLine2": "this is an optional address field"
+        }
+    }
+}
 
-def clean_vendor(file_path, output_path=None):
-    """Clean nulls in Purchasing Vendor table"""
-    df = pd.read_excel(file_path, sheet_name="Purchasing Vendor")
-    print(f"Purchasing Vendor: {len(df)} rows")
-    
-    # PurchasingWebServiceURL - 98 nulls out of 104 rows (94.2%)
-    # Most vendors don't have a web service URL
-    
-    df_clean = df.copy()
-    
-    # Option 1: Keep nulls (recommended since it's clearly optional)
-    print("Keeping PurchasingWebServiceURL nulls as this is an optional field")
-    
-    # Option 2: Drop the column since it's rarely used
-    # df_clean = df_clean.drop(columns=["PurchasingWebServiceURL"])
-    # print("Dropped PurchasingWebServiceURL column as it's rarely used (94.2% null)")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+def is_text_column(series):
+    """Whether a column holds strings (object or string dtype, not yet categorical)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
 
-def clean_employee(file_path, output_path=None):
-    """Clean nulls in HumanResources Employee table"""
-    df = pd.read_excel(file_path, sheet_name="HumanResources Employee")
-    print(f"HumanResources Employee: {len(df)} rows")
-    
-    # OrganizationNode - 1 null out of 290 rows (0.3%)
-    # OrganizationLevel - 1 null out of 290 rows (0.3%)
-    
-    # This likely represents the CEO or top executive with no superior
-    df_clean = df.copy()
-    
-    # Find the record with null OrganizationNode
-    null_record = df[df["OrganizationNode"].isnull()]
-    if not null_record.empty:
-        job_title = null_record["JobTitle"].values[0] if "JobTitle" in df.columns else "Unknown"
-        print(f"Found null OrganizationNode for: {job_title}")
-        print("Keeping null as it likely represents the top of organization")
-    
-    # Keep nulls as they have hierarchical meaning
-    print("Keeping OrganizationNode and OrganizationLevel nulls as they indicate top of hierarchy")
-    
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
-    
-    return df_clean
+def apply_null_rules(df, table_name, report=True, categorize=True):
+    """Apply the null handling rules of a table in one vectorized pass
 
-def clean_vstorewithaddresses(file_path, output_path=None):
-    """Clean nulls in Sales vStoreWithAddresses view"""
-    df = pd.read_excel(file_path, sheet_name="Sales vStoreWithAddresses")
-    print(f"Sales vStoreWithAddresses: {len(df)} rows")
-    
-    # AddressLine2 - 679 nulls out of 712 rows (95.4%)
-    # This is a standard optional address field
+    The frame is cleaned in place and returned. Tables with nothing to
+    fill pass through untouched, and the full null profile is only
+    computed when report is on. With categorize on, the "category"
+    columns are converted after filling.
+    """
+    rules = NULL_RULES[table_name]
+    null_counts = df.isnull().sum() if report else None
+    
+    if report and rules.get("profile"):
+        print("Null counts per column:")
+        for col in null_counts[null_counts > 0].index:
+            print(f"  {col}: {null_counts[col]} nulls ({null_counts[col]/len(df)*100:.1f}%)")
+    
+    if report and "breakdown" in rules:
+        null_col, by_col = rules["breakdown"]
+        if null_col in df.columns and by_col in df.columns:
+            print(f"{null_col} nulls by {by_col}:")
+            print(df.loc[df[null_col].isnull(), by_col].value_counts())
+    
+    # Only columns that actually hold nulls are filled, so no full-frame
+    # copy is made and clean columns are never rewritten
+    fill_rules = rules.get("fill", {})
+    fills = {
+        col: value for col, (value, _) in fill_rules.items()
+        if col in df.columns and df[col].hasnans
+    }
+    if fills:
+        df.fillna(fills, inplace=True)
     
-    df_clean = df.copy()
+    if report:
+        for col in fills:
+            value, meaning = fill_rules[col]
+            print(f"Filled {col} nulls with {value!r} ({meaning})")
+        
+        for col, meaning in rules.get("keep", {}).items():
+            if null_counts.get(col, 0) > 0:
+                print(f"Keeping {col} nulls as {meaning}")
     
-    # Keep nulls as this is a standard optional field
-    print("Keeping AddressLine2 nulls as this is a standard optional address field")
+    if "derive" in rules:
+        df = rules["derive"](df, report)
     
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
+    if categorize:
+        for col in rules.get("category", []):
+            if col in df.columns and is_text_column(df[col]):
+                df[col] = df[col].astype("category")
     
-    return df_clean
+    return df
 
-def clean_vsalesperson(file_path, output_path=None):
-    """Clean nulls in Sales vSalesPerson view"""
-    df = pd.read_excel(file_path, sheet_name="Sales vSalesPerson")
-    print(f"Sales vSalesPerson: {len(df)} rows")
-    
-    # Multiple columns have nulls
-    null_counts = df.isnull().sum()
-    cols_with_nulls = null_counts[null_counts > 0].index.tolist()
-    
-    print("Null counts per column:")
-    for col in cols_with_nulls:
-        percent = null_counts[col]/len(df)*100
-        print(f"  {col}: {null_counts[col]} nulls ({percent:.1f}%)")
-    
-    df_clean = df.copy()
-    
-    # Optional name fields (Title, MiddleName, Suffix)
-    for col in ["Title", "MiddleName", "Suffix"]:
-        if col in cols_with_nulls:
-            print(f"Keeping {col} nulls as these are optional name fields")
-    
-    # Optional address fields
-    if "AddressLine2" in cols_with_nulls:
-        print("Keeping AddressLine2 nulls as this is an optional address field")
-    
-    # Territory fields (TerritoryName, TerritoryGroup)
-    for col in ["TerritoryName", "TerritoryGroup"]:
-        if col in cols_with_nulls:
-            # Better to keep as null to indicate no territory assignment
-            print(f"Keeping {col} nulls as they indicate salespeople without territory")
-    
-    # SalesQuota
-    if "SalesQuota" in cols_with_nulls:
-        df_clean["SalesQuota"] = df_clean["SalesQuota"].fillna(0)
-        print("Filled SalesQuota nulls with 0")
+def clean_table(table_name, file_path, output_path=None, df=None, output_format=None,
+                report=True, stats=None, compact=None):
+    """Clean nulls in any table that has an entry in NULL_RULES
+
+    When a stats dict is given it receives rows_in, rows_out and a
+    measure_stage record for each stage (read, clean, write). compact
+    names a COMPACT_MODES mode that adds a compact stage and records
+    memory_bytes before and after it.
+    """
+    stats = {} if stats is None else stats
+    
+    with measure_stage(stats, "read") as stage:
+        df = read_sheet(file_path, table_name, df)
+        stage["rows"] = len(df)
+    stats["rows_in"] = len(df)
+    print(f"{table_name}: {len(df)} rows")
+    
+    with measure_stage(stats, "clean") as stage:
+        df_clean = apply_null_rules(df, table_name, report)
+        stage["rows"] = len(df_clean)
+    stats["rows_out"] = len(df_clean)
+    
+    if compact:
+        with measure_stage(stats, "compact") as stage:
+            df_clean, memory_before, memory_after = compact_dtypes(df_clean, table_name, compact)
+            stage["rows"] = len(df_clean)
+        stats["memory_bytes"] = {"before": memory_before, "after": memory_after}
     
     if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
+        with measure_stage(stats, "write") as stage:
+            write_table(df_clean, output_path, output_format)
+            stage["rows"] = len(df_clean)
     
     return df_clean
 
-def clean_vindividualcustomer(file_path, output_path=None):
-    """Clean nulls in Sales vIndividualCustomer view"""
-    df = pd.read_excel(file_path, sheet_name="Sales vIndividualCustomer")
-    print(f"Sales vIndividualCustomer: {len(df)} rows")
-    
-    # Multiple columns have nulls
-    null_counts = df.isnull().sum()
-    cols_with_nulls = null_counts[null_counts > 0].index.tolist()
-    
-    print("Null counts per column:")
-    for col in cols_with_nulls:
-        percent = null_counts[col]/len(df)*100
-        print(f"  {col}: {null_counts[col]} nulls ({percent:.1f}%)")
-    
-    df_clean = df.copy()
+# Handler for every table with rules, in processing order
+TABLE_HANDLERS = {table_name: partial(clean_table, table_name) for table_name in NULL_RULES}
+
+# Per-table entry points of earlier versions, kept for scripts that import
+# them; they take the same arguments as clean_table after the table name
+clean_workorder = TABLE_HANDLERS["Production WorkOrder"]
+clean_productinventory = TABLE_HANDLERS["Production ProductInventory"]
+clean_product = TABLE_HANDLERS["Production Product"]
+clean_salesorderheader = TABLE_HANDLERS["Sales SalesOrderHeader"]
+clean_salesorderdetail = TABLE_HANDLERS["Sales SalesOrderDetail"]
+clean_address = TABLE_HANDLERS["Person Address"]
+clean_person = TABLE_HANDLERS["Person Person"]
+clean_billofmaterials = TABLE_HANDLERS["Production BillOfMaterials"]
+clean_customer = TABLE_HANDLERS["Sales Customer"]
+clean_salesperson = TABLE_HANDLERS["Sales SalesPerson"]
+clean_vendor = TABLE_HANDLERS["Purchasing Vendor"]
+clean_employee = TABLE_HANDLERS["HumanResources Employee"]
+clean_vstorewithaddresses = TABLE_HANDLERS["Sales vStoreWithAddresses"]
+clean_vsalesperson = TABLE_HANDLERS["Sales vSalesPerson"]
+clean_vindividualcustomer = TABLE_HANDLERS["Sales vIndividualCustomer"]
+
+# =============================================================================
+# Compact Dtypes
+# =============================================================================
+
+# Modes of the optional dtype-optimization stage:
+#   "sentinel"  ID columns keep their -1 fill values as nullable integers
+#   "mask"      ID columns filled with -1 get their NULLs back as <NA>, stored
+#               in the validity mask of the nullable integer array
+COMPACT_MODES = ("sentinel", "mask")
+
+# Nullable integer types tried for ID columns, narrowest first
+COMPACT_ID_TYPES = ("Int16", "Int32", "Int64")
+
+# Text columns whose distinct values are at most this share of their
+# non-null values become categoricals
+COMPACT_CATEGORY_RATIO = 0.5
+
+def is_id_column(name):
+    """Whether a column holds integer keys, like SalesPersonID or TerritoryID"""
+    return str(name).endswith("ID")
+
+def narrowest_id_type(values):
+    """Smallest nullable integer type that holds every value of an integral column"""
+    if values.isna().all():
+        return COMPACT_ID_TYPES[0]
+    low, high = values.min(), values.max()
+    for dtype in COMPACT_ID_TYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return COMPACT_ID_TYPES[-1]
+
+def is_integral(values):
+    """Whether every non-null value of a float column is a whole number"""
+    values = values.dropna().to_numpy()
+    return bool(np.all(np.isfinite(values)) and np.all(values == np.floor(values)))
+
+def compact_dtypes(df, table_name, mode="sentinel", report=True):
+    """Shrink the dtypes of a cleaned table and return (df, memory_before, memory_after)
+
+    Float and integer ID columns become the narrowest nullable Int type
+    that fits; with mode "mask" the -1 fills of the table's NULL_RULES
+    are turned back into <NA>. Integer measures are downcast, float
+    measures only when float32 holds every value exactly, and text
+    columns with few distinct values become categoricals.
+    """
+    if mode not in COMPACT_MODES:
+        raise ValueError(f"Unsupported compact mode: {mode}")
+    memory_before = int(df.memory_usage(deep=True).sum())
+    sentinels = {
+        col: value for col, (value, _) in NULL_RULES[table_name].get("fill", {}).items()
+        if is_id_column(col) and value == -1
+    }
     
-    # Optional name fields (Title, MiddleName, Suffix)
-    for col in ["Title", "MiddleName", "Suffix"]:
-        if col in cols_with_nulls:
-            print(f"Keeping {col} nulls as these are optional name fields")
+    for col in df.columns:
+        values = df[col]
+        if is_id_column(col) and (pd.api.types.is_integer_dtype(values.dtype)
+                                  or pd.api.types.is_float_dtype(values.dtype) and is_integral(values)):
+            if mode == "mask" and col in sentinels:
+                restored = values == sentinels[col]
+                if restored.any():
+                    values = values.mask(restored)
+                    if report:
+                        print(f"Restored {int(restored.sum())} {col} nulls as <NA>")
+            df[col] = values.astype(narrowest_id_type(values))
+        elif pd.api.types.is_bool_dtype(values.dtype):
+            continue
+        elif pd.api.types.is_integer_dtype(values.dtype):
+            df[col] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_float_dtype(values.dtype):
+            # Money columns like TotalDue lose cents in float32, so they stay float64
+            narrow = values.astype("float32")
+            if narrow.astype(values.dtype).equals(values):
+                df[col] = narrow
+        elif is_text_column(values) and values.count():
+            # Measured against the non-null values, so mostly-null unique
+            # columns like PurchaseOrderNumber stay text
+            if values.nunique() <= COMPACT_CATEGORY_RATIO * values.count():
+                df[col] = values.astype("category")
+    
+    memory_after = int(df.memory_usage(deep=True).sum())
+    if report:
+        saved = (1 - memory_after / memory_before) * 100 if memory_before else 0.0
+        print(f"Memory: {format_bytes(memory_before)} -> {format_bytes(memory_after)} "
+              f"({saved:.1f}% smaller)")
+    return df, memory_before, memory_after
+
+# =============================================================================
+# Streaming Cleaning
+# =============================================================================
+
+# Rows per chunk when cleaning in streaming mode
+STREAM_CHUNK_ROWS = 50000
+
+def find_table_source(source_path, table_name):
+    """Resolve the file holding a table: the workbook, or <Table_Name>.parquet/.csv in a directory"""
+    if is_db_source(source_path) or not os.path.isdir(source_path):
+        return source_path
+    
+    file_stem = table_name.replace(' ', '_')
+    for extension in (".parquet", ".csv"):
+        candidate = os.path.join(source_path, file_stem + extension)
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"No .parquet or .csv source for {table_name} in {source_path}")
+
+def sheet_rows_frame(header, rows, dtype=None):
+    """Build a DataFrame from sheet rows with the type inference of pd.read_excel"""
+    from pandas.io.parsers import TextParser
+    parser = TextParser([list(header)] + [list(row) for row in rows], header=0, dtype=dtype,
+                        skip_blank_lines=False)
+    return parser.read()
+
+def iter_source_chunks(source_path, table_name, chunk_rows=STREAM_CHUNK_ROWS, dtype=None):
+    """Yield a table as DataFrames of at most chunk_rows rows
+
+    dtype maps columns of csv and xlsx sources to the type they are
+    parsed as instead of inferring it per chunk.
+    """
+    if is_db_source(source_path):
+        yield from read_db_table(source_path, table_name, chunk_rows)
+        return
     
-    # Optional address fields
-    if "AddressLine2" in cols_with_nulls:
-        print("Keeping AddressLine2 nulls as this is an optional address field")
+    source_file = find_table_source(source_path, table_name)
+    extension = os.path.splitext(source_file)[1].lower()
     
-    if output_path:
-        df_clean.to_excel(output_path, index=False)
-        print(f"Saved to {output_path}")
+    if extension == ".csv":
+        yield from pd.read_csv(source_file, chunksize=chunk_rows, dtype=dtype)
+    elif extension == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source_file).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        # Read-only mode parses the sheet XML lazily, row by row
+        import openpyxl
+        workbook = openpyxl.load_workbook(source_file, read_only=True, data_only=True)
+        try:
+            rows = workbook[table_name].iter_rows(values_only=True)
+            header = next(rows)
+            batch = []
+            for row in rows:
+                # Skip the empty trailing rows openpyxl reports for some exports
+                if all(value is None for value in row):
+                    continue
+                batch.append(row)
+                if len(batch) == chunk_rows:
+                    yield sheet_rows_frame(header, batch, dtype)
+                    batch = []
+            if batch:
+                yield sheet_rows_frame(header, batch, dtype)
+        finally:
+            workbook.close()
+
+def is_parsed_source(source_path, table_name):
+    """Whether a table's values are parsed from text or cells, so pandas infers its column types"""
+    if is_db_source(source_path):
+        return False
+    return not find_table_source(source_path, table_name).lower().endswith(".parquet")
+
+def parse_values(values, dtype=None):
+    """Values of one column of a parsed source, typed as a whole column of them would be"""
+    return sheet_rows_frame(["value"], [[value] for value in values], dtype and {"value": dtype})["value"]
+
+def scan_stream_types(source_path, table_name, chunk_rows=STREAM_CHUNK_ROWS):
+    """First pass of a streamed clean: the column types of the whole table
+
+    Only per-column summaries of each chunk are kept, so memory stays
+    bounded by chunk_rows. Workbook and csv values are read unparsed and
+    the type pandas would infer for the whole column is worked out from
+    the chunk types and the first value of every Python type. Returns the
+    source dtypes, the cleaned columns that mix value types, the
+    categories of the "category" columns and a first value per column.
+    """
+    rules = NULL_RULES[table_name]
+    parsed = is_parsed_source(source_path, table_name)
+    chunk_dtypes = {}
+    value_dtypes = {}
+    has_nulls = set()
+    samples = {}
+    uniques = {}
+    
+    for chunk in iter_source_chunks(source_path, table_name, chunk_rows, object if parsed else None):
+        inferred = sheet_rows_frame(list(chunk.columns), chunk.itertuples(index=False)) if parsed else chunk
+        for col in chunk.columns:
+            values = chunk[col]
+            chunk_dtypes.setdefault(col, {})[inferred[col].dtype] = None
+            nulls = values.isna()
+            if nulls.any():
+                has_nulls.add(col)
+            if nulls.all():
+                continue
+            # Chunks without values, read as float64 NaN, say nothing of the type
+            value_dtypes.setdefault(col, {})[inferred[col].dtype] = None
+            present = values[~nulls]
+            col_samples = samples.setdefault(col, {})
+            for index, kind in present.map(type).drop_duplicates().items():
+                col_samples.setdefault(kind, present[index])
+            if parsed:
+                text = pd.to_numeric(present, errors="coerce").isna()
+                if text.any():
+                    col_samples.setdefault("text", present[text].iloc[0])
+            if col in rules.get("category", []):
+                uniques.setdefault(col, set()).update(present.unique())
+    
+    dtypes = {}
+    for col in chunk_dtypes:
+        candidates = list(value_dtypes.get(col, chunk_dtypes[col]))
+        if all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+               for dtype in candidates) or not parsed:
+            dtype = pd.concat([pd.Series(dtype=candidate) for candidate in candidates]).dtype
+            # A chunk of nulls only turns integers to float and booleans to object
+            if col in has_nulls and pd.api.types.is_integer_dtype(dtype):
+                dtype = np.dtype(np.float64)
+            elif col in has_nulls and pd.api.types.is_bool_dtype(dtype):
+                dtype = np.dtype(object)
+        else:
+            nulls = [None] if col in has_nulls else []
+            dtype = parse_values(list(samples.get(col, {}).values()) + nulls).dtype
+        dtypes[col] = dtype
+    
+    # Mixed types and categories are judged after the fills, as for the whole table
+    fill_rules = rules.get("fill", {})
+    mixed = set()
+    categories = {}
+    first_values = {}
+    for col, dtype in dtypes.items():
+        values = list(samples.get(col, {}).values()) + ([None] if col in has_nulls else [])
+        cleaned = conform_values(pd.Series(values, dtype=object), dtype, parsed)
+        if col in fill_rules:
+            cleaned = cleaned.fillna(fill_rules[col][0])
+        if cleaned.notna().any():
+            first_values[col] = cleaned[cleaned.notna()].iloc[0]
+        if col in uniques and is_text_column(cleaned):
+            members = conform_values(pd.Series(list(uniques[col]) + values, dtype=object), dtype, parsed)
+            if col in fill_rules:
+                members = members.fillna(fill_rules[col][0])
+            categories[col] = members.astype("category").cat.categories
+        elif cleaned.dtype == object and pd.api.types.infer_dtype(cleaned, skipna=True).startswith("mixed"):
+            mixed.add(col)
+    return {"dtypes": dtypes, "parsed": parsed, "mixed": mixed, "categories": categories,
+            "samples": first_values}
+
+def conform_values(values, dtype, parsed):
+    """Convert a column of a chunk to the dtype of the whole column
+
+    Unparsed workbook and csv values are parsed as that dtype.
+    """
+    if values.isna().all():
+        return pd.Series(None, index=values.index, dtype=dtype)
+    if parsed and values.dtype == object:
+        return pd.Series(parse_values(values, dtype).to_numpy(), index=values.index)
+    return values if values.dtype == dtype else values.astype(dtype)
+
+def conform_chunk(chunk, types):
+    """Give a chunk the column types scan_stream_types found for the whole table"""
+    for col, dtype in types["dtypes"].items():
+        chunk[col] = conform_values(chunk[col], dtype, types["parsed"])
+    return chunk
+
+def categorize_chunk(chunk, types):
+    """Convert the "category" columns of a cleaned chunk with the categories of the whole table"""
+    for col, categories in types["categories"].items():
+        chunk[col] = pd.Categorical(chunk[col], categories=categories)
+    return chunk
+
+def stream_clean_table(source_path, table_name, output_path, output_format=None,
+                       chunk_rows=STREAM_CHUNK_ROWS, stats=None):
+    """Clean a table chunk by chunk, appending each chunk to the output
+
+    Peak memory is bounded by chunk_rows whatever the table size. Only the
+    row-wise rules (fill, derive and category) apply; the whole-table
+    reports and the compact stage are skipped. A first pass over the
+    source (scan_stream_types) fixes the column types and categories, so
+    the output has the dtypes of the table cleaned in one piece. Returns
+    the number of rows written, and fills stats like clean_table with the
+    scan/read/clean/write stages summed over chunks.
+    """
+    stats = {} if stats is None else stats
+    if output_format is None:
+        output_format = os.path.splitext(output_path)[1].lstrip('.').lower() or "xlsx"
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    
+    with measure_stage(stats, "scan"):
+        types = scan_stream_types(source_path, table_name, chunk_rows)
+    
+    rows = 0
+    writer = None
+    sheet = None
+    schema = None
     
-    return df_clean
+    try:
+        chunks = iter_source_chunks(source_path, table_name, chunk_rows,
+                                    types["dtypes"] if types["parsed"] else None)
+        while True:
+            with measure_stage(stats, "read") as stage:
+                chunk = next(chunks, None)
+                stage["rows"] = 0 if chunk is None else len(chunk)
+            if chunk is None:
+                break
+            
+            # The categories come from the scan, as each chunk would get its own
+            with measure_stage(stats, "clean") as stage:
+                chunk = conform_chunk(chunk, types)
+                chunk = apply_null_rules(chunk, table_name, report=False, categorize=False)
+                chunk = categorize_chunk(chunk, types)
+                stage["rows"] = len(chunk)
+            
+            with measure_stage(stats, "write") as stage:
+                if output_format == "csv":
+                    chunk.to_csv(output_path, mode="a" if rows else "w", header=not rows, index=False)
+                elif output_format == "xlsx":
+                    if writer is None:
+                        import openpyxl
+                        writer = openpyxl.Workbook(write_only=True)
+                        sheet = writer.create_sheet(table_name[:31])
+                        sheet.append(list(chunk.columns))
+                    values = chunk.astype(object).where(chunk.notna(), None)
+                    for row in values.itertuples(index=False):
+                        sheet.append(list(row))
+                else:
+                    import pyarrow as pa
+                    import pyarrow.parquet as pq
+                    # Columns that mix types are stringified as arrow_safe
+                    # does for the whole table, even in chunks of one type
+                    for name in types["mixed"]:
+                        chunk[name] = chunk[name].map(lambda value: value if pd.isna(value) else str(value))
+                    batch = pa.Table.from_pandas(arrow_safe(chunk), schema=schema, preserve_index=False)
+                    
+                    if writer is None:
+                        # Object columns that are entirely null in the first chunk
+                        # take their type from the first value the scan saw
+                        schema = batch.schema
+                        for index, field in enumerate(schema):
+                            if pa.types.is_null(field.type) and field.name in types["samples"]:
+                                sample = types["samples"][field.name]
+                                if field.name in types["mixed"]:
+                                    sample = str(sample)
+                                schema = schema.set(index, pa.field(field.name, pa.array([sample]).type))
+                        batch = batch.cast(schema)
+                        if output_format == "feather":
+                            writer = pa.ipc.new_file(output_path, schema)
+                        else:
+                            writer = pq.ParquetWriter(output_path, schema)
+                    writer.write_table(batch)
+                stage["rows"] = len(chunk)
+            
+            rows += len(chunk)
+            print(f"  {table_name}: {rows} rows cleaned")
+    finally:
+        with measure_stage(stats, "write"):
+            if output_format == "xlsx" and writer is not None:
+                writer.save(output_path)
+            elif writer is not None:
+                writer.close()
+    
+    stats["rows_in"] = stats["rows_out"] = rows
+    print(f"Saved to {output_path}")
+    return rows
+
+# =============================================================================
+# Incremental Runs
+# =============================================================================
+
+MANIFEST_FILE = "manifest.json"
+
+# Manifest entry fields that must match for an earlier output to be reused
+REUSE_KEYS = ("hash", "rows", "rules", "format", "compact", "streamed")
+
+# Bump when cleaning changes outside NULL_RULES and its derive functions,
+# e.g. CUSTOMER_TYPES, so the outputs of earlier runs are not reused
+RULES_VERSION = 1
+
+XLSX_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+XLSX_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+XLSX_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Shared-string cells look like <c r="B2" t="s"><v>17</v></c>
+SHARED_STRING_CELL = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+DIMENSION_REF = re.compile(rb'<dimension\s+ref="[A-Z]+\d+(?::[A-Z]+(\d+))?"')
+
+def read_shared_strings(archive):
+    """Return the workbook's shared strings table as a list"""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as handle:
+        for _, element in ElementTree.iterparse(handle):
+            if element.tag == f"{XLSX_MAIN_NS}si":
+                # Rich text entries split one string across several <t> runs
+                strings.append("".join(node.text or "" for node in element.iter(f"{XLSX_MAIN_NS}t")))
+                element.clear()
+    return strings
+
+def sheet_parts(archive):
+    """Map each sheet name to its worksheet XML part inside the xlsx"""
+    workbook = ElementTree.fromstring(archive.read("xl/workbook.xml"))
+    rels = ElementTree.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{XLSX_PKG_REL_NS}Relationship")}
+    
+    parts = {}
+    for sheet in workbook.iter(f"{XLSX_MAIN_NS}sheet"):
+        target = targets[sheet.get(f"{XLSX_REL_NS}id")]
+        parts[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    return parts
+
+def xlsx_fingerprints(file_path, sheet_names):
+    """Hash the raw XML of each sheet, without parsing its cells
+
+    Sheets store strings as indices into a table shared by the whole
+    workbook, so the strings a sheet references are hashed along with its
+    XML; a change in another sheet does not invalidate it.
+    """
+    fingerprints = {}
+    with zipfile.ZipFile(file_path) as archive:
+        parts = sheet_parts(archive)
+        strings = read_shared_strings(archive)
+        
+        for name in sheet_names:
+            if name not in parts:
+                continue
+            digest = hashlib.sha256()
+            rows = None
+            row_tags = 0
+            tail = b""
+            
+            with archive.open(parts[name]) as handle:
+                for block in iter(lambda: handle.read(1 << 20), b""):
+                    digest.update(block)
+                    row_tags += block.count(b"<row ")
+                    
+                    # Keep the text after the last complete cell for the next block
+                    text = tail + block
+                    cut = text.rfind(b"</c>") + len(b"</c>") if b"</c>" in text else 0
+                    for index in SHARED_STRING_CELL.findall(text, 0, cut):
+                        digest.update(strings[int(index)].encode("utf-8") + b"\0")
+                    tail = text[cut:]
+                    
+                    if rows is None:
+                        dimension = DIMENSION_REF.search(text)
+                        if dimension:
+                            rows = int(dimension.group(1) or 1) - 1
+            
+            fingerprints[name] = {"hash": digest.hexdigest(), "rows": rows if rows is not None else row_tags - 1}
+    return fingerprints
+
+def source_fingerprints(file_path, table_names):
+    """Return {table: {"hash", "rows"}} for a workbook, a directory of table files or a database"""
+    if is_db_source(file_path):
+        return db_fingerprints(file_path, table_names)
+    if not os.path.isdir(file_path):
+        return xlsx_fingerprints(file_path, table_names)
+    
+    fingerprints = {}
+    for table_name in table_names:
+        try:
+            source_file = find_table_source(file_path, table_name)
+        except FileNotFoundError:
+            continue
+        digest = hashlib.sha256()
+        lines = 0
+        with open(source_file, "rb") as handle:
+            for block in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(block)
+                lines += block.count(b"\n")
+        if source_file.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            rows = pq.ParquetFile(source_file).metadata.num_rows
+        else:
+            rows = lines - 1
+        fingerprints[table_name] = {"hash": digest.hexdigest(), "rows": rows}
+    return fingerprints
+
+def db_fingerprints(source, table_names, chunk_rows=STREAM_CHUNK_ROWS):
+    """Hash database tables by their row values, read in chunks"""
+    fingerprints = {}
+    for table_name in table_names:
+        try:
+            chunks = read_db_table(source, table_name, chunk_rows)
+            digest = hashlib.sha256()
+            rows = 0
+            for chunk in chunks:
+                digest.update(pd.util.hash_pandas_object(chunk, index=False).to_numpy().tobytes())
+                rows += len(chunk)
+        except pd.errors.DatabaseError:
+            continue
+        fingerprints[table_name] = {"hash": digest.hexdigest(), "rows": rows}
+    return fingerprints
+
+def rules_fingerprint(table_name):
+    """Hash a table's NULL_RULES entry so rule changes invalidate its cache
+
+    derive functions are hashed by their source, so editing one counts
+    as a rule change.
+    """
+    rules = json.dumps([RULES_VERSION, NULL_RULES[table_name]], sort_keys=True,
+                       default=lambda value: inspect.getsource(value) if callable(value) else str(value))
+    return hashlib.sha256(rules.encode("utf-8")).hexdigest()
+
+def read_manifest(output_dir):
+    """Load the manifest of a previous run, or None when there is none"""
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path) as handle:
+        return json.load(handle)
+
+def write_manifest(output_dir, file_path, tables):
+    """Record the source fingerprint and output file of every cleaned table"""
+    manifest = {
+        "source": source_label(file_path),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "tables": tables
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as handle:
+        json.dump(manifest, handle, indent=2)
+
+def find_previous_run(output_dir):
+    """Return the most recent run directory next to output_dir that has a manifest"""
+    if read_manifest(output_dir) is not None:
+        return output_dir
+    
+    parent = os.path.dirname(os.path.abspath(output_dir))
+    runs = sorted(
+        (name for name in os.listdir(parent) if name.startswith("AdventureWorks_Clean_")),
+        reverse=True
+    )
+    for name in runs:
+        run_dir = os.path.join(parent, name)
+        if os.path.abspath(run_dir) != os.path.abspath(output_dir) and read_manifest(run_dir):
+            return run_dir
+    return None
+
+def reuse_output(previous_file, output_file):
+    """Hard-link an unchanged output into the new run, copying across filesystems"""
+    if os.path.abspath(previous_file) == os.path.abspath(output_file):
+        return
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    try:
+        os.link(previous_file, output_file)
+    except OSError:
+        shutil.copy2(previous_file, output_file)
+
+# =============================================================================
+# Null Profiling
+# =============================================================================
+
+# Most frequent null patterns listed per table
+NULL_PATTERN_LIMIT = 10
+# Change in a column's null ratio reported as drift against a baseline
+NULL_DRIFT_THRESHOLD = 0.01
+
+def null_patterns(mask):
+    """Distinct rows of a rows x columns null mask and how often each occurs
+
+    Every row is packed into a bitmask (one integer for up to 64
+    columns), so finding the patterns is one np.unique over integers.
+    """
+    columns = mask.shape[1]
+    if columns <= 64:
+        weights = np.left_shift(np.uint64(1), np.arange(columns, dtype=np.uint64))
+        keys = (mask.astype(np.uint64) * weights).sum(axis=1, dtype=np.uint64)
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        patterns = ((unique_keys[:, None] >> np.arange(columns, dtype=np.uint64)) & np.uint64(1)).astype(bool)
+    else:
+        packed = np.packbits(mask, axis=1, bitorder="little")
+        unique_rows, counts = np.unique(packed, axis=0, return_counts=True)
+        patterns = np.unpackbits(unique_rows, axis=1, count=columns, bitorder="little").astype(bool)
+    return patterns, counts
+
+def null_profile(df):
+    """Null counts and ratios per column, pairwise co-occurrence and row patterns of a table"""
+    rows = len(df)
+    mask = df.isna().to_numpy()
+    counts = mask.sum(axis=0)
+    null_columns = [str(col) for col in df.columns[counts > 0]]
+    profile = {
+        "rows": rows,
+        "columns": [
+            {"column": str(col), "nulls": int(count), "ratio": count / rows if rows else 0.0}
+            for col, count in zip(df.columns, counts)
+        ],
+        "co_occurrence": [],
+        "patterns": []
+    }
+    if not null_columns or not rows:
+        return profile
+    
+    patterns, pattern_counts = null_patterns(mask[:, counts > 0])
+    # Rows where both columns are null, summed over the patterns instead of the rows
+    weighted = patterns.astype(np.int64)
+    both = weighted.T @ (weighted * pattern_counts[:, None])
+    for i, j in zip(*np.triu_indices(len(null_columns), k=1)):
+        if both[i, j]:
+            profile["co_occurrence"].append({
+                "columns": [null_columns[i], null_columns[j]],
+                "both_null": int(both[i, j]),
+                "share_of_first": both[i, j] / both[i, i],
+                "share_of_second": both[i, j] / both[j, j]
+            })
+    
+    for position in np.argsort(-pattern_counts)[:NULL_PATTERN_LIMIT]:
+        profile["patterns"].append({
+            "null_columns": [col for col, is_null in zip(null_columns, patterns[position]) if is_null],
+            "rows": int(pattern_counts[position]),
+            "ratio": pattern_counts[position] / rows
+        })
+    return profile
+
+def null_drift(profiles, baseline):
+    """Columns whose null ratio moved by NULL_DRIFT_THRESHOLD or more since a baseline report"""
+    drift = []
+    for table_name, profile in profiles.items():
+        before = {entry["column"]: entry["ratio"]
+                  for entry in baseline.get("tables", {}).get(table_name, {}).get("columns", [])}
+        for entry in profile["columns"]:
+            if entry["column"] in before and abs(entry["ratio"] - before[entry["column"]]) >= NULL_DRIFT_THRESHOLD:
+                drift.append({
+                    "table": table_name,
+                    "column": entry["column"],
+                    "baseline_ratio": before[entry["column"]],
+                    "ratio": entry["ratio"],
+                    "change": entry["ratio"] - before[entry["column"]]
+                })
+    return drift
+
+def source_table_names(file_path):
+    """Every table of a source: all workbook sheets or table files, or the handled tables of a database"""
+    if is_db_source(file_path):
+        return list(TABLE_HANDLERS)
+    if os.path.isdir(file_path):
+        return sorted(
+            os.path.splitext(name)[0].replace('_', ' ') for name in os.listdir(file_path)
+            if name.lower().endswith((".parquet", ".csv"))
+        )
+    with pd.ExcelFile(file_path) as workbook:
+        return list(workbook.sheet_names)
+
+def profile_source(file_path, table_names=None, baseline=None):
+    """Profile the nulls of every table of a source, loaded in one pass
+
+    baseline is a previous report, whose ratios the drift section is
+    measured against. Returns the report as a dict.
+    """
+    stats = {}
+    table_names = table_names or source_table_names(file_path)
+    with measure_stage(stats, "load") as stage:
+        frames = load_sheets(file_path, table_names)
+        stage["rows"] = sum(len(frame) for frame in frames.values())
+    
+    with measure_stage(stats, "profile") as stage:
+        profiles = {table_name: null_profile(frame) for table_name, frame in frames.items()}
+        stage["rows"] = sum(profile["rows"] for profile in profiles.values())
+    
+    return {
+        "source": source_label(file_path),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "timings": stats["timings"],
+        "tables": profiles,
+        "drift": null_drift(profiles, baseline) if baseline else []
+    }
+
+def null_report_html(report):
+    """Render a null profile report as a standalone HTML page"""
+    def table_html(records, columns):
+        if not records:
+            return "<p>None</p>"
+        frame = pd.DataFrame(records)[columns]
+        for col in frame.columns:
+            if frame[col].map(lambda value: isinstance(value, list)).any():
+                frame[col] = frame[col].map(lambda value: ", ".join(value) or "(no nulls)")
+        return frame.to_html(index=False, float_format=lambda value: f"{value:.4f}")
+    
+    overview = [
+        {"table": table_name, "rows": profile["rows"],
+         "null_columns": sum(1 for entry in profile["columns"] if entry["nulls"]),
+         "nulls": sum(entry["nulls"] for entry in profile["columns"])}
+        for table_name, profile in report["tables"].items()
+    ]
+    parts = [
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Null Profile</title>",
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse;margin-bottom:1em}"
+        "td,th{border:1px solid #ccc;padding:2px 8px;text-align:right}</style></head><body>",
+        f"<h1>Null Profile</h1><p>Source: {html.escape(report['source'])}<br>Created: {report['created']}</p>",
+        "<h2>Overview</h2>", table_html(overview, ["table", "rows", "null_columns", "nulls"]),
+        "<h2>Drift</h2>", table_html(report["drift"], ["table", "column", "baseline_ratio", "ratio", "change"])
+    ]
+    for table_name, profile in report["tables"].items():
+        columns = [entry for entry in profile["columns"] if entry["nulls"]]
+        parts += [
+            f"<h2>{html.escape(table_name)} ({profile['rows']} rows)</h2>",
+            "<h3>Null columns</h3>", table_html(columns, ["column", "nulls", "ratio"]),
+            "<h3>Co-occurrence</h3>",
+            table_html(profile["co_occurrence"], ["columns", "both_null", "share_of_first", "share_of_second"]),
+            "<h3>Row patterns</h3>", table_html(profile["patterns"], ["null_columns", "rows", "ratio"])
+        ]
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+def write_null_report(report, report_path):
+    """Write a null profile report as JSON or, for an .html path, HTML"""
+    with open(report_path, "w", encoding="utf-8") as handle:
+        if report_path.lower().endswith((".html", ".htm")):
+            handle.write(null_report_html(report))
+        else:
+            json.dump(report, handle, indent=2, default=float)
+    print(f"Null profile saved to {report_path}")
 
 # =============================================================================
 # Main Processing Functions
 # =============================================================================
 
-def process_adventure_works_nulls(file_path, output_dir=None):
-    """Process all AdventureWorks tables with nulls using specialized handlers"""
+def run_table(file_path, label, sheet_name, handler_func, output_file, df=None, capture=False,
+              output_format=None, report=True, chunk_rows=None, profile=False, cprofile_dir=None,
+              compact=None):
+    """Run one handler and return (log, result) where result summarizes the run
+
+    profile turns on tracemalloc so every stage records its peak traced
+    memory; cprofile_dir receives a <Table_Name>.prof cProfile dump.
+    compact is passed on to the handler; streamed tables skip it.
+    """
+    buffer = io.StringIO()
+    if profile and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    profiler = cProfile.Profile() if cprofile_dir else None
+    start = time.perf_counter()
+    stats = {"timings": {}, "stages": {}}
+    error = None
+    
+    # Worker processes capture their print output so it can be replayed
+    # in table order instead of interleaving on the console
+    with redirect_stdout(buffer) if capture else nullcontext():
+        print(f"\n{'='*50}")
+        print(f"Processing: {label}")
+        print(f"{'='*50}")
+        
+        try:
+            if profiler:
+                profiler.enable()
+            if chunk_rows:
+                # Each chunk would get its own narrowest types, which the
+                # appended output could not hold under one schema
+                if compact:
+                    print("Compact dtypes are not applied when streaming")
+                stream_clean_table(file_path, sheet_name, output_file, output_format, chunk_rows,
+                                   stats=stats)
+            else:
+                handler_func(file_path, output_file, df=df, output_format=output_format,
+                             report=report, stats=stats, compact=compact)
+        except Exception as e:
+            error = str(e)
+            print(f"Error processing {label}: {str(e)}")
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(cprofile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(cprofile_dir, f"{sheet_name.replace(' ', '_')}.prof"))
+    
+    result = {
+        "table": sheet_name,
+        "status": "failed" if error else "ok",
+        "error": error,
+        "rows_in": stats.get("rows_in"),
+        "rows_out": stats.get("rows_out"),
+        "memory_bytes": stats.get("memory_bytes"),
+        "output": output_file,
+        "wall_seconds": time.perf_counter() - start,
+        "timings": stats["timings"],
+        "stages": stats["stages"]
+    }
+    return buffer.getvalue(), result
+
+def run_tables(file_path, jobs, output_dir, workers=1, output_format="xlsx", report=True,
+               chunk_rows=None, profile=False, cprofile_dir=None, compact=None):
+    """Run (label, sheet_name, handler) jobs serially or across a process pool
+
+    With chunk_rows set, every table is streamed through
+    stream_clean_table instead of being loaded whole. Returns a summary
+    with one result per table and the run-level stage timings.
+    """
+    start = time.perf_counter()
+    results = []
+    run_stats = {"timings": {"load": 0.0}, "stages": {}}
+    
+    if workers > 1:
+        # Each worker parses its own sheet, which spreads the expensive
+        # openpyxl parsing across cores instead of one shared load
+        print(f"Running {len(jobs)} tables on {workers} worker processes")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(run_table, file_path, label, sheet_name, handler_func,
+                            table_output_path(output_dir, sheet_name, output_format),
+                            None, True, output_format, report, chunk_rows,
+                            profile, cprofile_dir, compact)
+                for label, sheet_name, handler_func in jobs
+            ]
+            # Collect in submission order so the logs come out table by table
+            for future in futures:
+                log, result = future.result()
+                print(log, end="")
+                results.append(result)
+    else:
+        # Parse the workbook once and hand each handler its own sheet
+        frames = {}
+        if profile and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if not chunk_rows and jobs:
+            with measure_stage(run_stats, "load") as stage:
+                frames = load_sheets(file_path, [sheet_name for _, sheet_name, _ in jobs])
+                stage["rows"] = sum(len(frame) for frame in frames.values())
+        
+        for label, sheet_name, handler_func in jobs:
+            _, result = run_table(file_path, label, sheet_name, handler_func,
+                                  table_output_path(output_dir, sheet_name, output_format),
+                                  frames.pop(sheet_name, None),
+                                  output_format=output_format, report=report,
+                                  chunk_rows=chunk_rows, profile=profile,
+                                  cprofile_dir=cprofile_dir, compact=compact)
+            results.append(result)
+    
+    total_seconds = time.perf_counter() - start
+    
+    print(f"\n{'='*50}")
+    print("Wall time per table:")
+    for (label, _, _), result in zip(jobs, results):
+        status = "FAILED" if result["error"] else "ok"
+        print(f"  {label}: {result['wall_seconds']:.2f}s ({status})")
+    print(f"Total wall time: {total_seconds:.2f}s")
+    
+    compacted = [(label, result["memory_bytes"]) for (label, _, _), result in zip(jobs, results)
+                 if result["memory_bytes"]]
+    if compacted:
+        print("Memory per table before -> after compacting:")
+        for label, memory in compacted:
+            print(f"  {label}: {format_bytes(memory['before'])} -> {format_bytes(memory['after'])}")
+    
+    return {
+        "tables": results,
+        "timings": dict(run_stats["timings"], tables=total_seconds),
+        "stages": run_stats["stages"]
+    }
+
+def run_failed(summary):
+    """Whether any table of a run summary failed"""
+    return any(result["status"] == "failed" for result in summary["tables"])
+
+def process_adventure_works_nulls(file_path, output_dir=None, workers=1, output_format="xlsx",
+                                  report=True, chunk_rows=None, incremental=False, tables=None,
+                                  profile=False, cprofile_dir=None, compact=None):
+    """Process all AdventureWorks tables with nulls using specialized handlers
+
+    Every run writes a manifest with a content hash and row count per
+    source sheet. With incremental on, tables whose sheet, rules, format,
+    compact mode and streaming match the previous run are hard-linked
+    from its output instead of being cleaned again. tables restricts the run to a subset
+    of TABLE_HANDLERS. profile, cprofile_dir and compact are passed on
+    to run_table. Returns the run summary.
+    """
+    run_start = time.perf_counter()
+    run_stats = {}
+    
     # Set default output directory if none provided
     if output_dir is None:
-        output_dir = os.path.dirname(file_path)
+        output_dir = source_dir(file_path)
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         output_dir = os.path.join(output_dir, f"AdventureWorks_Clean_{timestamp}")
     
@@ -458,61 +1501,105 @@ def process_adventure_works_nulls(file_path, output_dir=None):
         os.makedirs(output_dir)
         print(f"Created output directory: {output_dir}")
     
-    # Define tables with nulls and their handlers
-    null_tables = {
-        "Production WorkOrder": clean_workorder,
-        "Production ProductInventory": clean_productinventory,
-        "Production Product": clean_product,
-        "Sales SalesOrderHeader": clean_salesorderheader,
-        "Sales SalesOrderDetail": clean_salesorderdetail,
-        "Person Address": clean_address,
-        "Person Person": clean_person,
-        "Production BillOfMaterials": clean_billofmaterials,
-        "Sales Customer": clean_customer,
-        "Sales SalesPerson": clean_salesperson,
-        "Purchasing Vendor": clean_vendor,
-        "HumanResources Employee": clean_employee,
-        "Sales vStoreWithAddresses": clean_vstorewithaddresses,
-        "Sales vSalesPerson": clean_vsalesperson,
-        "Sales vIndividualCustomer": clean_vindividualcustomer
-    }
-    
-    # Process each table
-    print(f"Processing {len(null_tables)} tables with nulls")
+    # Tables with nulls and their handlers
+    null_tables = TABLE_HANDLERS
+    if tables is not None:
+        null_tables = {name: TABLE_HANDLERS[name] for name in tables}
     
-    for table_name, handler_func in null_tables.items():
-        print(f"\n{'='*50}")
-        print(f"Processing: {table_name}")
-        print(f"{'='*50}")
-        
-        output_file = os.path.join(output_dir, f"{table_name.replace(' ', '_')}_clean.xlsx")
-        
+    with measure_stage(run_stats, "fingerprint") as stage:
         try:
-            handler_func(file_path, output_file)
-        except Exception as e:
-            print(f"Error processing {table_name}: {str(e)}")
+            fingerprints = source_fingerprints(file_path, list(null_tables))
+        except (OSError, KeyError, zipfile.BadZipFile, ElementTree.ParseError) as e:
+            print(f"Could not fingerprint {file_path}, no manifest will be written: {str(e)}")
+            fingerprints = {}
+        stage["rows"] = sum(entry["rows"] for entry in fingerprints.values())
+    
+    entries = {}
+    for table_name in null_tables:
+        if table_name in fingerprints:
+            entries[table_name] = dict(
+                fingerprints[table_name],
+                rules=rules_fingerprint(table_name),
+                format=output_format,
+                compact=compact,
+                # Streamed outputs skip the compact stage
+                streamed=bool(chunk_rows),
+                output=os.path.relpath(table_output_path(output_dir, table_name, output_format), output_dir)
+            )
+    
+    # Reuse the outputs of tables that have not changed since the last run
+    manifest_tables = {}
+    with measure_stage(run_stats, "reuse"):
+        previous_dir = find_previous_run(output_dir) if incremental else None
+        if previous_dir:
+            previous = read_manifest(previous_dir)["tables"]
+            for table_name, entry in entries.items():
+                old_entry = previous.get(table_name)
+                if old_entry is None or any(old_entry.get(key) != entry[key] for key in REUSE_KEYS):
+                    continue
+                previous_file = os.path.join(previous_dir, old_entry["output"])
+                if os.path.exists(previous_file):
+                    reuse_output(previous_file, os.path.join(output_dir, entry["output"]))
+                    manifest_tables[table_name] = entry
+            print(f"Reused {len(manifest_tables)} unchanged tables from {previous_dir}")
+    
+    # Process each table
+    changed_tables = {name: func for name, func in null_tables.items() if name not in manifest_tables}
+    print(f"Processing {len(changed_tables)} tables with nulls")
+    
+    jobs = [(table_name, table_name, handler_func) for table_name, handler_func in changed_tables.items()]
+    summary = run_tables(file_path, jobs, output_dir, workers, output_format, report, chunk_rows,
+                         profile, cprofile_dir, compact)
+    
+    for result in summary["tables"]:
+        if result["error"] is None and result["table"] in entries:
+            manifest_tables[result["table"]] = entries[result["table"]]
+    if entries:
+        # Keep the entries of tables outside this run that live in output_dir
+        existing = read_manifest(output_dir) or {"tables": {}}
+        for table_name, entry in existing["tables"].items():
+            if table_name not in null_tables:
+                manifest_tables.setdefault(table_name, entry)
+        write_manifest(output_dir, file_path, manifest_tables)
+    
+    # Reused tables are reported alongside the cleaned ones
+    for table_name in null_tables:
+        if table_name in manifest_tables and table_name not in changed_tables:
+            entry = manifest_tables[table_name]
+            summary["tables"].append({
+                "table": table_name,
+                "status": "reused",
+                "error": None,
+                "rows_in": entry["rows"],
+                "rows_out": entry["rows"],
+                "memory_bytes": None,
+                "output": os.path.join(output_dir, entry["output"]),
+                "wall_seconds": 0.0,
+                "timings": {},
+                "stages": {}
+            })
+    
+    summary.update({
+        "source": source_label(file_path),
+        "output_dir": os.path.abspath(output_dir),
+        "format": output_format,
+        "compact": compact,
+        "workers": workers
+    })
+    summary["stages"].update(run_stats["stages"])
+    summary["timings"].update(run_stats["timings"])
+    summary["timings"]["total"] = time.perf_counter() - run_start
     
     print(f"\nAll tables processed. Clean files saved to: {output_dir}")
+    return summary
 
-def process_selected_tables(file_path):
+def process_selected_tables(file_path, workers=1, output_format="xlsx", report=True,
+                            chunk_rows=None):
     """Process only selected AdventureWorks tables with nulls"""
-    # Define tables with nulls and their handlers
+    # Number the tables with nulls for the selection prompt
     null_tables = {
-        "1. Production WorkOrder": clean_workorder,
-        "2. Production ProductInventory": clean_productinventory,
-        "3. Production Product": clean_product,
-        "4. Sales SalesOrderHeader": clean_salesorderheader,
-        "5. Sales SalesOrderDetail": clean_salesorderdetail,
-        "6. Person Address": clean_address,
-        "7. Person Person": clean_person,
-        "8. Production BillOfMaterials": clean_billofmaterials,
-        "9. Sales Customer": clean_customer,
-        "10. Sales SalesPerson": clean_salesperson,
-        "11. Purchasing Vendor": clean_vendor,
-        "12. HumanResources Employee": clean_employee,
-        "13. Sales vStoreWithAddresses": clean_vstorewithaddresses,
-        "14. Sales vSalesPerson": clean_vsalesperson,
-        "15. Sales vIndividualCustomer": clean_vindividualcustomer
+        f"{i}. {table_name}": handler_func
+        for i, (table_name, handler_func) in enumerate(TABLE_HANDLERS.items(), 1)
     }
     
     # Show available tables
@@ -524,7 +1611,7 @@ def process_selected_tables(file_path):
     selection = input("\nEnter table numbers to process (comma separated, e.g., 1,3,5) or 'all': ")
     
     # Create output directory
-    output_dir = os.path.dirname(file_path)
+    output_dir = source_dir(file_path)
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     output_dir = os.path.join(output_dir, f"AdventureWorks_Selected_{timestamp}")
     
@@ -541,42 +1628,21 @@ def process_selected_tables(file_path):
     
     print(f"\nProcessing {len(selected_tables)} selected tables")
     
+    # Extract actual table name (remove numbering)
+    jobs = []
     for table_name in selected_tables:
-        print(f"\n{'='*50}")
-        print(f"Processing: {table_name}")
-        print(f"{'='*50}")
-        
-        # Extract actual table name (remove numbering)
         actual_table = ' '.join(table_name.split('. ')[1:]) if '. ' in table_name else table_name
-        output_file = os.path.join(output_dir, f"{actual_table.replace(' ', '_')}_clean.xlsx")
-        
-        try:
-            null_tables[table_name](file_path, output_file)
-        except Exception as e:
-            print(f"Error processing {table_name}: {str(e)}")
+        jobs.append((table_name, actual_table, null_tables[table_name]))
+    
+    summary = run_tables(file_path, jobs, output_dir, workers, output_format, report, chunk_rows)
     
     print(f"\nSelected tables processed. Clean files saved to: {output_dir}")
+    return summary
 
-def process_single_table(file_path, table_name):
+def process_single_table(file_path, table_name, output_format="xlsx", report=True):
     """Process a single AdventureWorks table"""
     # Map of table names to handler functions
-    handlers = {
-        "Production WorkOrder": clean_workorder,
-        "Production ProductInventory": clean_productinventory,
-        "Production Product": clean_product,
-        "Sales SalesOrderHeader": clean_salesorderheader,
-        "Sales SalesOrderDetail": clean_salesorderdetail,
-        "Person Address": clean_address,
-        "Person Person": clean_person,
-        "Production BillOfMaterials": clean_billofmaterials,
-        "Sales Customer": clean_customer,
-        "Sales SalesPerson": clean_salesperson,
-        "Purchasing Vendor": clean_vendor,
-        "HumanResources Employee": clean_employee,
-        "Sales vStoreWithAddresses": clean_vstorewithaddresses,
-        "Sales vSalesPerson": clean_vsalesperson,
-        "Sales vIndividualCustomer": clean_vindividualcustomer
-    }
+    handlers = TABLE_HANDLERS
     
     # Check if the table is supported
     if table_name not in handlers:
@@ -587,13 +1653,13 @@ def process_single_table(file_path, table_name):
         return
     
     # Create output path
-    output_dir = os.path.dirname(file_path)
-    output_file = os.path.join(output_dir, f"{table_name.replace(' ', '_')}_clean.xlsx")
+    output_dir = source_dir(file_path)
+    output_file = table_output_path(output_dir, table_name, output_format)
     
     # Process the table
     print(f"Processing table: {table_name}")
     try:
-        handlers[table_name](file_path, output_file)
+        handlers[table_name](file_path, output_file, output_format=output_format, report=report)
         print(f"Table processed successfully. Output saved to: {output_file}")
     except Exception as e:
         print(f"Error processing table: {str(e)}")
@@ -615,47 +1681,151 @@ def show_main_menu():
     choice = input("\nEnter your choice (1-4): ")
     return choice
 
+def build_parser():
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        description="AdventureWorks Null Handler. Without --workbook the interactive menu is shown."
+    )
+    parser.add_argument("--workbook",
+                        help="path to the Excel export, a directory of <Table_Name>.csv/.parquet files "
+                             "or a database URL like sqlite:///AdventureWorks.db")
+    parser.add_argument("--tables", nargs="+", metavar="TABLE",
+                        help="tables to clean, e.g. \"Sales Customer\" (default: all tables with nulls)")
+    parser.add_argument("--output-dir",
+                        help="directory for the cleaned tables (default: a timestamped directory next to the workbook)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes used to clean tables in parallel")
+    parser.add_argument("--format", dest="output_format", default="xlsx",
+                        choices=sorted(OUTPUT_FORMATS),
+                        help="output format for the cleaned tables")
+    parser.add_argument("--quiet", action="store_true",
+                        help="skip the per-column null reports")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="stream each table in chunks of this many rows instead of loading it whole")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse outputs of tables whose source sheet has not changed since the last run")
+    parser.add_argument("--summary-json", metavar="PATH",
+                        help="write a JSON run summary to PATH ('-' for stdout)")
+    parser.add_argument("--profile", metavar="PATH",
+                        help="write per-stage wall/CPU time, peak memory and rows/sec to PATH (.json or .csv)")
+    parser.add_argument("--cprofile-dir", metavar="DIR",
+                        help="dump a cProfile .prof file per table into DIR")
+    parser.add_argument("--compact", nargs="?", const="sentinel", choices=COMPACT_MODES,
+                        help="store IDs as nullable integers, downcast measures and categorize "
+                             "low-cardinality text; 'mask' turns -1 ID fills back into <NA> "
+                             "(default mode: sentinel)")
+    parser.add_argument("--null-profile", metavar="PATH",
+                        help="only profile the nulls of every sheet and write the report to PATH (.json or .html)")
+    parser.add_argument("--null-baseline", metavar="PATH",
+                        help="previous --null-profile JSON report to measure null ratio drift against")
+    return parser
+
+def write_summary(summary, summary_path):
+    """Write the run summary as JSON to a file or, for '-', to stdout"""
+    text = json.dumps(summary, indent=2, default=str)
+    if summary_path == "-":
+        print(text)
+    else:
+        with open(summary_path, "w") as handle:
+            handle.write(text)
+        print(f"Run summary saved to {summary_path}")
+
+def run_batch(args):
+    """Run the null handler non-interactively and return the process exit code"""
+    try:
+        exists = source_exists(args.workbook)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+    if not exists:
+        print(f"Error: File not found at {args.workbook}", file=sys.stderr)
+        return 2
+    
+    # Profiling covers every sheet, not only the tables with handlers
+    if args.null_profile:
+        baseline = None
+        if args.null_baseline:
+            with open(args.null_baseline) as handle:
+                baseline = json.load(handle)
+        try:
+            report = profile_source(args.workbook, args.tables, baseline)
+        except Exception as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return 1
+        write_null_report(report, args.null_profile)
+        return 0
+    
+    unknown = [name for name in args.tables or [] if name not in TABLE_HANDLERS]
+    if unknown:
+        print(f"Error: Unsupported tables: {', '.join(unknown)}", file=sys.stderr)
+        print(f"Supported tables: {', '.join(TABLE_HANDLERS)}", file=sys.stderr)
+        return 2
+    
+    # With the summary on stdout, the progress messages go to stderr
+    log_target = sys.stderr if args.summary_json == "-" else sys.stdout
+    try:
+        with redirect_stdout(log_target):
+            summary = process_adventure_works_nulls(
+                args.workbook, args.output_dir, workers=args.workers,
+                output_format=args.output_format, report=not args.quiet,
+                chunk_rows=args.chunk_rows, incremental=args.incremental,
+                tables=args.tables, profile=bool(args.profile),
+                cprofile_dir=args.cprofile_dir, compact=args.compact
+            )
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    
+    if args.summary_json:
+        write_summary(summary, args.summary_json)
+    if args.profile:
+        with redirect_stdout(log_target):
+            write_profile(summary, args.profile)
+    
+    if run_failed(summary):
+        failed = [result["table"] for result in summary["tables"] if result["status"] == "failed"]
+        print(f"Error: {len(failed)} tables failed: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    return 0
+
 # Main program
 if __name__ == "__main__":
-    print("Welcome to the AdventureWorks Null Handler!")
+    args = build_parser().parse_args()
     
+    # Batch mode for cron and orchestrators: no prompts, non-zero exit on failure
+    if args.workbook:
+        sys.exit(run_batch(args))
+    
+    print("Welcome to the AdventureWorks Null Handler!")
     # Get the file path first
     file_path = input("Enter the path to your Excel file (e.g., D:/finaaaaalllllll  project.xlsx): ")
     
     # Check if file exists
-    if not os.path.exists(file_path):
+    if not source_exists(file_path):
         print(f"Error: File not found at {file_path}")
         print("Please check the path and try again.")
         input("Press Enter to exit...")
-        exit()
+        sys.exit(1)
     
     # Show menu and process choice
     while True:
         choice = show_main_menu()
         
         if choice == '1':
-            process_adventure_works_nulls(file_path)
+            process_adventure_works_nulls(file_path, workers=args.workers,
+                                          output_format=args.output_format,
+                                          report=not args.quiet,
+                                          chunk_rows=args.chunk_rows,
+                                          incremental=args.incremental,
+                                          compact=args.compact)
         elif choice == '2':
-            process_selected_tables(file_path)
+            process_selected_tables(file_path, workers=args.workers,
+                                    output_format=args.output_format,
+                                    report=not args.quiet,
+                                    chunk_rows=args.chunk_rows)
         elif choice == '3':
             # Show available tables
-            handlers = {
-                "Production WorkOrder": clean_workorder,
-                "Production ProductInventory": clean_productinventory,
-                "Production Product": clean_product,
-                "Sales SalesOrderHeader": clean_salesorderheader,
-                "Sales SalesOrderDetail": clean_salesorderdetail,
-                "Person Address": clean_address,
-                "Person Person": clean_person,
-                "Production BillOfMaterials": clean_billofmaterials,
-                "Sales Customer": clean_customer,
-                "Sales SalesPerson": clean_salesperson,
-                "Purchasing Vendor": clean_vendor,
-                "HumanResources Employee": clean_employee,
-                "Sales vStoreWithAddresses": clean_vstorewithaddresses,
-                "Sales vSalesPerson": clean_vsalesperson,
-                "Sales vIndividualCustomer": clean_vindividualcustomer
-            }
+            handlers = TABLE_HANDLERS
             
             print("\nAvailable tables:")
             for i, table in enumerate(handlers.keys(), 1):
@@ -666,7 +1836,8 @@ if __name__ == "__main__":
                 table_idx = int(table_choice) - 1
                 if 0 <= table_idx < len(handlers):
                     table_name = list(handlers.keys())[table_idx]
-                    process_single_table(file_path, table_name)
+                    process_single_table(file_path, table_name, args.output_format,
+                                         not args.quiet)
                 else:
                     print("Invalid table number.")
             except ValueError:
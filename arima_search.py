@@ -0,0 +1,289 @@
+# =============================================================================
+# ARIMA Order Search
+# =============================================================================
+#
+# Searches the (p,d,q)(P,D,Q,s) grid for the monthly sales series across a
+# process pool, replacing the auto_arima call that forecast_arima.py had
+# to cap at max_p=3, max_q=3. Like auto_arima, d and D are chosen up front
+# by unit-root and seasonal-strength tests, since criteria are not
+# comparable across differencing orders. The remaining orders are fitted
+# level by level (level = p+q+P+Q), and an order is only fitted when one
+# of the orders a term below it converged within PRUNE_MARGIN of the best
+# criterion so far.
+#
+# The chosen orders and their fitted parameters are cached on disk, keyed
+# by a hash of the series, so metrics_arima.py, sales_forecast.py and
+# final_forecast.py rebuild the fit with fitted_arima instead of
+# retraining.
+#
+#   python arima_search.py AdventureWorks_Clean_20250427120000 --workers 4
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+# Search space; s is the seasonal period of the monthly series
+ARIMA_GRID = {
+    "p": range(0, 6),
+    "d": range(0, 3),
+    "q": range(0, 6),
+    "P": range(0, 3),
+    "D": range(0, 2),
+    "Q": range(0, 3),
+    "s": 12
+}
+
+# Orders whose parent fit scored worse than best + PRUNE_MARGIN are skipped
+PRUNE_MARGIN = 10.0
+
+# KPSS p-value below which the series is differenced once more
+STATIONARITY_ALPHA = 0.05
+# Seasonal strength above which the series is seasonally differenced
+SEASONAL_STRENGTH = 0.64
+
+ARIMA_CACHE_DIR = "arima"
+
+# =============================================================================
+# Fitting
+# =============================================================================
+
+def series_hash(series):
+    """Hash the dates and values of a series"""
+    digest = hashlib.sha256()
+    digest.update(np.asarray(series.index.astype("int64")).tobytes())
+    digest.update(np.asarray(series, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def order_fits_series(order, seasonal_order, observations):
+    """Whether the series is long enough to estimate an order at all"""
+    p, d, q = order
+    P, D, Q, s = seasonal_order
+    usable = observations - d - D * s - max(p, P * s)
+    parameters = p + q + P + Q + 1
+    return usable > 2 * parameters
+
+def fit_order(series, order, seasonal_order):
+    """Fit one order and return its criteria and parameters, or its error"""
+    from statsmodels.tsa.arima.model import ARIMA
+    result = {"order": list(order), "seasonal_order": list(seasonal_order)}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fitted = ARIMA(series, order=order, seasonal_order=seasonal_order).fit()
+        result.update(
+            aic=float(fitted.aic),
+            bic=float(fitted.bic),
+            converged=bool(fitted.mle_retvals.get("converged", True)) if fitted.mle_retvals else True,
+            params=[float(value) for value in fitted.params],
+            param_names=list(fitted.model.param_names),
+            error=None
+        )
+    except Exception as e:
+        result.update(aic=None, bic=None, converged=False, params=None, param_names=None, error=str(e))
+    return result
+
+def choose_differencing(series, grid):
+    """Pick d by repeated KPSS tests and D by the STL seasonal strength"""
+    from statsmodels.tsa.seasonal import STL
+    from statsmodels.tsa.stattools import kpss
+    
+    values = np.asarray(series, dtype=np.float64)
+    s = grid["s"]
+    D = 0
+    # Needs at least three full seasons to measure seasonality
+    if max(grid["D"]) >= 1 and len(values) >= 3 * s:
+        decomposition = STL(values, period=s).fit()
+        remainder = np.var(decomposition.resid)
+        strength = max(0.0, 1 - remainder / np.var(decomposition.seasonal + decomposition.resid))
+        if strength > SEASONAL_STRENGTH:
+            D = 1
+            values = values[s:] - values[:-s]
+    
+    d = min(grid["d"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        while d < max(grid["d"]) and len(values) > 3 and kpss(np.diff(values, d))[1] < STATIONARITY_ALPHA:
+            d += 1
+    return d, D
+
+def grid_orders(grid, observations):
+    """All (order, seasonal_order) pairs of a grid the series can support, by level"""
+    levels = {}
+    for p, d, q, P, D, Q in product(grid["p"], grid["d"], grid["q"], grid["P"], grid["D"], grid["Q"]):
+        seasonal_order = (P, D, Q, grid["s"] if P or D or Q else 0)
+        if order_fits_series((p, d, q), seasonal_order, observations):
+            levels.setdefault(p + q + P + Q, []).append(((p, d, q), seasonal_order))
+    return [levels[level] for level in sorted(levels)]
+
+def parents(order, seasonal_order, s):
+    """Orders with one autoregressive or moving-average term less"""
+    p, d, q = order
+    P, D, Q, _ = seasonal_order
+    candidates = []
+    for dp, dq, dP, dQ in ((1, 0, 0, 0), (0, 1, 0, 0), (0, 0, 1, 0), (0, 0, 0, 1)):
+        if p >= dp and q >= dq and P >= dP and Q >= dQ:
+            parent_P, parent_Q = P - dP, Q - dQ
+            parent_s = s if parent_P or D or parent_Q else 0
+            candidates.append(((p - dp, d, q - dq), (parent_P, D, parent_Q, parent_s)))
+    return candidates
+
+def order_key(order, seasonal_order):
+    """Hashable key of an order pair"""
+    return tuple(order), tuple(seasonal_order)
+
+# =============================================================================
+# Search
+# =============================================================================
+
+def run_search(series, grid, workers, criterion):
+    """Fit the grid level by level, pruning orders whose parents scored badly"""
+    results = {}
+    best = np.inf
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for level, candidates in enumerate(grid_orders(grid, len(series))):
+            if level:
+                # Fit only orders with at least one promising parent
+                candidates = [
+                    (order, seasonal_order) for order, seasonal_order in candidates
+                    if any(
+                        (parent := results.get(order_key(*pair))) is not None
+                        and parent[criterion] is not None and parent["converged"]
+                        and parent[criterion] <= best + PRUNE_MARGIN
+                        for pair in parents(order, seasonal_order, grid["s"])
+                    )
+                ]
+            if not candidates:
+                break
+            
+            if executor:
+                fits = list(executor.map(fit_order, [series] * len(candidates),
+                                         *zip(*candidates)))
+            else:
+                fits = [fit_order(series, order, seasonal_order) for order, seasonal_order in candidates]
+            
+            for fit in fits:
+                results[order_key(fit["order"], fit["seasonal_order"])] = fit
+                if fit[criterion] is not None and fit["converged"]:
+                    best = min(best, fit[criterion])
+            print(f"  Level {level}: fitted {len(candidates)} orders, best {criterion.upper()} {best:.2f}")
+    finally:
+        if executor:
+            executor.shutdown()
+    return list(results.values())
+
+def read_cached(cache_path):
+    """Load a cached search, or None when there is none"""
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path) as handle:
+        return json.load(handle)
+
+def write_cached(cache_path, record):
+    """Store a search or fit record as JSON"""
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    with open(cache_path, "w") as handle:
+        json.dump(record, handle, indent=2)
+
+def search_arima(series, cache_dir, grid=None, workers=None, criterion="aic", refresh=False):
+    """Return the best order of a series, searching the grid only when it is not cached
+
+    The record holds the best order, seasonal_order, criterion value and
+    fitted params, plus every fitted order in "results".
+    """
+    grid = grid or ARIMA_GRID
+    workers = workers or os.cpu_count() or 1
+    grid_spec = {name: list(values) if not isinstance(values, int) else values for name, values in grid.items()}
+    key = hashlib.sha256(json.dumps([series_hash(series), grid_spec, criterion, PRUNE_MARGIN],
+                                    sort_keys=True).encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"search_{key[:16]}.json")
+    
+    cached = None if refresh else read_cached(cache_path)
+    if cached is not None:
+        print(f"Using cached ARIMA search: {cached['order']}{cached['seasonal_order']}")
+        return cached
+    
+    d, D = choose_differencing(series, grid)
+    print(f"Searching ARIMA orders for {len(series)} observations on {workers} workers (d={d}, D={D})")
+    results = run_search(series, dict(grid, d=[d], D=[D]), workers, criterion)
+    fitted = [result for result in results if result[criterion] is not None and result["converged"]]
+    if not fitted:
+        raise ValueError("No ARIMA order could be fitted to the series")
+    best = min(fitted, key=lambda result: result[criterion])
+    
+    record = dict(best, criterion=criterion, series_hash=series_hash(series),
+                  fitted_orders=len(results), results=results)
+    write_cached(cache_path, record)
+    # Also cache the winning fit, so fitted_arima reuses it
+    write_cached(fit_cache_path(cache_dir, series, best["order"], best["seasonal_order"]), best)
+    print(f"Best ARIMA order: {best['order']}{best['seasonal_order']} "
+          f"{criterion.upper()} {best[criterion]:.2f} ({len(results)} orders fitted)")
+    return record
+
+# =============================================================================
+# Fitted Model Cache
+# =============================================================================
+
+def fit_cache_path(cache_dir, series, order, seasonal_order):
+    """Cache file of one order fitted to one series"""
+    key = hashlib.sha256(json.dumps([series_hash(series), list(order), list(seasonal_order)]).encode())
+    return os.path.join(cache_dir, f"fit_{key.hexdigest()[:16]}.json")
+
+def fitted_arima(series, cache_dir, order=None, seasonal_order=None):
+    """Statsmodels results for an order on a series, rebuilt from cached parameters
+
+    Without an order the best order of search_arima is used. The first
+    call for a series and order fits and caches the parameters; later
+    calls only run the Kalman smoother with them, which is enough for
+    forecast() and summary().
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+    if order is None:
+        best = search_arima(series, cache_dir)
+        order, seasonal_order = best["order"], best["seasonal_order"]
+    seasonal_order = seasonal_order or (0, 0, 0, 0)
+    
+    cache_path = fit_cache_path(cache_dir, series, order, seasonal_order)
+    fit = read_cached(cache_path)
+    if fit is None or fit["params"] is None:
+        fit = fit_order(series, tuple(order), tuple(seasonal_order))
+        if fit["error"]:
+            raise ValueError(f"ARIMA{tuple(order)}{tuple(seasonal_order)} failed: {fit['error']}")
+        write_cached(cache_path, fit)
+    
+    model = ARIMA(series, order=tuple(order), seasonal_order=tuple(seasonal_order))
+    return model.smooth(np.array(fit["params"]))
+
+if __name__ == "__main__":
+    from monthly_sales import FORECAST_CACHE_DIR, find_run_dir, monthly_sales
+    
+    parser = argparse.ArgumentParser(description="Parallel ARIMA order search for the monthly sales series")
+    parser.add_argument("run_dir", nargs="?", help="null handler output directory (default: newest run)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--criterion", default="aic", choices=["aic", "bic"])
+    parser.add_argument("--train-share", type=float, default=1.0,
+                        help="search on the first share of the months, e.g. 0.8 for the scripts' split")
+    parser.add_argument("--refresh", action="store_true", help="search again even when cached")
+    args = parser.parse_args()
+    
+    try:
+        run_dir = args.run_dir or find_run_dir()
+        series = monthly_sales(run_dir)["MonthlySales"]
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    series = series.iloc[:int(len(series) * args.train_share)]
+    
+    record = search_arima(series, os.path.join(run_dir, FORECAST_CACHE_DIR, ARIMA_CACHE_DIR),
+                          workers=args.workers, criterion=args.criterion, refresh=args.refresh)
+    top = pd.DataFrame([result for result in record["results"] if result[args.criterion] is not None])
+    print(top.sort_values(args.criterion)[["order", "seasonal_order", "aic", "bic", "converged"]]
+          .head(10).to_string(index=False))
@@ -0,0 +1,212 @@
+# =============================================================================
+# Rolling-Origin Backtesting
+# =============================================================================
+#
+# Evaluates the forecasting models of the ML scripts (moving averages over
+# 3, 6 and 12 months, ARIMA and Prophet) over rolling origins of the
+# monthly sales series and prints one comparison table, replacing the
+# input() prompts of compare_models.py and the single 80/20 split of the
+# metrics_*.py scripts.
+#
+# Moving-average forecasts for every window and origin come from one
+# cumulative sum; the ARIMA and Prophet fits run across a process pool.
+#
+#   python backtest.py AdventureWorks_Clean_20250427120000 --horizon 6
+
+import argparse
+import logging
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+MA_WINDOWS = [3, 6, 12]
+
+# Orders metrics_arima.py and final_forecast.py settled on
+ARIMA_ORDER = (2, 1, 0)
+ARIMA_SEASONAL_ORDER = (0, 0, 0, 12)
+
+# Prophet settings of metrics_prophet.py
+PROPHET_OPTIONS = {
+    "yearly_seasonality": True,
+    "weekly_seasonality": False,
+    "daily_seasonality": False,
+    "seasonality_mode": "multiplicative"
+}
+
+# =============================================================================
+# Origins and Metrics
+# =============================================================================
+
+def rolling_origins(observations, initial, step=1):
+    """Indexes of the first forecast month of every origin"""
+    if initial >= observations:
+        raise ValueError(f"Need more than {initial} observations for the first origin, got {observations}")
+    return np.arange(initial, observations, step)
+
+def actuals_matrix(values, origins, horizon):
+    """Actual values per (origin, step ahead), NaN past the end of the series"""
+    positions = origins[:, None] + np.arange(horizon)[None, :]
+    valid = positions < len(values)
+    return np.where(valid, values[np.minimum(positions, len(values) - 1)], np.nan)
+
+def error_metrics(actuals, forecasts):
+    """RMSE, MAE and MAPE over every (origin, step) that has an actual and a forecast"""
+    mask = ~np.isnan(actuals) & ~np.isnan(forecasts)
+    errors = forecasts[mask] - actuals[mask]
+    nonzero = actuals[mask] != 0
+    return {
+        "RMSE": float(np.sqrt(np.mean(errors ** 2))) if mask.any() else np.nan,
+        "MAE": float(np.mean(np.abs(errors))) if mask.any() else np.nan,
+        "MAPE": float(np.mean(np.abs(errors[nonzero] / actuals[mask][nonzero])) * 100) if nonzero.any() else np.nan,
+        "Forecasts": int(mask.sum())
+    }
+
+# =============================================================================
+# Models
+# =============================================================================
+
+def moving_average_forecasts(values, origins, windows, horizon):
+    """Flat forecasts of the mean of the last w months, for every window and origin at once
+
+    Returns an array of shape (windows, origins, horizon); origins with
+    fewer than w months of history are NaN.
+    """
+    cumulative = np.concatenate([[0.0], np.cumsum(values, dtype=np.float64)])
+    windows = np.asarray(windows)[:, None]
+    starts = origins[None, :] - windows
+    means = (cumulative[origins][None, :] - cumulative[np.maximum(starts, 0)]) / windows
+    means = np.where(starts >= 0, means, np.nan)
+    return np.repeat(means[:, :, None], horizon, axis=2)
+
+def forecast_arima(train, horizon, order=ARIMA_ORDER, seasonal_order=ARIMA_SEASONAL_ORDER):
+    """Fit ARIMA on one training window and forecast horizon months"""
+    from statsmodels.tsa.arima.model import ARIMA
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fitted = ARIMA(train, order=order, seasonal_order=seasonal_order).fit()
+    return np.asarray(fitted.forecast(steps=horizon), dtype=np.float64)
+
+def forecast_prophet(train, horizon, options=None):
+    """Fit Prophet on one training window and forecast horizon months"""
+    from prophet import Prophet
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    model = Prophet(**(options or PROPHET_OPTIONS))
+    model.fit(pd.DataFrame({"ds": train.index, "y": train.to_numpy()}))
+    future = model.make_future_dataframe(periods=horizon, freq="MS")
+    return model.predict(future)["yhat"].to_numpy()[-horizon:]
+
+# Models fitted once per origin, by name
+FITTED_MODELS = {
+    "ARIMA": forecast_arima,
+    "Prophet": forecast_prophet
+}
+
+def forecast_origin(model_name, train, horizon, options):
+    """Forecast one origin with a fitted model, NaN when the fit fails"""
+    try:
+        return FITTED_MODELS[model_name](train, horizon, **options)
+    except Exception as e:
+        print(f"  {model_name} failed at origin {train.index[-1]:%Y-%m}: {str(e)}")
+        return np.full(horizon, np.nan)
+
+# =============================================================================
+# Backtest
+# =============================================================================
+
+def backtest(series, initial=24, horizon=6, step=1, windows=None, models=None,
+             workers=None, model_options=None):
+    """Backtest the moving averages and fitted models over rolling origins
+
+    Returns {"comparison": one row per model sorted by RMSE,
+    "forecasts": a long frame with every origin, step, actual and forecast}.
+    model_options maps a model name to extra keyword arguments, e.g.
+    {"ARIMA": {"order": (1, 1, 1)}}.
+    """
+    windows = windows or MA_WINDOWS
+    models = list(FITTED_MODELS) if models is None else models
+    model_options = model_options or {}
+    values = series.to_numpy(dtype=np.float64)
+    origins = rolling_origins(len(values), initial, step)
+    actuals = actuals_matrix(values, origins, horizon)
+    
+    forecasts = {}
+    for window, matrix in zip(windows, moving_average_forecasts(values, origins, windows, horizon)):
+        forecasts[f"Moving Average (window={window})"] = matrix
+    
+    tasks = [(name, series.iloc[:origin], horizon, model_options.get(name, {}))
+             for name in models for origin in origins]
+    if tasks:
+        workers = workers or os.cpu_count() or 1
+        print(f"Fitting {len(tasks)} models over {len(origins)} origins on {workers} workers")
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(forecast_origin, *zip(*tasks)))
+        else:
+            results = [forecast_origin(*task) for task in tasks]
+        for i, name in enumerate(models):
+            forecasts[name] = np.vstack(results[i * len(origins):(i + 1) * len(origins)])
+    
+    comparison = pd.DataFrame([
+        dict(Model=name, **error_metrics(actuals, matrix)) for name, matrix in forecasts.items()
+    ]).sort_values("RMSE", ignore_index=True)
+    
+    steps = np.arange(1, horizon + 1)
+    long = pd.concat([
+        pd.DataFrame({
+            "Model": name,
+            "Origin": np.repeat(series.index[origins], horizon),
+            "StepsAhead": np.tile(steps, len(origins)),
+            "Actual": actuals.ravel(),
+            "Forecast": matrix.ravel()
+        }) for name, matrix in forecasts.items()
+    ], ignore_index=True)
+    return {"comparison": comparison, "forecasts": long.dropna(subset=["Actual"])}
+
+if __name__ == "__main__":
+    from monthly_sales import FORECAST_CACHE_DIR, find_run_dir, monthly_sales
+    
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the monthly sales forecasts")
+    parser.add_argument("run_dir", nargs="?", help="null handler output directory (default: newest run)")
+    parser.add_argument("--initial", type=int, default=24, help="months in the first training window")
+    parser.add_argument("--horizon", type=int, default=6, help="months forecast from each origin")
+    parser.add_argument("--step", type=int, default=1, help="months between origins")
+    parser.add_argument("--models", nargs="*", default=list(FITTED_MODELS), choices=list(FITTED_MODELS),
+                        help="fitted models to include next to the moving averages")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--search-arima", action="store_true",
+                        help="use the arima_search order found on the first training window")
+    args = parser.parse_args()
+    
+    try:
+        run_dir = args.run_dir or find_run_dir()
+        series = monthly_sales(run_dir)["MonthlySales"]
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    model_options = {}
+    if args.search_arima and "ARIMA" in args.models:
+        from arima_search import ARIMA_CACHE_DIR, search_arima
+        # Searched on the first window only, so later origins are not leaked into the order
+        best = search_arima(series.iloc[:args.initial],
+                            os.path.join(run_dir, FORECAST_CACHE_DIR, ARIMA_CACHE_DIR), workers=args.workers)
+        model_options["ARIMA"] = {"order": tuple(best["order"]),
+                                  "seasonal_order": tuple(best["seasonal_order"])}
+    
+    try:
+        result = backtest(series, args.initial, args.horizon, args.step, models=args.models,
+                          workers=args.workers, model_options=model_options)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    output_path = os.path.join(run_dir, FORECAST_CACHE_DIR, "backtest_comparison.csv")
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    result["comparison"].to_csv(output_path, index=False)
+    print("\nModel Comparison (sorted by RMSE):")
+    print(result["comparison"].to_string(index=False))
+    print(f"Saved comparison to {output_path}")
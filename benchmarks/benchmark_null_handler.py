@@ -0,0 +1,160 @@
+# =============================================================================
+# Null Handler Benchmark
+# =============================================================================
+#
+# Times the full cleaning run and every table handler against synthetic
+# workbooks at several scales, and appends the results as JSON lines so
+# runs can be compared across commits.
+#
+#   python benchmarks/benchmark_null_handler.py --scales 1 10 --format parquet
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+# cleaned_tables lives at the repository root
+sys.path.insert(0, REPO_DIR)
+
+from cleaned_tables import load_null_handler
+from synthetic_workbook import generate_workbook
+
+DEFAULT_DATA_DIR = os.path.join(BENCHMARK_DIR, "data")
+DEFAULT_RESULTS = os.path.join(BENCHMARK_DIR, "results.jsonl")
+
+# =============================================================================
+# Setup
+# =============================================================================
+
+def git_revision():
+    """Short hash of the checked out commit, or None outside a git checkout"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def workbook_path(data_dir, scale, source_format, seed):
+    """Generate the synthetic workbook for a scale once and reuse it afterwards"""
+    name = f"aw_scale{scale:g}_seed{seed}"
+    extension = {"xlsx": ".xlsx", "sqlite": ".db"}.get(source_format, "")
+    path = os.path.join(data_dir, name + extension)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"Generating scale {scale:g} workbook...")
+        generate_workbook(path, scale, source_format, seed)
+    # The null handler reads databases through a URL
+    return f"sqlite:///{path}" if source_format == "sqlite" else path
+
+# =============================================================================
+# Benchmarks
+# =============================================================================
+
+def bench_handlers(nh, file_path, repeat=3):
+    """Time every table handler on in-memory copies of the loaded sheets"""
+    frames = nh.load_sheets(file_path, list(nh.TABLE_HANDLERS))
+    results = []
+    for table_name, handler_func in nh.TABLE_HANDLERS.items():
+        if table_name not in frames:
+            continue
+        df = frames[table_name]
+        walls = []
+        tracemalloc.start()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            handler_func(file_path, df=df.copy(), report=False)
+            walls.append(time.perf_counter() - start)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        
+        best = min(walls)
+        results.append({
+            "table": table_name,
+            "rows": len(df),
+            "best_seconds": best,
+            "mean_seconds": sum(walls) / len(walls),
+            "rows_per_second": len(df) / best if best else None,
+            "peak_traced_bytes": peak
+        })
+    return results
+
+def bench_full_run(nh, file_path, output_format, workers, chunk_rows):
+    """Time process_adventure_works_nulls end to end, returning its stage records"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        summary = nh.process_adventure_works_nulls(
+            file_path, output_dir=output_dir, workers=workers, output_format=output_format,
+            report=False, chunk_rows=chunk_rows, profile=True
+        )
+    return {
+        "failed": nh.run_failed(summary),
+        "rows": sum(result["rows_in"] or 0 for result in summary["tables"]),
+        "timings": summary["timings"],
+        "stages": summary["stages"],
+        "tables": {result["table"]: result["stages"] for result in summary["tables"]}
+    }
+
+def print_results(scale, handlers, full_run):
+    """Print a compact table of the handler and full run results"""
+    print(f"\n=== Scale {scale:g} ===")
+    print(f"{'Table':<32}{'Rows':>10}{'Best s':>10}{'Rows/s':>14}{'Peak MB':>10}")
+    for result in handlers:
+        print(f"{result['table']:<32}{result['rows']:>10}{result['best_seconds']:>10.4f}"
+              f"{result['rows_per_second'] or 0:>14,.0f}{result['peak_traced_bytes'] / 2 ** 20:>10.1f}")
+    timings = ", ".join(f"{stage} {seconds:.3f}s" for stage, seconds in full_run["timings"].items())
+    print(f"Full run ({full_run['rows']} rows): {timings}")
+
+def append_results(results_path, record):
+    """Append one benchmark record to the JSON lines results file"""
+    with open(results_path, "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the AdventureWorks null handler")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0],
+                        help="multiples of the original row counts")
+    parser.add_argument("--source-format", default="parquet", choices=["xlsx", "parquet", "csv", "sqlite"],
+                        help="how the synthetic workbook is stored; xlsx only fits up to ~8x")
+    parser.add_argument("--format", dest="output_format", default="parquet",
+                        help="output format of the full run")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-rows", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3, help="handler timing repetitions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--results", default=DEFAULT_RESULTS)
+    args = parser.parse_args(argv)
+    
+    nh = load_null_handler()
+    revision = git_revision()
+    for scale in args.scales:
+        file_path = workbook_path(args.data_dir, scale, args.source_format, args.seed)
+        handlers = bench_handlers(nh, file_path, args.repeat)
+        full_run = bench_full_run(nh, file_path, args.output_format, args.workers, args.chunk_rows)
+        print_results(scale, handlers, full_run)
+        
+        append_results(args.results, {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": revision,
+            "scale": scale,
+            "source_format": args.source_format,
+            "output_format": args.output_format,
+            "workers": args.workers,
+            "chunk_rows": args.chunk_rows,
+            "handlers": handlers,
+            "full_run": full_run
+        })
+        if full_run["failed"]:
+            print("Some tables failed during the full run")
+            return 1
+    print(f"\nResults appended to {args.results}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
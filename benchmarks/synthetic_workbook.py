@@ -0,0 +1,527 @@
+# =============================================================================
+# Synthetic AdventureWorks Workbook Generator
+# =============================================================================
+#
+# Builds workbooks with the 15 sheets the null handler cleans, using the
+# AdventureWorks columns and the null ratios documented in NULL_RULES, at
+# any scale of the original row counts, plus the ProductCategory,
+# ProductSubcategory and SalesTerritory lookups the sales analyses join
+# on. Foreign keys resolve between the generated tables.
+#
+# xlsx caps a sheet at 1,048,576 rows, so scales above ~8x have to be
+# written as a directory of <Table_Name>.parquet or .csv files, which the
+# null handler accepts as a source as well. The sqlite format writes a
+# local stand-in for the SQL Server database, with tables named like
+# "Sales.SalesOrderDetail", to read through sqlite:///<path>.
+
+import argparse
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# Row counts of the AdventureWorks 2019 export at scale 1
+BASE_ROWS = {
+    "Production WorkOrder": 72591,
+    "Production ProductInventory": 1069,
+    "Production Product": 504,
+    "Sales SalesOrderHeader": 31465,
+    "Sales SalesOrderDetail": 121317,
+    "Person Address": 19614,
+    "Person Person": 19972,
+    "Production BillOfMaterials": 2679,
+    "Sales Customer": 19820,
+    "Sales SalesPerson": 17,
+    "Purchasing Vendor": 104,
+    "HumanResources Employee": 290,
+    "Sales vStoreWithAddresses": 712,
+    "Sales vSalesPerson": 17,
+    "Sales vIndividualCustomer": 18508
+}
+
+EXCEL_MAX_ROWS = 1048576
+
+# Levels below the top-level products in the synthetic bill of materials
+BOM_DEPTH = 4
+
+# Lookup tables the null handler does not clean, but the sales analyses
+# join against; their size does not scale
+PRODUCT_CATEGORIES = ["Bikes", "Components", "Clothing", "Accessories"]
+PRODUCT_SUBCATEGORIES = [
+    (1, "Mountain Bikes"), (1, "Road Bikes"), (1, "Touring Bikes"),
+    (2, "Handlebars"), (2, "Bottom Brackets"), (2, "Brakes"), (2, "Chains"), (2, "Cranksets"),
+    (2, "Derailleurs"), (2, "Forks"), (2, "Headsets"), (2, "Mountain Frames"), (2, "Pedals"),
+    (2, "Road Frames"), (2, "Saddles"), (2, "Touring Frames"), (2, "Wheels"),
+    (3, "Bib-Shorts"), (3, "Caps"), (3, "Gloves"), (3, "Jerseys"), (3, "Shorts"), (3, "Socks"),
+    (3, "Tights"), (3, "Vests"),
+    (4, "Bike Racks"), (4, "Bike Stands"), (4, "Bottles and Cages"), (4, "Cleaners"), (4, "Fenders"),
+    (4, "Helmets"), (4, "Hydration Packs"), (4, "Lights"), (4, "Locks"), (4, "Panniers"), (4, "Pumps"),
+    (4, "Tires and Tubes")
+]
+SALES_TERRITORIES = [
+    ("Northwest", "US", "North America"), ("Northeast", "US", "North America"),
+    ("Central", "US", "North America"), ("Southwest", "US", "North America"),
+    ("Southeast", "US", "North America"), ("Canada", "CA", "North America"),
+    ("France", "FR", "Europe"), ("Germany", "DE", "Europe"),
+    ("Australia", "AU", "Pacific"), ("United Kingdom", "GB", "Europe")
+]
+
+ORDER_START = pd.Timestamp("2011-05-31")
+ORDER_END = pd.Timestamp("2014-06-30")
+
+# =============================================================================
+# Helpers
+# =============================================================================
+
+def null_mask(rng, n, ratio):
+    """Boolean mask with exactly round(n * ratio) True values at random rows"""
+    mask = np.zeros(n, dtype=bool)
+    mask[rng.permutation(n)[:int(round(n * ratio))]] = True
+    return mask
+
+def with_nulls(values, mask):
+    """Return values as a Series with the masked rows set to null"""
+    series = pd.Series(values)
+    if series.dtype.kind in "iub":
+        series = series.astype("float64")
+    elif series.dtype.kind != "f" and series.dtype.kind != "M":
+        series = series.astype(object)
+    series[mask] = None
+    return series
+
+def random_dates(rng, n, start=ORDER_START, end=ORDER_END):
+    """Uniformly distributed dates at day precision"""
+    days = (end - start).days
+    return start + pd.to_timedelta(rng.integers(0, days + 1, n), unit="D")
+
+def scaled(table_name, scale):
+    """Row count of a table at the given scale, at least one row"""
+    return max(1, int(round(BASE_ROWS[table_name] * scale)))
+
+def codes(prefix, ids, width=5):
+    """Build codes like SO43659 from integer ids"""
+    return [f"{prefix}{i:0{width}d}" for i in ids]
+
+# =============================================================================
+# Table Generators
+# =============================================================================
+
+def make_product(rng, n):
+    """Production Product"""
+    ids = np.arange(1, n + 1)
+    product = pd.DataFrame({
+        "ProductID": ids,
+        "Name": [f"Product {i}" for i in ids],
+        "ProductNumber": codes("PN-", ids),
+        "MakeFlag": rng.integers(0, 2, n),
+        "FinishedGoodsFlag": rng.integers(0, 2, n),
+        "Color": with_nulls(rng.choice(["Black", "Silver", "Red", "Yellow", "Blue", "Multi"], n),
+                            null_mask(rng, n, 0.492)),
+        "SafetyStockLevel": rng.choice([4, 100, 500, 800, 1000], n),
+        "ReorderPoint": rng.choice([3, 75, 375, 600, 750], n),
+        "StandardCost": rng.gamma(2.0, 200.0, n).round(4),
+        "ListPrice": rng.gamma(2.0, 400.0, n).round(4)
+    })
+    # Size mixes letters and numbers, like the export
+    sizes = np.array(["S", "M", "L", "XL", "38", "40", "42", "44", "48", "52"], dtype=object)
+    size_mask = null_mask(rng, n, 0.581)
+    product["Size"] = with_nulls(rng.choice(sizes, n), size_mask)
+    product["SizeUnitMeasureCode"] = with_nulls(np.full(n, "CM", dtype=object), null_mask(rng, n, 0.651))
+    weight_mask = null_mask(rng, n, 0.593)
+    product["WeightUnitMeasureCode"] = with_nulls(np.full(n, "LB", dtype=object), weight_mask)
+    product["Weight"] = with_nulls(rng.gamma(2.0, 10.0, n).round(2), weight_mask)
+    product["DaysToManufacture"] = rng.integers(0, 5, n)
+    product["ProductLine"] = with_nulls(rng.choice(["R", "M", "T", "S"], n), null_mask(rng, n, 0.448))
+    product["Class"] = with_nulls(rng.choice(["L", "M", "H"], n), null_mask(rng, n, 0.510))
+    product["Style"] = with_nulls(rng.choice(["U", "M", "W"], n), null_mask(rng, n, 0.581))
+    # Components without a subcategory also have no model
+    category_mask = null_mask(rng, n, 0.415)
+    product["ProductSubcategoryID"] = with_nulls(rng.integers(1, len(PRODUCT_SUBCATEGORIES) + 1, n), category_mask)
+    product["ProductModelID"] = with_nulls(rng.integers(1, 129, n), category_mask)
+    product["SellStartDate"] = random_dates(rng, n, pd.Timestamp("2008-04-30"), pd.Timestamp("2013-05-30"))
+    product["SellEndDate"] = with_nulls(random_dates(rng, n, pd.Timestamp("2012-05-29"), pd.Timestamp("2013-05-29")),
+                                        null_mask(rng, n, 0.806))
+    product["DiscontinuedDate"] = with_nulls(random_dates(rng, n), np.ones(n, dtype=bool))
+    product["ModifiedDate"] = pd.Timestamp("2014-02-08")
+    return product
+
+def make_workorder(rng, n, product_ids):
+    """Production WorkOrder"""
+    start = random_dates(rng, n)
+    qty = rng.integers(1, 200, n)
+    scrap_mask = null_mask(rng, n, 0.989)
+    return pd.DataFrame({
+        "WorkOrderID": np.arange(1, n + 1),
+        "ProductID": rng.choice(product_ids, n),
+        "OrderQty": qty,
+        "StockedQty": qty,
+        "ScrappedQty": np.where(scrap_mask, 0, rng.integers(1, 5, n)),
+        "StartDate": start,
+        "EndDate": start + pd.to_timedelta(rng.integers(5, 20, n), unit="D"),
+        "DueDate": start + pd.to_timedelta(11, unit="D"),
+        "ScrapReasonID": with_nulls(rng.integers(1, 17, n), scrap_mask),
+        "ModifiedDate": start + pd.to_timedelta(11, unit="D")
+    })
+
+def make_productinventory(rng, n, product_ids):
+    """Production ProductInventory"""
+    return pd.DataFrame({
+        "ProductID": rng.choice(product_ids, n),
+        "LocationID": rng.choice([1, 6, 7, 10, 20, 30, 40, 45, 50, 60], n),
+        "Shelf": with_nulls(rng.choice(list("ABCDEFGHIJKLMNOPQR"), n), null_mask(rng, n, 0.271)),
+        "Bin": rng.integers(0, 62, n),
+        "Quantity": rng.integers(0, 1000, n),
+        "ModifiedDate": random_dates(rng, n)
+    })
+
+def make_customer(rng, n, n_territories, n_stores, person_ids):
+    """Sales Customer"""
+    # 93.3% individuals (StoreID null), 3.5% stores (PersonID null), the rest both
+    kind = rng.permutation(np.repeat([0, 1, 2], [n - int(round(n * 0.035)) - int(round(n * 0.032)),
+                                                 int(round(n * 0.035)), int(round(n * 0.032))]))
+    ids = np.arange(1, n + 1)
+    return pd.DataFrame({
+        "CustomerID": ids,
+        "PersonID": with_nulls(rng.choice(person_ids, n), kind == 1),
+        "StoreID": with_nulls(rng.integers(1, n_stores + 1, n), kind == 0),
+        "TerritoryID": rng.integers(1, n_territories + 1, n),
+        "AccountNumber": codes("AW", ids, 8),
+        "ModifiedDate": random_dates(rng, n)
+    })
+
+def make_salesperson(rng, n, n_territories):
+    """Sales SalesPerson"""
+    # Salespeople without a territory have no quota either
+    mask = null_mask(rng, n, 3 / 17)
+    return pd.DataFrame({
+        "BusinessEntityID": np.arange(274, 274 + n),
+        "TerritoryID": with_nulls(rng.integers(1, n_territories + 1, n), mask),
+        "SalesQuota": with_nulls(rng.choice([250000.0, 300000.0], n), mask),
+        "Bonus": rng.choice([0.0, 500.0, 2000.0, 5000.0], n),
+        "CommissionPct": rng.choice([0.0, 0.01, 0.015, 0.019], n),
+        "SalesYTD": rng.gamma(2.0, 1500000.0, n).round(4),
+        "SalesLastYear": rng.gamma(2.0, 1000000.0, n).round(4)
+    })
+
+def make_salesorderheader(rng, n, customer_ids, salesperson_ids, n_territories):
+    """Sales SalesOrderHeader"""
+    ids = np.arange(43659, 43659 + n)
+    order_date = random_dates(rng, n)
+    # Online orders have neither a purchase order nor a salesperson
+    online = null_mask(rng, n, 0.879)
+    card_mask = null_mask(rng, n, 0.036)
+    subtotal = rng.gamma(1.2, 3000.0, n).round(4)
+    tax = (subtotal * 0.08).round(4)
+    freight = (subtotal * 0.025).round(4)
+    return pd.DataFrame({
+        "SalesOrderID": ids,
+        "RevisionNumber": 8,
+        "OrderDate": order_date,
+        "DueDate": order_date + pd.to_timedelta(12, unit="D"),
+        "ShipDate": order_date + pd.to_timedelta(7, unit="D"),
+        "Status": 5,
+        "OnlineOrderFlag": online.astype(int),
+        "SalesOrderNumber": codes("SO", ids),
+        "PurchaseOrderNumber": with_nulls(codes("PO", rng.integers(1, 10 ** 9, n), 10), online),
+        "AccountNumber": codes("10-4020-", rng.integers(1, 10 ** 6, n), 6),
+        "CustomerID": rng.choice(customer_ids, n),
+        "SalesPersonID": with_nulls(rng.choice(salesperson_ids, n), online),
+        "TerritoryID": rng.integers(1, n_territories + 1, n),
+        "BillToAddressID": rng.integers(1, 30000, n),
+        "ShipToAddressID": rng.integers(1, 30000, n),
+        "ShipMethodID": rng.choice([1, 5], n),
+        "CreditCardID": with_nulls(rng.integers(1, 19238, n), card_mask),
+        "CreditCardApprovalCode": with_nulls(codes("", rng.integers(1, 10 ** 9, n), 10), card_mask),
+        "CurrencyRateID": with_nulls(rng.integers(1, 13532, n), null_mask(rng, n, 0.556)),
+        "SubTotal": subtotal,
+        "TaxAmt": tax,
+        "Freight": freight,
+        "TotalDue": subtotal + tax + freight,
+        "Comment": with_nulls(np.full(n, "", dtype=object), np.ones(n, dtype=bool)),
+        "ModifiedDate": order_date + pd.to_timedelta(7, unit="D")
+    })
+
+def make_salesorderdetail(rng, n, order_ids, product_ids):
+    """Sales SalesOrderDetail"""
+    order_id = np.sort(rng.choice(order_ids, n))
+    qty = rng.integers(1, 10, n)
+    price = rng.gamma(2.0, 300.0, n).round(4)
+    discount = rng.choice([0.0, 0.0, 0.0, 0.02, 0.05, 0.1], n)
+    return pd.DataFrame({
+        "SalesOrderID": order_id,
+        "SalesOrderDetailID": np.arange(1, n + 1),
+        "CarrierTrackingNumber": with_nulls(
+            [f"{a:04X}-{b:04X}-{c:02X}" for a, b, c in rng.integers(0, 65536, (n, 3))],
+            null_mask(rng, n, 0.498)
+        ),
+        "OrderQty": qty,
+        "ProductID": rng.choice(product_ids, n),
+        "SpecialOfferID": rng.integers(1, 17, n),
+        "UnitPrice": price,
+        "UnitPriceDiscount": discount,
+        "LineTotal": (qty * price * (1 - discount)).round(6),
+        "ModifiedDate": random_dates(rng, n)
+    })
+
+def make_address(rng, n):
+    """Person Address"""
+    return pd.DataFrame({
+        "AddressID": np.arange(1, n + 1),
+        "AddressLine1": [f"{i} Main St." for i in rng.integers(1, 9999, n)],
+        "AddressLine2": with_nulls(rng.choice(["Suite 100", "Unit B", "# 3"], n), null_mask(rng, n, 0.982)),
+        "City": rng.choice(["Seattle", "London", "Paris", "Melbourne", "Bothell", "Toronto"], n),
+        "StateProvinceID": rng.integers(1, 182, n),
+        "PostalCode": codes("", rng.integers(10000, 99999, n)),
+        "ModifiedDate": random_dates(rng, n)
+    })
+
+def make_person(rng, n):
+    """Person Person"""
+    return pd.DataFrame({
+        "BusinessEntityID": np.arange(1, n + 1),
+        "PersonType": rng.choice(["IN", "SC", "EM", "VC", "GC", "SP"], n),
+        "NameStyle": 0,
+        "Title": with_nulls(rng.choice(["Mr.", "Ms.", "Mrs.", "Sr."], n), null_mask(rng, n, 0.949)),
+        "FirstName": rng.choice(["Ken", "Terri", "Rob", "Gail", "Jossef", "Dylan"], n),
+        "MiddleName": with_nulls(rng.choice(list("ABCDEFGHJKLM"), n), null_mask(rng, n, 0.426)),
+        "LastName": rng.choice(["Sanchez", "Duffy", "Tamburello", "Walters", "Erickson"], n),
+        "Suffix": with_nulls(rng.choice(["Jr.", "Sr.", "II"], n), null_mask(rng, n, 0.997)),
+        "EmailPromotion": rng.integers(0, 3, n),
+        "ModifiedDate": random_dates(rng, n)
+    })
+
+def make_billofmaterials(rng, n, product_ids):
+    """Production BillOfMaterials"""
+    top_level = null_mask(rng, n, 0.038)
+    start = random_dates(rng, n, pd.Timestamp("2010-05-26"), pd.Timestamp("2010-12-23"))
+    
+    # Products are split into BOM_DEPTH + 1 tiers and every assembly is
+    # built from the next tier down, so the BOM has no cycles
+    products = np.sort(product_ids)
+    bounds = np.linspace(0, len(products), BOM_DEPTH + 2).astype(int)
+    tier = rng.integers(0, BOM_DEPTH, n)
+    def pick(tiers):
+        return products[bounds[tiers] + (rng.random(n) * (bounds[tiers + 1] - bounds[tiers])).astype(int)]
+    
+    return pd.DataFrame({
+        "BillOfMaterialsID": np.arange(1, n + 1),
+        "ProductAssemblyID": with_nulls(pick(tier), top_level),
+        "ComponentID": pick(tier + 1),
+        "StartDate": start,
+        "EndDate": with_nulls(start + pd.to_timedelta(365, unit="D"), null_mask(rng, n, 0.926)),
+        "UnitMeasureCode": rng.choice(["EA", "IN", "OZ"], n),
+        "BOMLevel": np.where(top_level, 0, tier + 1),
+        "PerAssemblyQty": rng.choice([1.0, 1.0, 2.0, 3.0, 4.0], n),
+        "ModifiedDate": start
+    })
+
+def make_vendor(rng, n):
+    """Purchasing Vendor"""
+    ids = np.arange(1492, 1492 + n)
+    return pd.DataFrame({
+        "BusinessEntityID": ids,
+        "AccountNumber": codes("VENDOR", ids, 4),
+        "Name": [f"Vendor {i}" for i in ids],
+        "CreditRating": rng.integers(1, 6, n),
+        "PreferredVendorStatus": rng.integers(0, 2, n),
+        "ActiveFlag": rng.integers(0, 2, n),
+        "PurchasingWebServiceURL": with_nulls([f"www.vendor{i}.com/" for i in ids], null_mask(rng, n, 0.942)),
+        "ModifiedDate": random_dates(rng, n)
+    })
+
+def make_employee(rng, n):
+    """HumanResources Employee with hierarchyid paths like /1/3/2/"""
+    # Row 0 is the CEO at the root, with a null OrganizationNode; every
+    # other employee reports to a random earlier employee
+    paths = [None]
+    children = [0]
+    for i in range(1, n):
+        parent = int(rng.integers(0, i))
+        children[parent] += 1
+        paths.append(f"{paths[parent] or '/'}{children[parent]}/")
+        children.append(0)
+    levels = [np.nan] + [path.count("/") - 1 for path in paths[1:]]
+    ids = np.arange(1, n + 1)
+    return pd.DataFrame({
+        "BusinessEntityID": ids,
+        "NationalIDNumber": codes("", rng.integers(10 ** 8, 10 ** 9, n), 9),
+        "LoginID": [f"adventure-works\\employee{i}" for i in ids],
+        "OrganizationNode": pd.Series(paths, dtype=object),
+        "OrganizationLevel": levels,
+        "JobTitle": ["Chief Executive Officer"] + list(rng.choice(
+            ["Vice President", "Manager", "Supervisor", "Technician", "Sales Representative"], n - 1)),
+        "BirthDate": random_dates(rng, n, pd.Timestamp("1951-01-01"), pd.Timestamp("1991-01-01")),
+        "MaritalStatus": rng.choice(["M", "S"], n),
+        "Gender": rng.choice(["M", "F"], n),
+        "HireDate": random_dates(rng, n, pd.Timestamp("2006-06-30"), pd.Timestamp("2013-05-30")),
+        "SalariedFlag": rng.integers(0, 2, n),
+        "VacationHours": rng.integers(0, 100, n),
+        "SickLeaveHours": rng.integers(20, 80, n)
+    })
+
+def make_vstorewithaddresses(rng, n):
+    """Sales vStoreWithAddresses"""
+    return pd.DataFrame({
+        "BusinessEntityID": np.arange(292, 292 + n),
+        "Name": [f"Store {i}" for i in range(n)],
+        "AddressType": "Main Office",
+        "AddressLine1": [f"{i} Commerce Way" for i in rng.integers(1, 9999, n)],
+        "AddressLine2": with_nulls(rng.choice(["Suite 100", "Unit B"], n), null_mask(rng, n, 0.954)),
+        "City": rng.choice(["Seattle", "London", "Paris", "Melbourne"], n),
+        "StateProvinceName": rng.choice(["Washington", "England", "Ile-de-France", "Victoria"], n),
+        "PostalCode": codes("", rng.integers(10000, 99999, n)),
+        "CountryRegionName": rng.choice(["United States", "United Kingdom", "France", "Australia"], n)
+    })
+
+def make_vsalesperson(rng, n, n_territories):
+    """Sales vSalesPerson"""
+    territory_mask = null_mask(rng, n, 3 / 17)
+    territory = rng.integers(1, n_territories + 1, n)
+    return pd.DataFrame({
+        "BusinessEntityID": np.arange(274, 274 + n),
+        "Title": with_nulls(rng.choice(["Mr.", "Ms."], n), null_mask(rng, n, 16 / 17)),
+        "FirstName": rng.choice(["Stephen", "Michael", "Linda", "Jillian"], n),
+        "MiddleName": with_nulls(rng.choice(list("ABCDEFG"), n), null_mask(rng, n, 7 / 17)),
+        "LastName": rng.choice(["Jiang", "Blythe", "Mitchell", "Carson"], n),
+        "Suffix": with_nulls(rng.choice(["Jr."], n), null_mask(rng, n, 16 / 17)),
+        "JobTitle": "Sales Representative",
+        "EmailAddress": [f"sales{i}@adventure-works.com" for i in range(n)],
+        "AddressLine1": [f"{i} Sales Blvd." for i in rng.integers(1, 9999, n)],
+        "AddressLine2": with_nulls(np.full(n, "", dtype=object), np.ones(n, dtype=bool)),
+        "City": rng.choice(["Bothell", "Seattle", "Portland"], n),
+        "TerritoryName": with_nulls([f"Territory {t}" for t in territory], territory_mask),
+        "TerritoryGroup": with_nulls(rng.choice(["North America", "Europe", "Pacific"], n), territory_mask),
+        "SalesQuota": with_nulls(rng.choice([250000.0, 300000.0], n), territory_mask),
+        "SalesYTD": rng.gamma(2.0, 1500000.0, n).round(4),
+        "SalesLastYear": rng.gamma(2.0, 1000000.0, n).round(4)
+    })
+
+def make_vindividualcustomer(rng, n):
+    """Sales vIndividualCustomer"""
+    return pd.DataFrame({
+        "BusinessEntityID": np.arange(1699, 1699 + n),
+        "Title": with_nulls(rng.choice(["Mr.", "Ms.", "Mrs."], n), null_mask(rng, n, 0.949)),
+        "FirstName": rng.choice(["Jon", "Eugene", "Ruben", "Christy"], n),
+        "MiddleName": with_nulls(rng.choice(list("ABCDEFG"), n), null_mask(rng, n, 0.426)),
+        "LastName": rng.choice(["Yang", "Huang", "Torres", "Zhu"], n),
+        "Suffix": with_nulls(rng.choice(["Jr.", "III"], n), null_mask(rng, n, 0.997)),
+        "EmailAddress": [f"customer{i}@adventure-works.com" for i in range(n)],
+        "AddressLine1": [f"{i} Oak Ave." for i in rng.integers(1, 9999, n)],
+        "AddressLine2": with_nulls(rng.choice(["Unit A", "# 10"], n), null_mask(rng, n, 0.982)),
+        "City": rng.choice(["Seattle", "London", "Paris", "Melbourne"], n),
+        "CountryRegionName": rng.choice(["United States", "United Kingdom", "France", "Australia"], n)
+    })
+
+def make_lookups():
+    """Production ProductCategory, Production ProductSubcategory and Sales SalesTerritory"""
+    return {
+        "Production ProductCategory": pd.DataFrame({
+            "ProductCategoryID": np.arange(1, len(PRODUCT_CATEGORIES) + 1),
+            "Name": PRODUCT_CATEGORIES
+        }),
+        "Production ProductSubcategory": pd.DataFrame({
+            "ProductSubcategoryID": np.arange(1, len(PRODUCT_SUBCATEGORIES) + 1),
+            "ProductCategoryID": [category for category, _ in PRODUCT_SUBCATEGORIES],
+            "Name": [name for _, name in PRODUCT_SUBCATEGORIES]
+        }),
+        "Sales SalesTerritory": pd.DataFrame({
+            "TerritoryID": np.arange(1, len(SALES_TERRITORIES) + 1),
+            "Name": [name for name, _, _ in SALES_TERRITORIES],
+            "CountryRegionCode": [code for _, code, _ in SALES_TERRITORIES],
+            "Group": [group for _, _, group in SALES_TERRITORIES]
+        })
+    }
+
+# =============================================================================
+# Workbook Builder
+# =============================================================================
+
+def generate_tables(scale=1.0, seed=0):
+    """Generate the 15 sheets at the given scale, plus the lookup sheets, as {sheet_name: DataFrame}"""
+    rng = np.random.default_rng(seed)
+    n = {table_name: scaled(table_name, scale) for table_name in BASE_ROWS}
+    n_territories = len(SALES_TERRITORIES)
+    
+    tables = {}
+    tables["Production Product"] = make_product(rng, n["Production Product"])
+    product_ids = tables["Production Product"]["ProductID"].to_numpy()
+    
+    tables["Person Person"] = make_person(rng, n["Person Person"])
+    person_ids = tables["Person Person"]["BusinessEntityID"].to_numpy()
+    
+    tables["Sales SalesPerson"] = make_salesperson(rng, n["Sales SalesPerson"], n_territories)
+    tables["Sales Customer"] = make_customer(rng, n["Sales Customer"], n_territories,
+                                             n["Sales vStoreWithAddresses"], person_ids)
+    tables["Sales SalesOrderHeader"] = make_salesorderheader(
+        rng, n["Sales SalesOrderHeader"],
+        tables["Sales Customer"]["CustomerID"].to_numpy(),
+        tables["Sales SalesPerson"]["BusinessEntityID"].to_numpy(),
+        n_territories
+    )
+    tables["Sales SalesOrderDetail"] = make_salesorderdetail(
+        rng, n["Sales SalesOrderDetail"],
+        tables["Sales SalesOrderHeader"]["SalesOrderID"].to_numpy(), product_ids
+    )
+    tables["Production WorkOrder"] = make_workorder(rng, n["Production WorkOrder"], product_ids)
+    tables["Production ProductInventory"] = make_productinventory(rng, n["Production ProductInventory"], product_ids)
+    tables["Person Address"] = make_address(rng, n["Person Address"])
+    tables["Production BillOfMaterials"] = make_billofmaterials(rng, n["Production BillOfMaterials"], product_ids)
+    tables["Purchasing Vendor"] = make_vendor(rng, n["Purchasing Vendor"])
+    tables["HumanResources Employee"] = make_employee(rng, n["HumanResources Employee"])
+    tables["Sales vStoreWithAddresses"] = make_vstorewithaddresses(rng, n["Sales vStoreWithAddresses"])
+    tables["Sales vSalesPerson"] = make_vsalesperson(rng, n["Sales vSalesPerson"], n_territories)
+    tables["Sales vIndividualCustomer"] = make_vindividualcustomer(rng, n["Sales vIndividualCustomer"])
+    
+    # Keep the sheet order of the export
+    ordered = {table_name: tables[table_name] for table_name in BASE_ROWS}
+    ordered.update(make_lookups())
+    return ordered
+
+def write_workbook(tables, output_path, output_format="xlsx"):
+    """Write the tables as one xlsx workbook, a directory of parquet/csv files or a SQLite database"""
+    if output_format == "xlsx":
+        too_large = [name for name, df in tables.items() if len(df) >= EXCEL_MAX_ROWS]
+        if too_large:
+            raise ValueError(f"Sheets exceed the xlsx row limit, use parquet or csv: {', '.join(too_large)}")
+        with pd.ExcelWriter(output_path) as writer:
+            for table_name, df in tables.items():
+                df.to_excel(writer, sheet_name=table_name, index=False)
+    elif output_format in ("parquet", "csv"):
+        os.makedirs(output_path, exist_ok=True)
+        for table_name, df in tables.items():
+            table_file = os.path.join(output_path, f"{table_name.replace(' ', '_')}.{output_format}")
+            if output_format == "parquet":
+                # Size mixes str and int, which Arrow cannot store in one column
+                if "Size" in df.columns:
+                    df = df.assign(Size=df["Size"].map(lambda v: v if v is None else str(v)))
+                df.to_parquet(table_file, index=False)
+            else:
+                df.to_csv(table_file, index=False)
+    elif output_format == "sqlite":
+        with sqlite3.connect(output_path) as connection:
+            for table_name, df in tables.items():
+                schema, _, table = table_name.partition(" ")
+                df.to_sql(f"{schema}.{table}", connection, if_exists="replace", index=False)
+        connection.close()
+    else:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    print(f"Saved synthetic workbook to {output_path}")
+
+def generate_workbook(output_path, scale=1.0, output_format="xlsx", seed=0):
+    """Generate and write a synthetic workbook, returning its row counts"""
+    tables = generate_tables(scale, seed)
+    write_workbook(tables, output_path, output_format)
+    return {table_name: len(df) for table_name, df in tables.items()}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic AdventureWorks workbook")
+    parser.add_argument("output", help="xlsx file, or directory for parquet/csv output")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiple of the original row counts")
+    parser.add_argument("--format", dest="output_format", default="xlsx", choices=["xlsx", "parquet", "csv", "sqlite"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rows = generate_workbook(args.output, args.scale, args.output_format, args.seed)
+    for table_name, count in rows.items():
+        print(f"  {table_name}: {count} rows")
@@ -0,0 +1,293 @@
+# =============================================================================
+# Bill of Materials Index
+# =============================================================================
+#
+# Multi-level explosion, where-used and rolled-up quantities over the
+# cleaned Production BillOfMaterials, without the recursive CTEs the
+# Supply Chain report runs against SQL Server. Only active rows, those
+# with a null EndDate, are indexed; rows whose ProductAssemblyID is the
+# -1 (or <NA>) fill of clean_billofmaterials are top-level components
+# and add no edge.
+#
+# Products get dense node numbers and the edges are stored as two
+# adjacency arrays in CSR form: assembly -> components for explosion and
+# component -> assemblies for where-used. A query walks all requested
+# products one level at a time, expanding the whole frontier with array
+# operations. Results are cached per product and query in the run's
+# bom_cache directory until the BOM table changes.
+#
+#   python bom_index.py AdventureWorks_Clean_20250427120000 --explode 749 750
+
+import argparse
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cleaned_tables import load_tables, tables_fingerprint
+
+BOM_CACHE_DIR = "bom_cache"
+BOM_CACHE_KEY = "cache_key.json"
+BOM_INDEX_FILE = "bom_index.npz"
+
+# Bump when the index layout or query output changes, to drop old caches
+BOM_VERSION = 1
+
+BOM_TABLE = "Production BillOfMaterials"
+BOM_COLUMNS = ["ProductAssemblyID", "ComponentID", "PerAssemblyQty", "EndDate"]
+
+# ProductAssemblyID fill of the null handler for top-level components
+TOP_LEVEL_ASSEMBLY = -1
+
+# =============================================================================
+# Index
+# =============================================================================
+
+def csr_arrays(source, target, qty, size):
+    """Adjacency arrays of edges source -> target: the edges of node i are indptr[i]:indptr[i+1]"""
+    order = np.argsort(source, kind="stable")
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(source, minlength=size), out=indptr[1:])
+    return {"indptr": indptr, "indices": target[order], "qty": qty[order]}
+
+def build_bom_index(bom):
+    """Index the active assembly -> component edges of a cleaned BillOfMaterials table"""
+    active = bom[bom["EndDate"].isna()]
+    assemblies = active["ProductAssemblyID"]
+    edges = active[assemblies.notna() & (assemblies != TOP_LEVEL_ASSEMBLY)]
+    
+    products = np.unique(np.concatenate([
+        edges["ProductAssemblyID"].to_numpy(dtype=np.int64),
+        active["ComponentID"].to_numpy(dtype=np.int64)
+    ]))
+    parents = np.searchsorted(products, edges["ProductAssemblyID"].to_numpy(dtype=np.int64))
+    children = np.searchsorted(products, edges["ComponentID"].to_numpy(dtype=np.int64))
+    qty = edges["PerAssemblyQty"].to_numpy(dtype=np.float64)
+    
+    index = {
+        "products": products,
+        "components": csr_arrays(parents, children, qty, len(products)),
+        "assemblies": csr_arrays(children, parents, qty, len(products))
+    }
+    
+    # Paths through a cycle never end, so such a BOM cannot be exploded
+    cyclic = cyclic_products(index)
+    if len(cyclic):
+        raise ValueError(f"{BOM_TABLE} has {len(cyclic)} products on assembly cycles, "
+                         f"e.g. {', '.join(map(str, cyclic[:10]))}")
+    return index
+
+def product_nodes(index, product_ids):
+    """(product IDs, node numbers) of the given products that are in the index"""
+    product_ids = np.asarray(product_ids, dtype=np.int64)
+    nodes = np.searchsorted(index["products"], product_ids)
+    known = nodes < len(index["products"])
+    known[known] = index["products"][nodes[known]] == product_ids[known]
+    return product_ids[known], nodes[known]
+
+def expand(csr, nodes):
+    """(frontier position, edge position) of every edge leaving the frontier nodes"""
+    starts = csr["indptr"][nodes]
+    counts = csr["indptr"][nodes + 1] - starts
+    owner = np.repeat(np.arange(len(nodes)), counts)
+    # Position of each edge within its node's run, offset by the run start
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, starts[owner] + offsets
+
+def cyclic_products(index):
+    """Products on a cycle of assemblies, found by peeling off products nothing feeds into"""
+    csr = index["components"]
+    size = len(index["products"])
+    indegree = np.bincount(csr["indices"], minlength=size)
+    frontier = np.flatnonzero(indegree == 0)
+    while len(frontier):
+        _, edges = expand(csr, frontier)
+        hits = np.bincount(csr["indices"][edges], minlength=size)
+        indegree -= hits
+        frontier = np.flatnonzero((indegree == 0) & (hits > 0))
+    return index["products"][indegree > 0]
+
+def traverse(index, direction, product_ids):
+    """Walk every path down ("components") or up ("assemblies") from the given products
+
+    Returns one row per edge reached: the product the walk started from,
+    the level, both ends of the edge, its PerAssemblyQty and the
+    quantity multiplied along the path.
+    """
+    csr = index[direction]
+    products = index["products"]
+    roots, frontier = product_nodes(index, product_ids)
+    frontier_roots = roots
+    frontier_qty = np.ones(len(frontier))
+    
+    levels = []
+    level = 0
+    while len(frontier):
+        level += 1
+        owner, edges = expand(csr, frontier)
+        reached = csr["indices"][edges]
+        qty = frontier_qty[owner] * csr["qty"][edges]
+        levels.append(pd.DataFrame({
+            "RootID": frontier_roots[owner],
+            "Level": level,
+            "FromID": products[frontier[owner]],
+            "ToID": products[reached],
+            "PerAssemblyQty": csr["qty"][edges],
+            "ExtendedQty": qty
+        }))
+        frontier, frontier_roots, frontier_qty = reached, frontier_roots[owner], qty
+    
+    if not levels:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in [
+            ("RootID", np.int64), ("Level", np.int64), ("FromID", np.int64), ("ToID", np.int64),
+            ("PerAssemblyQty", np.float64), ("ExtendedQty", np.float64)
+        ]})
+    return pd.concat(levels, ignore_index=True)
+
+# =============================================================================
+# Queries
+# =============================================================================
+
+def explode(index, assembly_ids):
+    """Every component below each assembly, with the quantity needed per assembly"""
+    return traverse(index, "components", assembly_ids).rename(
+        columns={"FromID": "ProductAssemblyID", "ToID": "ComponentID"}
+    )
+
+def where_used(index, component_ids):
+    """Every assembly above each component, with the components used per assembly"""
+    return traverse(index, "assemblies", component_ids).rename(
+        columns={"FromID": "ComponentID", "ToID": "ProductAssemblyID"}
+    )
+
+def rolled_up_quantities(index, assembly_ids):
+    """Total quantity of every leaf component needed to build one of each assembly"""
+    exploded = explode(index, assembly_ids)
+    indptr = index["components"]["indptr"]
+    nodes = np.searchsorted(index["products"], exploded["ComponentID"].to_numpy())
+    leaves = exploded[indptr[nodes + 1] == indptr[nodes]]
+    return leaves.groupby(["RootID", "ComponentID"], as_index=False).agg(
+        TotalQty=("ExtendedQty", "sum"),
+        Paths=("ExtendedQty", "size"),
+        MaxLevel=("Level", "max")
+    )
+
+# Queries answered per product; the result rows carry the product in RootID
+BOM_QUERIES = {
+    "explode": explode,
+    "where-used": where_used,
+    "rollup": rolled_up_quantities
+}
+
+# =============================================================================
+# Persistence
+# =============================================================================
+
+def save_bom_index(index, path):
+    """Store the index as a compressed .npz file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    arrays = {"products": index["products"]}
+    for direction in ("components", "assemblies"):
+        for name, values in index[direction].items():
+            arrays[f"{direction}_{name}"] = values
+    np.savez_compressed(path, **arrays)
+
+def load_bom_index(path):
+    """Load an index written by save_bom_index"""
+    with np.load(path) as data:
+        return {
+            "products": data["products"],
+            "components": {name: data[f"components_{name}"] for name in ("indptr", "indices", "qty")},
+            "assemblies": {name: data[f"assemblies_{name}"] for name in ("indptr", "indices", "qty")}
+        }
+
+def open_bom_cache(output_dir, source=None, refresh=False):
+    """Cache directory of a run, emptied when the BOM table changed since it was written"""
+    cache_dir = os.path.join(output_dir, BOM_CACHE_DIR)
+    key = f"{BOM_VERSION}:{tables_fingerprint(output_dir, [BOM_TABLE], source)}"
+    key_path = os.path.join(cache_dir, BOM_CACHE_KEY)
+    
+    cached_key = None
+    if os.path.exists(key_path):
+        with open(key_path) as handle:
+            cached_key = json.load(handle).get("key")
+    if refresh or cached_key != key:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        os.makedirs(cache_dir)
+        with open(key_path, "w") as handle:
+            json.dump({"key": key}, handle, indent=2)
+    return cache_dir
+
+def bom_index(output_dir, source=None, refresh=False):
+    """Index of a run's BOM, built from the cleaned table on the first call"""
+    index_path = os.path.join(open_bom_cache(output_dir, source, refresh), BOM_INDEX_FILE)
+    if os.path.exists(index_path):
+        return load_bom_index(index_path)
+    bom = load_tables(output_dir, {BOM_TABLE: BOM_COLUMNS}, source)[BOM_TABLE]
+    index = build_bom_index(bom)
+    save_bom_index(index, index_path)
+    print(f"Indexed {len(index['components']['indices'])} active BOM edges between "
+          f"{len(index['products'])} products", file=sys.stderr)
+    return index
+
+def bom_query(output_dir, query, product_ids, source=None, refresh=False):
+    """Answer a BOM_QUERIES query for several products, reusing cached per-product results
+
+    Products without a cached result are answered together in one
+    traversal, and each one's rows are cached on their own.
+    """
+    query_dir = os.path.join(open_bom_cache(output_dir, source, refresh), query)
+    os.makedirs(query_dir, exist_ok=True)
+    product_ids = [int(product_id) for product_id in product_ids]
+    
+    results = {}
+    for product_id in product_ids:
+        path = os.path.join(query_dir, f"{product_id}.parquet")
+        if os.path.exists(path):
+            results[product_id] = pd.read_parquet(path)
+    
+    missing = [product_id for product_id in dict.fromkeys(product_ids) if product_id not in results]
+    if missing:
+        answered = BOM_QUERIES[query](bom_index(output_dir, source), missing)
+        groups = dict(tuple(answered.groupby("RootID")))
+        for product_id in missing:
+            result = groups.get(product_id, answered.iloc[:0]).reset_index(drop=True)
+            result.to_parquet(os.path.join(query_dir, f"{product_id}.parquet"), index=False)
+            results[product_id] = result
+    
+    return pd.concat([results[product_id] for product_id in product_ids], ignore_index=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bill of materials explosion and where-used from a null handler run")
+    parser.add_argument("output_dir", help="directory the null handler wrote the cleaned tables to")
+    queries = parser.add_mutually_exclusive_group(required=True)
+    queries.add_argument("--explode", nargs="+", type=int, metavar="ASSEMBLY_ID",
+                         help="list every component below these assemblies")
+    queries.add_argument("--where-used", nargs="+", type=int, metavar="COMPONENT_ID",
+                         help="list every assembly above these components")
+    queries.add_argument("--rollup", nargs="+", type=int, metavar="ASSEMBLY_ID",
+                         help="total leaf component quantities per assembly")
+    parser.add_argument("--source", help="workbook, table directory or database URL the run was made from "
+                                         "(default: the run's source)")
+    parser.add_argument("--refresh", action="store_true", help="rebuild the index and drop cached results")
+    parser.add_argument("--export", metavar="PATH", help="write the result to PATH (.csv or .parquet)")
+    args = parser.parse_args()
+    
+    query = next(name for name in BOM_QUERIES if getattr(args, name.replace("-", "_")))
+    try:
+        result = bom_query(args.output_dir, query, getattr(args, query.replace("-", "_")),
+                           args.source, args.refresh)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    print(result.to_string(index=False))
+    if args.export:
+        if args.export.lower().endswith(".parquet"):
+            result.to_parquet(args.export, index=False)
+        else:
+            result.to_csv(args.export, index=False)
+        print(f"Saved {query} results to {args.export}")
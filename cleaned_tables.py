@@ -0,0 +1,123 @@
+# =============================================================================
+# Cleaned Table Loading
+# =============================================================================
+#
+# Shared loader for the analyses built on the null handler's output. It
+# finds a cleaned table in whichever layout the run was written in, and
+# reads lookup tables the handler does not clean, like
+# Production ProductCategory, from the source recorded in the run's
+# manifest.
+
+import hashlib
+import importlib.util
+import os
+import sys
+from contextlib import redirect_stdout
+
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+HANDLER_PATH = os.path.join(REPO_DIR, "NUll handler.py")
+
+# Layouts tried in order, columnar formats first
+CLEAN_FORMATS = ["parquet", "feather", "csv", "xlsx"]
+
+def load_null_handler():
+    """Import NUll handler.py, whose file name is not a valid module name"""
+    if "null_handler" in sys.modules:
+        return sys.modules["null_handler"]
+    spec = importlib.util.spec_from_file_location("null_handler", HANDLER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so worker pools can pickle its functions
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def find_clean_table(output_dir, table_name):
+    """Path of a cleaned table in any output layout, or None when it was not written"""
+    nh = load_null_handler()
+    for output_format in CLEAN_FORMATS:
+        table_file = nh.table_output_path(output_dir, table_name, output_format)
+        if os.path.exists(table_file):
+            return table_file
+    return None
+
+def read_clean_file(table_file, columns=None):
+    """Read a cleaned table file, restricted to columns when given"""
+    extension = os.path.splitext(table_file)[1].lower()
+    if extension == ".parquet":
+        return pd.read_parquet(table_file, columns=columns)
+    if extension == ".feather":
+        return pd.read_feather(table_file, columns=columns)
+    if extension == ".csv":
+        df = pd.read_csv(table_file, usecols=columns)
+    else:
+        df = pd.read_excel(table_file, usecols=columns)
+    
+    # Text formats lose the date type, which the analyses rely on
+    for column in df.columns:
+        if column.endswith("Date") and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+def run_source(output_dir):
+    """Source workbook, directory or database URL recorded in a run's manifest"""
+    manifest = load_null_handler().read_manifest(output_dir)
+    return manifest.get("source") if manifest else None
+
+def load_tables(output_dir, table_columns, source=None, missing_ok=False):
+    """Load {table: columns} as {table: DataFrame}
+
+    Cleaned tables are read from output_dir; the rest come from source,
+    by default the one the run was made from, in a single load_sheets
+    pass. columns may be None to read every column. With missing_ok,
+    tables found in neither place are left out instead of raising.
+    """
+    nh = load_null_handler()
+    frames = {}
+    missing = []
+    for table_name, columns in table_columns.items():
+        table_file = find_clean_table(output_dir, table_name)
+        if table_file is None:
+            missing.append(table_name)
+        else:
+            frames[table_name] = read_clean_file(table_file, columns)
+    
+    if missing:
+        source = source or run_source(output_dir)
+        if source is None:
+            if missing_ok:
+                return frames
+            raise FileNotFoundError(f"Not cleaned in {output_dir} and no source to read them from: "
+                                    f"{', '.join(missing)}")
+        # Keep the loader's progress messages off stdout
+        with redirect_stdout(sys.stderr):
+            raw = nh.load_sheets(source, missing)
+        for table_name in missing:
+            if table_name not in raw:
+                if missing_ok:
+                    continue
+                raise FileNotFoundError(f"{table_name} is neither in {output_dir} nor in {source}")
+            columns = table_columns[table_name]
+            frames[table_name] = raw[table_name] if columns is None else raw[table_name][columns]
+    return frames
+
+def tables_fingerprint(output_dir, table_names, source=None):
+    """Hash the path, size and modification time of every file the tables are read from
+
+    Database sources are identified by their URL only, so changes inside
+    the database are not detected.
+    """
+    nh = load_null_handler()
+    digest = hashlib.sha256()
+    source = source or run_source(output_dir)
+    for table_name in table_names:
+        table_file = find_clean_table(output_dir, table_name)
+        if table_file is None and source is not None and not nh.is_db_source(source):
+            table_file = nh.find_table_source(source, table_name)
+        if table_file is not None and os.path.exists(table_file):
+            stat = os.stat(table_file)
+            digest.update(f"{table_name}|{os.path.abspath(table_file)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+        else:
+            digest.update(f"{table_name}|{source}\n".encode())
+    return digest.hexdigest()
@@ -0,0 +1,242 @@
+# =============================================================================
+# Customer Retention
+# =============================================================================
+#
+# Computes the full cohort x period retention matrix from the cleaned
+# SalesOrderHeader in one pass, by year or by month. A customer's cohort
+# is the period of their first order; cell (cohort, k) counts the cohort's
+# customers that ordered k periods later. The 2011 -> 2012 rate of
+# SQLQueryfinal.sql is cell (2011, 1) over cell (2011, 0).
+#
+# Each customer's active periods are kept as a packed bitset, so new
+# orders only touch the customers that placed them, and applying the
+# same orders twice changes nothing.
+#
+#   python customer_retention.py AdventureWorks_Clean_20250427120000 --by month
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cleaned_tables import load_tables
+
+RETENTION_CACHE_DIR = "retention_cache"
+RETENTION_PERIODS = ("year", "month")
+
+# =============================================================================
+# Period Indexing
+# =============================================================================
+
+def order_periods(order_dates, by="year"):
+    """Integer period of every order: the year, or months since year 0"""
+    dates = pd.to_datetime(pd.Series(order_dates))
+    if by == "year":
+        return dates.dt.year.to_numpy(dtype=np.int64)
+    if by == "month":
+        return (dates.dt.year * 12 + dates.dt.month - 1).to_numpy(dtype=np.int64)
+    raise ValueError(f"Unsupported retention period: {by} (supported: {', '.join(RETENTION_PERIODS)})")
+
+def period_label(period, by="year"):
+    """Display label of an integer period, e.g. 2011 or 2011-05"""
+    if by == "year":
+        return str(period)
+    return f"{period // 12}-{period % 12 + 1:02d}"
+
+# =============================================================================
+# Retention State
+# =============================================================================
+
+def empty_retention(by="year"):
+    """State with no customers and no periods"""
+    return {
+        "by": by,
+        "origin": None,
+        "periods": 0,
+        "customers": np.empty(0, dtype=np.int64),
+        "bits": np.empty((0, 0), dtype=np.uint8),
+        "first": np.empty(0, dtype=np.int64),
+        "counts": np.zeros((0, 0), dtype=np.int64),
+        "last_order_id": None
+    }
+
+def unpack_bits(state, rows=None):
+    """Membership of the given customer rows as a bool matrix (rows x periods)"""
+    bits = state["bits"] if rows is None else state["bits"][rows]
+    return np.unpackbits(bits, axis=1, count=state["periods"]).astype(bool)
+
+def pack_bits(membership):
+    """Pack a bool matrix into one bit per period"""
+    return np.packbits(membership, axis=1)
+
+def cohort_counts(membership, first, periods, sign=1):
+    """Cohort x offset counts contributed by the given membership rows"""
+    rows, columns = np.nonzero(membership)
+    cells = first[rows] * periods + (columns - first[rows])
+    return sign * np.bincount(cells, minlength=periods * periods).reshape(periods, periods)
+
+def first_periods(membership):
+    """Offset of each row's first active period"""
+    return membership.argmax(axis=1)
+
+def resize_periods(state, origin, periods):
+    """Re-base the bitsets on a wider period range and rebuild the counts from them"""
+    membership = unpack_bits(state)
+    shift = state["origin"] - origin if state["origin"] is not None else 0
+    wide = np.zeros((len(membership), periods), dtype=bool)
+    wide[:, shift:shift + state["periods"]] = membership
+    
+    state["origin"] = origin
+    state["periods"] = periods
+    state["bits"] = pack_bits(wide)
+    state["first"] = first_periods(wide) if len(wide) else np.empty(0, dtype=np.int64)
+    state["counts"] = cohort_counts(wide, state["first"], periods)
+
+def update_retention(state, customer_ids, order_dates, order_ids=None):
+    """Fold new orders into the retention state in place and return it
+
+    Only the customers in the batch are unpacked and recounted, so an
+    update costs O(new orders x periods), not a rescan of all history.
+    order_ids, when given, advance state["last_order_id"] so callers can
+    select the orders that arrived since the last update.
+    """
+    customer_ids = np.asarray(customer_ids, dtype=np.int64)
+    if len(customer_ids) == 0:
+        return state
+    periods = order_periods(order_dates, state["by"])
+    
+    # Widen the period range when the batch falls outside it
+    low, high = periods.min(), periods.max()
+    if state["origin"] is None or low < state["origin"] or high >= state["origin"] + state["periods"]:
+        origin = low if state["origin"] is None else min(low, state["origin"])
+        end = high if state["origin"] is None else max(high, state["origin"] + state["periods"] - 1)
+        resize_periods(state, origin, end - origin + 1)
+    columns = periods - state["origin"]
+    
+    # Map customers to bitset rows, appending rows for new customers
+    rows = pd.Index(state["customers"]).get_indexer(customer_ids)
+    new_customers = pd.unique(customer_ids[rows < 0])
+    if len(new_customers):
+        start = len(state["customers"])
+        state["customers"] = np.concatenate([state["customers"], new_customers])
+        state["bits"] = np.vstack([state["bits"], np.zeros((len(new_customers), state["bits"].shape[1]),
+                                                           dtype=np.uint8)])
+        state["first"] = np.concatenate([state["first"], np.full(len(new_customers), -1)])
+        rows[rows < 0] = start + pd.Index(new_customers).get_indexer(customer_ids[rows < 0])
+    
+    # Swap the touched customers' old contribution for their new one,
+    # which also moves a customer whose first order was backdated
+    touched, positions = np.unique(rows, return_inverse=True)
+    old = unpack_bits(state, touched)
+    new = old.copy()
+    new[positions, columns] = True
+    
+    known = state["first"][touched] >= 0
+    state["counts"] += cohort_counts(old[known], state["first"][touched][known], state["periods"], sign=-1)
+    first = first_periods(new)
+    state["counts"] += cohort_counts(new, first, state["periods"])
+    state["first"][touched] = first
+    state["bits"][touched] = pack_bits(new)
+    
+    if order_ids is not None and len(order_ids):
+        last = int(np.max(order_ids))
+        state["last_order_id"] = last if state["last_order_id"] is None else max(last, state["last_order_id"])
+    return state
+
+def build_retention(orders, by="year"):
+    """Build the retention state from a frame with CustomerID, OrderDate and SalesOrderID"""
+    order_ids = orders["SalesOrderID"] if "SalesOrderID" in orders else None
+    return update_retention(empty_retention(by), orders["CustomerID"], orders["OrderDate"], order_ids)
+
+# =============================================================================
+# Results
+# =============================================================================
+
+def retention_matrix(state, rates=False):
+    """Cohort x periods-since-first-order counts, or with rates on their share of the cohort"""
+    counts = state["counts"]
+    labels = [period_label(state["origin"] + i, state["by"]) for i in range(state["periods"])]
+    matrix = pd.DataFrame(counts, index=pd.Index(labels, name="Cohort"),
+                          columns=pd.RangeIndex(state["periods"], name="PeriodsSinceFirstOrder"))
+    # Keep only cohorts that have customers
+    matrix = matrix[counts[:, 0] > 0]
+    if rates:
+        matrix = matrix.div(matrix[0], axis=0)
+    # Cells after the last observed period are unknown, not zero
+    for i, cohort in enumerate(matrix.index):
+        observable = state["periods"] - labels.index(cohort)
+        matrix.iloc[i, observable:] = np.nan
+    return matrix
+
+def next_period_retention(state):
+    """Per cohort: customers, those who ordered again the next period, and the rate in percent"""
+    matrix = retention_matrix(state)
+    result = pd.DataFrame({"Customers": matrix[0]})
+    if state["periods"] > 1:
+        result["ReturnedNextPeriod"] = matrix[1]
+        result["RetentionRatePercent"] = (matrix[1] / matrix[0] * 100).round(2)
+    return result
+
+# =============================================================================
+# Persistence
+# =============================================================================
+
+def save_retention(state, path):
+    """Store the retention state as a compressed .npz file"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    meta = {key: state[key] for key in ("by", "origin", "periods", "last_order_id")}
+    np.savez_compressed(path, customers=state["customers"], bits=state["bits"], first=state["first"],
+                        counts=state["counts"], meta=np.array(json.dumps(meta, default=int)))
+
+def load_retention(path):
+    """Load a state written by save_retention"""
+    with np.load(path) as data:
+        state = json.loads(str(data["meta"]))
+        for key in ("customers", "bits", "first", "counts"):
+            state[key] = data[key]
+    return state
+
+def refresh_retention(output_dir, by="year", rebuild=False):
+    """Update the cached retention state of a run with orders newer than the last applied one
+
+    Orders are matched by SalesOrderID, so changed or deleted historical
+    orders need rebuild to be reflected.
+    """
+    state_path = os.path.join(output_dir, RETENTION_CACHE_DIR, f"retention_{by}.npz")
+    orders = load_tables(output_dir, {
+        "Sales SalesOrderHeader": ["SalesOrderID", "CustomerID", "OrderDate"]
+    })["Sales SalesOrderHeader"]
+    
+    if rebuild or not os.path.exists(state_path):
+        state = build_retention(orders, by)
+        print(f"Built {by} retention from {len(orders)} orders")
+    else:
+        state = load_retention(state_path)
+        if state["last_order_id"] is not None:
+            orders = orders[orders["SalesOrderID"] > state["last_order_id"]]
+        update_retention(state, orders["CustomerID"], orders["OrderDate"], orders["SalesOrderID"])
+        print(f"Applied {len(orders)} new orders to the {by} retention")
+    save_retention(state, state_path)
+    return state
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cohort retention matrix from a null handler run")
+    parser.add_argument("output_dir", help="directory the null handler wrote the cleaned tables to")
+    parser.add_argument("--by", default="year", choices=RETENTION_PERIODS)
+    parser.add_argument("--rates", action="store_true", help="show retention rates instead of customer counts")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild from all orders instead of updating")
+    args = parser.parse_args()
+    
+    try:
+        state = refresh_retention(args.output_dir, args.by, args.rebuild)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    with pd.option_context("display.max_columns", None, "display.width", 200):
+        print(retention_matrix(state, args.rates).round(3).to_string())
+        print()
+        print(next_period_retention(state).to_string())
@@ -0,0 +1,255 @@
+# =============================================================================
+# RFM Customer Segmentation
+# =============================================================================
+#
+# Segments customers by recency, frequency and monetary value of their
+# orders in the cleaned SalesOrderHeader, replacing the fixed TotalSpent
+# thresholds of SQLQueryfinal.sql (High >= 10000, Mid 5000-9999, Low).
+# Each measure is scored 1-5 by rank quintile, customers with equal
+# values always sharing a score, and the R/F scores pick the segment;
+# segments are broken down by the CustomerType column that clean_customer
+# derives.
+#
+# Per-customer aggregates are kept as running state. A batch of new
+# orders updates and rescores only the customers in it against the
+# stored rank edges; the edges are recomputed over all customers once the
+# customer base has grown by RESCORE_GROWTH.
+#
+#   python customer_segments.py AdventureWorks_Clean_20250427120000
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cleaned_tables import load_tables
+
+SEGMENT_CACHE_DIR = "segment_cache"
+
+# Scores each measure is split into, by rank
+RFM_SCORES = 5
+
+# Recompute the bin edges once the customer count grew by this share
+RESCORE_GROWTH = 0.1
+
+# Segments by recency and frequency score; the first match wins
+RFM_SEGMENTS = [
+    ("Champions", lambda r, f: (r >= 4) & (f >= 4)),
+    ("Loyal Customers", lambda r, f: (r >= 3) & (f >= 3)),
+    ("Potential Loyalists", lambda r, f: (r >= 4) & (f >= 2)),
+    ("New Customers", lambda r, f: r >= 4),
+    ("At Risk", lambda r, f: (r <= 2) & (f >= 3)),
+    ("Hibernating", lambda r, f: r <= 2)
+]
+DEFAULT_SEGMENT = "Needs Attention"
+SEGMENT_NAMES = [name for name, _ in RFM_SEGMENTS] + [DEFAULT_SEGMENT]
+
+# =============================================================================
+# Scoring
+# =============================================================================
+
+def customer_aggregates(orders):
+    """Last order date, order count and total spent per customer"""
+    return orders.groupby("CustomerID").agg(
+        LastOrderDate=("OrderDate", "max"),
+        Frequency=("SalesOrderID", "count"),
+        Monetary=("TotalDue", "sum")
+    )
+
+def rank_edges(values):
+    """Largest value in each of the first four rank quintiles of the values"""
+    ordered = np.sort(values)
+    return [ordered[-(-score * len(values) // RFM_SCORES) - 1].item() for score in range(1, RFM_SCORES)]
+
+def score_values(values, edges):
+    """Score 1 + the number of rank edges below each value
+
+    Values equal to an edge get the lower score, so a run of tied values
+    spanning several quintiles shares the lowest of them.
+    """
+    return np.searchsorted(edges, values, side="left") + 1
+
+def assign_segments(recency, frequency):
+    """Segment name of every customer from its R and F scores"""
+    return pd.Categorical(
+        np.select([rule(recency, frequency) for _, rule in RFM_SEGMENTS],
+                  [name for name, _ in RFM_SEGMENTS], default=DEFAULT_SEGMENT),
+        categories=SEGMENT_NAMES
+    )
+
+def rfm_measures(customers):
+    """The three measures as arrays; recency as the last order date in ns, later is better"""
+    return {
+        "R": customers["LastOrderDate"].to_numpy(dtype="datetime64[ns]").astype(np.int64),
+        "F": customers["Frequency"].to_numpy(),
+        "M": customers["Monetary"].to_numpy()
+    }
+
+def score_customers(customers, edges):
+    """Set the R, F, M scores and the segment of the given customer rows"""
+    measures = rfm_measures(customers)
+    for score, values in measures.items():
+        customers[score] = score_values(values, edges[score]).astype(np.int8)
+    customers["Segment"] = assign_segments(customers["R"].to_numpy(), customers["F"].to_numpy())
+    return customers
+
+def rescore_rfm(state):
+    """Recompute the rank edges over all customers and rescore everyone against them
+
+    Later batches are scored against the same edges, so they get the
+    scores a rescore with these edges would give.
+    """
+    measures = rfm_measures(state["customers"])
+    state["edges"] = {score: rank_edges(values) for score, values in measures.items()}
+    state["scored_customers"] = len(state["customers"])
+    score_customers(state["customers"], state["edges"])
+    return state
+
+# =============================================================================
+# Running State
+# =============================================================================
+
+def empty_rfm():
+    """State with no customers"""
+    customers = pd.DataFrame({
+        "LastOrderDate": pd.Series(dtype="datetime64[ns]"),
+        "Frequency": pd.Series(dtype=np.int64),
+        "Monetary": pd.Series(dtype=np.float64)
+    }, index=pd.Index([], dtype=np.int64, name="CustomerID"))
+    return {"customers": customers, "edges": None, "scored_customers": 0, "last_order_id": None}
+
+def update_rfm(state, orders):
+    """Fold a batch of orders (SalesOrderID, CustomerID, OrderDate, TotalDue) into the state
+
+    Only the customers in the batch are updated and rescored. Orders are
+    counted every time they are applied, so callers pass each order once;
+    state["last_order_id"] tracks the highest SalesOrderID applied.
+    """
+    if len(orders) == 0:
+        return state
+    orders = orders.assign(OrderDate=pd.to_datetime(orders["OrderDate"]))
+    batch = customer_aggregates(orders)
+    customers = state["customers"]
+    
+    known = batch.index.isin(customers.index)
+    seen = batch[known]
+    if len(seen):
+        current = customers.loc[seen.index]
+        customers.loc[seen.index, "LastOrderDate"] = np.maximum(current["LastOrderDate"], seen["LastOrderDate"])
+        customers.loc[seen.index, "Frequency"] = current["Frequency"] + seen["Frequency"]
+        customers.loc[seen.index, "Monetary"] = current["Monetary"] + seen["Monetary"]
+    if not known.all():
+        customers = pd.concat([customers, batch[~known]])
+    state["customers"] = customers
+    
+    last = int(orders["SalesOrderID"].max())
+    state["last_order_id"] = last if state["last_order_id"] is None else max(last, state["last_order_id"])
+    
+    if state["edges"] is None or len(customers) > state["scored_customers"] * (1 + RESCORE_GROWTH):
+        return rescore_rfm(state)
+    touched = customers.loc[batch.index].copy()
+    scored = score_customers(touched, state["edges"])
+    for column in ("R", "F", "M", "Segment"):
+        customers.loc[batch.index, column] = scored[column]
+    # New customers join with empty scores, which turns the columns to float
+    state["customers"] = customers.astype({"R": np.int8, "F": np.int8, "M": np.int8})
+    return state
+
+def build_rfm(orders):
+    """Build the RFM state from all orders"""
+    return update_rfm(empty_rfm(), orders)
+
+# =============================================================================
+# Results
+# =============================================================================
+
+def rfm_table(state, customer_types=None, as_of=None):
+    """One row per customer with recency in days, the scores, segment and CustomerType
+
+    as_of defaults to the latest order date; customer_types maps
+    CustomerID to CustomerType.
+    """
+    table = state["customers"].copy()
+    as_of = table["LastOrderDate"].max() if as_of is None else pd.Timestamp(as_of)
+    table.insert(0, "RecencyDays", (as_of - table["LastOrderDate"]).dt.days)
+    if customer_types is not None:
+        table["CustomerType"] = table.index.map(customer_types)
+    return table
+
+def segment_summary(table):
+    """Customers and average recency, frequency and spend per segment and CustomerType"""
+    keys = ["Segment", "CustomerType"] if "CustomerType" in table else ["Segment"]
+    return table.groupby(keys, observed=True).agg(
+        Customers=("Frequency", "size"),
+        AvgRecencyDays=("RecencyDays", "mean"),
+        AvgOrders=("Frequency", "mean"),
+        AvgSpent=("Monetary", "mean")
+    ).round(2).reset_index()
+
+# =============================================================================
+# Persistence
+# =============================================================================
+
+def save_rfm(state, cache_dir):
+    """Store the per-customer state as parquet and the bin edges as JSON"""
+    os.makedirs(cache_dir, exist_ok=True)
+    state["customers"].to_parquet(os.path.join(cache_dir, "rfm_customers.parquet"))
+    meta = {key: state[key] for key in ("edges", "scored_customers", "last_order_id")}
+    with open(os.path.join(cache_dir, "rfm_state.json"), "w") as handle:
+        json.dump(meta, handle, indent=2)
+
+def load_rfm(cache_dir):
+    """Load a state written by save_rfm, or None when there is none"""
+    meta_path = os.path.join(cache_dir, "rfm_state.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path) as handle:
+        state = json.load(handle)
+    state["customers"] = pd.read_parquet(os.path.join(cache_dir, "rfm_customers.parquet"))
+    return state
+
+def refresh_rfm(output_dir, rebuild=False):
+    """Update the cached RFM state of a run with orders newer than the last applied one"""
+    cache_dir = os.path.join(output_dir, SEGMENT_CACHE_DIR)
+    tables = load_tables(output_dir, {
+        "Sales SalesOrderHeader": ["SalesOrderID", "CustomerID", "OrderDate", "TotalDue"],
+        "Sales Customer": ["CustomerID", "CustomerType"]
+    })
+    orders = tables["Sales SalesOrderHeader"]
+    customer_types = tables["Sales Customer"].set_index("CustomerID")["CustomerType"]
+    
+    state = None if rebuild else load_rfm(cache_dir)
+    if state is None:
+        state = build_rfm(orders)
+        print(f"Built RFM state from {len(orders)} orders")
+    else:
+        if state["last_order_id"] is not None:
+            orders = orders[orders["SalesOrderID"] > state["last_order_id"]]
+        update_rfm(state, orders)
+        print(f"Applied {len(orders)} new orders to the RFM state")
+    save_rfm(state, cache_dir)
+    return rfm_table(state, customer_types)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RFM customer segments from a null handler run")
+    parser.add_argument("output_dir", help="directory the null handler wrote the cleaned tables to")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild from all orders instead of updating")
+    parser.add_argument("--export", metavar="PATH", help="write the per-customer table to PATH (.csv or .parquet)")
+    args = parser.parse_args()
+    
+    try:
+        table = refresh_rfm(args.output_dir, args.rebuild)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    print(segment_summary(table).to_string(index=False))
+    if args.export:
+        if args.export.lower().endswith(".parquet"):
+            table.to_parquet(args.export)
+        else:
+            table.to_csv(args.export)
+        print(f"Saved customer segments to {args.export}")
@@ -0,0 +1,245 @@
+# =============================================================================
+# Employee Hierarchy
+# =============================================================================
+#
+# Turns the OrganizationNode hierarchyid paths of the cleaned
+# HumanResources Employee table, like /1/3/2/, into a closure table with
+# one (AncestorID, DescendantID, Distance) row for every employee and
+# each of their managers, themselves included at distance 0. The row
+# with the null OrganizationNode, the top executive clean_employee
+# keeps, is the root /. Span of control, depth and rollups over
+# everyone below a manager are then a single join and groupby.
+#
+# An employee's closure rows only depend on the paths above them, so a
+# refresh recomputes just the subtrees whose paths or owners changed.
+#
+#   python employee_hierarchy.py AdventureWorks_Clean_20250427120000 --rollup VacationHours
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cleaned_tables import load_tables
+
+HIERARCHY_CACHE_DIR = "hierarchy_cache"
+
+EMPLOYEE_TABLE = "HumanResources Employee"
+
+# Path of the root, given to the employee with a null OrganizationNode
+ROOT_NODE = "/"
+
+# hierarchyid paths: / or steps like 3/ or 1.2/ (inserted between siblings)
+NODE_PATTERN = r"/(?:-?\d+(?:\.-?\d+)*/)*"
+
+# =============================================================================
+# Paths
+# =============================================================================
+
+def node_paths(employees):
+    """OrganizationNode of every employee as a path string, with the null row as the root"""
+    roots = employees["OrganizationNode"].isna()
+    if roots.sum() > 1:
+        raise ValueError(f"{int(roots.sum())} employees have a null OrganizationNode, expected one root")
+    paths = employees["OrganizationNode"].astype(object).where(~roots, ROOT_NODE).astype(str).str.strip()
+    
+    invalid = ~paths.str.fullmatch(NODE_PATTERN)
+    if invalid.any():
+        raise ValueError(f"OrganizationNode is not a path like /1/3/2/ for {int(invalid.sum())} employees, "
+                         f"e.g. {paths[invalid].iloc[0]!r}")
+    duplicated = paths.duplicated(keep=False)
+    if duplicated.any():
+        raise ValueError(f"{int(duplicated.sum())} employees share an OrganizationNode, "
+                         f"e.g. {paths[duplicated].iloc[0]!r}")
+    return paths.reset_index(drop=True)
+
+def parent_positions(paths):
+    """Row of every path's parent, -1 for the root and for top nodes when there is no root row"""
+    parents = paths.str.replace(r"[^/]+/$", "", regex=True)
+    positions = pd.Index(paths).get_indexer(parents)
+    # The root's path has no last step to strip, so it would be its own parent
+    positions[(paths == ROOT_NODE).to_numpy()] = -1
+    
+    orphans = (positions == -1) & (paths != ROOT_NODE) & (parents != ROOT_NODE)
+    if orphans.any():
+        raise ValueError(f"{int(orphans.sum())} employees have no employee at their parent node, "
+                         f"e.g. {paths[orphans].iloc[0]!r}")
+    return positions
+
+def closure_rows(ids, parents, rows):
+    """(AncestorID, DescendantID, Distance) rows for the employees at the given positions
+
+    Every pass moves all walks one manager up at once, so the number of
+    passes is the depth of the deepest employee.
+    """
+    descendants = np.asarray(rows, dtype=np.int64)
+    current = descendants
+    distance = 0
+    
+    parts = []
+    while len(current):
+        parts.append(pd.DataFrame({
+            "AncestorID": ids[current],
+            "DescendantID": ids[descendants],
+            "Distance": distance
+        }))
+        current = parents[current]
+        alive = current >= 0
+        current, descendants = current[alive], descendants[alive]
+        distance += 1
+    
+    if not parts:
+        return pd.DataFrame({column: pd.Series(dtype=np.int64)
+                             for column in ("AncestorID", "DescendantID", "Distance")})
+    return pd.concat(parts, ignore_index=True)
+
+# =============================================================================
+# Closure State
+# =============================================================================
+
+def employee_nodes(employees):
+    """BusinessEntityID and path of every employee"""
+    return pd.DataFrame({
+        "BusinessEntityID": employees["BusinessEntityID"].to_numpy(dtype=np.int64),
+        "OrganizationNode": node_paths(employees).to_numpy(dtype=object)
+    })
+
+def build_closure(employees):
+    """Closure state of all employees"""
+    nodes = employee_nodes(employees)
+    ids = nodes["BusinessEntityID"].to_numpy()
+    parents = parent_positions(nodes["OrganizationNode"])
+    return {"nodes": nodes, "closure": closure_rows(ids, parents, np.arange(len(nodes)))}
+
+def update_closure(state, employees):
+    """Bring the closure state in line with the current employees and return (state, rebuilt)
+
+    Employees whose path or ID changed, and everyone below a path that
+    was added, removed or given to someone else, get their rows
+    recomputed; the rest of the closure is kept. rebuilt counts the
+    employees recomputed.
+    """
+    nodes = employee_nodes(employees)
+    ids = nodes["BusinessEntityID"].to_numpy()
+    paths = nodes["OrganizationNode"]
+    parents = parent_positions(paths)
+    
+    # (ID, path) pairs on one side only mark the paths whose owner changed
+    old_pairs = pd.MultiIndex.from_frame(state["nodes"][["BusinessEntityID", "OrganizationNode"]])
+    new_pairs = pd.MultiIndex.from_frame(nodes[["BusinessEntityID", "OrganizationNode"]])
+    changed_paths = set(old_pairs.difference(new_pairs).get_level_values(1)) | \
+        set(new_pairs.difference(old_pairs).get_level_values(1))
+    
+    # Push the changed marks down one level per pass
+    affected = paths.isin(changed_paths).to_numpy()
+    has_parent = parents >= 0
+    while True:
+        inherited = affected.copy()
+        inherited[has_parent] |= affected[parents[has_parent]]
+        if (inherited == affected).all():
+            break
+        affected = inherited
+    
+    rows = np.flatnonzero(affected)
+    kept = state["closure"]
+    kept = kept[kept["DescendantID"].isin(ids[~affected])]
+    closure = pd.concat([kept, closure_rows(ids, parents, rows)], ignore_index=True)
+    return {"nodes": nodes, "closure": closure}, len(rows)
+
+# =============================================================================
+# Results
+# =============================================================================
+
+def hierarchy_table(state):
+    """Per employee: path, manager, depth, span of control and subordinates below them"""
+    closure = state["closure"]
+    nodes = state["nodes"].set_index("BusinessEntityID")
+    
+    direct = closure[closure["Distance"] == 1]
+    table = nodes.assign(
+        ManagerID=direct.set_index("DescendantID")["AncestorID"].reindex(nodes.index).astype("Int64"),
+        Depth=closure.groupby("DescendantID")["Distance"].max().reindex(nodes.index).astype(np.int64),
+        DirectReports=direct.groupby("AncestorID").size().reindex(nodes.index, fill_value=0),
+        Subordinates=(closure.groupby("AncestorID").size() - 1).reindex(nodes.index, fill_value=0)
+    )
+    return table.reset_index()
+
+def subtree_rollup(closure, employees, columns, agg="sum", include_self=True):
+    """Aggregate employee columns over every manager's subtree with a single join"""
+    if not include_self:
+        closure = closure[closure["Distance"] > 0]
+    values = employees[["BusinessEntityID"] + list(columns)]
+    joined = closure.merge(values, left_on="DescendantID", right_on="BusinessEntityID")
+    return joined.groupby("AncestorID")[list(columns)].agg(agg).rename_axis("BusinessEntityID").reset_index()
+
+# =============================================================================
+# Persistence
+# =============================================================================
+
+def save_closure(state, cache_dir):
+    """Store the employee paths and the closure table as parquet"""
+    os.makedirs(cache_dir, exist_ok=True)
+    state["nodes"].to_parquet(os.path.join(cache_dir, "employee_nodes.parquet"), index=False)
+    state["closure"].to_parquet(os.path.join(cache_dir, "employee_closure.parquet"), index=False)
+
+def load_closure(cache_dir):
+    """Load a state written by save_closure, or None when there is none"""
+    nodes_path = os.path.join(cache_dir, "employee_nodes.parquet")
+    closure_path = os.path.join(cache_dir, "employee_closure.parquet")
+    if not (os.path.exists(nodes_path) and os.path.exists(closure_path)):
+        return None
+    return {"nodes": pd.read_parquet(nodes_path), "closure": pd.read_parquet(closure_path)}
+
+def refresh_hierarchy(output_dir, columns=(), rebuild=False):
+    """Update the cached closure state of a run and return (state, employees)
+
+    columns are extra Employee columns loaded for rollups.
+    """
+    cache_dir = os.path.join(output_dir, HIERARCHY_CACHE_DIR)
+    employees = load_tables(output_dir, {
+        EMPLOYEE_TABLE: list(dict.fromkeys(["BusinessEntityID", "OrganizationNode"] + list(columns)))
+    })[EMPLOYEE_TABLE]
+    
+    state = None if rebuild else load_closure(cache_dir)
+    if state is None:
+        state = build_closure(employees)
+        print(f"Built the closure of {len(employees)} employees")
+    else:
+        state, rebuilt = update_closure(state, employees)
+        print(f"Recomputed the closure rows of {rebuilt} changed employees")
+    save_closure(state, cache_dir)
+    return state, employees
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Employee hierarchy closure table from a null handler run")
+    parser.add_argument("output_dir", help="directory the null handler wrote the cleaned tables to")
+    parser.add_argument("--rollup", nargs="+", default=[], metavar="COLUMN",
+                        help="Employee columns to sum over every manager's subtree, e.g. VacationHours")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the closure instead of updating it")
+    parser.add_argument("--export", metavar="PATH",
+                        help="write the per-employee hierarchy table to PATH (.csv or .parquet)")
+    args = parser.parse_args()
+    
+    try:
+        state, employees = refresh_hierarchy(args.output_dir, args.rollup, args.rebuild)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    table = hierarchy_table(state)
+    if args.rollup:
+        table = table.merge(subtree_rollup(state["closure"], employees, args.rollup), on="BusinessEntityID")
+    
+    print(f"{len(table)} employees, {len(state['closure'])} closure rows, max depth {table['Depth'].max()}")
+    print("\nEmployees per depth:")
+    print(table["Depth"].value_counts().sort_index().to_string())
+    print("\nLargest spans of control:")
+    print(table.nlargest(10, "DirectReports").to_string(index=False))
+    if args.export:
+        if args.export.lower().endswith(".parquet"):
+            table.to_parquet(args.export, index=False)
+        else:
+            table.to_csv(args.export, index=False)
+        print(f"Saved the hierarchy table to {args.export}")
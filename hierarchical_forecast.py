@@ -0,0 +1,199 @@
+# =============================================================================
+# Hierarchical Sales Forecasts
+# =============================================================================
+#
+# Forecasts monthly revenue for every SalesTerritory x ProductCategory
+# series, the dimensions SQLQueryfinal.sql reports revenue on, instead of
+# only the company-wide total of final_forecast.py. All series come from
+# one groupby over the cleaned order lines; the territory, category and
+# total levels are their sums. Every series is forecast across a worker
+# pool, the forecasts are reconciled so each level adds up to the one
+# above, and everything is written to one parquet file.
+#
+#   python hierarchical_forecast.py AdventureWorks_Clean_20250427120000 --workers 4
+
+import argparse
+import os
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cleaned_tables import load_tables
+
+FORECAST_TABLES = {
+    "Sales SalesOrderHeader": ["SalesOrderID", "OrderDate", "TerritoryID"],
+    "Sales SalesOrderDetail": ["SalesOrderID", "ProductID", "LineTotal"],
+    "Production Product": ["ProductID", "ProductSubcategoryID"],
+    "Production ProductSubcategory": ["ProductSubcategoryID", "ProductCategoryID"],
+    "Production ProductCategory": ["ProductCategoryID", "Name"],
+    "Sales SalesTerritory": ["TerritoryID", "Name"]
+}
+
+# Lines without a category or territory are kept so the series add up to the total
+UNCATEGORIZED = "Uncategorized"
+UNKNOWN_TERRITORY = "Unknown"
+ALL = "All"
+
+# Order final_forecast.py uses for the total
+FORECAST_ORDER = (2, 1, 0)
+# Series with fewer non-zero months fall back to a moving average
+MIN_ACTIVE_MONTHS = 12
+FALLBACK_WINDOW = 3
+
+# Series per worker task
+BATCH_SIZE = 16
+
+RECONCILIATION_METHODS = ("ols", "bottom_up")
+
+# =============================================================================
+# Series
+# =============================================================================
+
+def build_bottom_series(tables):
+    """Monthly LineTotal per (Territory, Category) as a months x series frame"""
+    orders = tables["Sales SalesOrderHeader"]
+    territories = tables["Sales SalesTerritory"].set_index("TerritoryID")["Name"]
+    categories = tables["Production ProductSubcategory"].merge(
+        tables["Production ProductCategory"], on="ProductCategoryID"
+    ).set_index("ProductSubcategoryID")["Name"]
+    product_category = tables["Production Product"].set_index("ProductID")["ProductSubcategoryID"].map(categories)
+    
+    lines = tables["Sales SalesOrderDetail"].merge(orders, on="SalesOrderID")
+    lines["Month"] = pd.to_datetime(lines["OrderDate"]).dt.to_period("M").dt.to_timestamp()
+    lines["Territory"] = lines["TerritoryID"].map(territories).fillna(UNKNOWN_TERRITORY).astype(str)
+    lines["Category"] = lines["ProductID"].map(product_category).fillna(UNCATEGORIZED).astype(str)
+    
+    bottom = lines.pivot_table(index="Month", columns=["Territory", "Category"], values="LineTotal",
+                               aggfunc="sum", fill_value=0.0)
+    return bottom.asfreq("MS", fill_value=0.0)
+
+def summing_matrix(bottom_columns):
+    """Rows: every series of the hierarchy; columns: the bottom series they sum"""
+    keys = list(bottom_columns)
+    territories = sorted({territory for territory, _ in keys})
+    categories = sorted({category for _, category in keys})
+    
+    rows = [("Total", ALL, ALL)]
+    rows += [("Territory", territory, ALL) for territory in territories]
+    rows += [("Category", ALL, category) for category in categories]
+    rows += [("Territory x Category", territory, category) for territory, category in keys]
+    
+    bottom_territories = np.array([territory for territory, _ in keys])
+    bottom_categories = np.array([category for _, category in keys])
+    matrix = np.vstack([
+        ((bottom_territories == territory) | (territory == ALL))
+        & ((bottom_categories == category) | (category == ALL))
+        for _, territory, category in rows
+    ]).astype(np.float64)
+    return pd.MultiIndex.from_tuples(rows, names=["Level", "Territory", "Category"]), matrix
+
+# =============================================================================
+# Forecasting
+# =============================================================================
+
+def forecast_series(values, horizon, order=FORECAST_ORDER):
+    """ARIMA forecast of one series, or the mean of its last months when too sparse to fit"""
+    fallback = np.full(horizon, values[-FALLBACK_WINDOW:].mean())
+    if np.count_nonzero(values) < MIN_ACTIVE_MONTHS:
+        return fallback, "moving_average"
+    from statsmodels.tsa.arima.model import ARIMA
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            fitted = ARIMA(values, order=order).fit()
+        return np.asarray(fitted.forecast(steps=horizon)), "arima"
+    except Exception:
+        return fallback, "moving_average"
+
+def forecast_batch(matrix, horizon, order=FORECAST_ORDER):
+    """Forecast every column of a months x series array"""
+    results = [forecast_series(matrix[:, column], horizon, order) for column in range(matrix.shape[1])]
+    return np.column_stack([values for values, _ in results]), [model for _, model in results]
+
+def base_forecasts(history, horizon, workers, order=FORECAST_ORDER):
+    """Forecast all series of a months x series array in batches across a process pool"""
+    batches = [history[:, start:start + BATCH_SIZE] for start in range(0, history.shape[1], BATCH_SIZE)]
+    if workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(forecast_batch, batches, [horizon] * len(batches), [order] * len(batches)))
+    else:
+        results = [forecast_batch(batch, horizon, order) for batch in batches]
+    forecasts = np.hstack([values for values, _ in results])
+    models = [model for _, batch_models in results for model in batch_models]
+    return forecasts, models
+
+def reconcile(forecasts, summing, method="ols"):
+    """Make the forecasts of every level add up, for all horizons at once
+
+    ols projects the base forecasts of all levels onto the coherent
+    subspace, S (S'S)^-1 S'; bottom_up sums the bottom forecasts.
+    """
+    bottom_count = summing.shape[1]
+    if method == "bottom_up":
+        return forecasts[:, -bottom_count:] @ summing.T
+    if method == "ols":
+        projection = summing @ np.linalg.solve(summing.T @ summing, summing.T)
+        return forecasts @ projection.T
+    raise ValueError(f"Unsupported reconciliation method: {method} "
+                     f"(supported: {', '.join(RECONCILIATION_METHODS)})")
+
+def hierarchical_forecast(tables, horizon=12, workers=None, method="ols", order=FORECAST_ORDER):
+    """Forecast and reconcile every level of the territory x category hierarchy
+
+    Returns a long frame with one row per series and month: Level,
+    Territory, Category, Date, BaseForecast, Forecast and Model.
+    """
+    bottom = build_bottom_series(tables)
+    series_index, summing = summing_matrix(bottom.columns)
+    history = bottom.to_numpy() @ summing.T
+    workers = workers or os.cpu_count() or 1
+    print(f"Forecasting {len(series_index)} series ({bottom.shape[1]} territory x category) "
+          f"over {len(bottom)} months on {workers} workers")
+    
+    forecasts, models = base_forecasts(history, horizon, workers, order)
+    reconciled = reconcile(forecasts, summing, method)
+    
+    dates = pd.date_range(bottom.index[-1] + pd.DateOffset(months=1), periods=horizon, freq="MS")
+    result = pd.DataFrame({
+        "Date": np.tile(dates, len(series_index)),
+        "BaseForecast": forecasts.T.ravel(),
+        "Forecast": reconciled.T.ravel(),
+        "Model": np.repeat(models, horizon)
+    })
+    levels = series_index.to_frame(index=False).loc[np.repeat(np.arange(len(series_index)), horizon)]
+    result = pd.concat([levels.reset_index(drop=True), result], axis=1)
+    for column in ("Level", "Territory", "Category", "Model"):
+        result[column] = result[column].astype("category")
+    return result
+
+if __name__ == "__main__":
+    from monthly_sales import FORECAST_CACHE_DIR, find_run_dir
+    
+    parser = argparse.ArgumentParser(description="Reconciled forecasts per SalesTerritory x ProductCategory")
+    parser.add_argument("run_dir", nargs="?", help="null handler output directory (default: newest run)")
+    parser.add_argument("--horizon", type=int, default=12, help="months to forecast")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--method", default="ols", choices=RECONCILIATION_METHODS)
+    parser.add_argument("--output", help="parquet file to write (default: <run>/forecast_cache/hierarchical_forecasts.parquet)")
+    args = parser.parse_args()
+    
+    try:
+        run_dir = args.run_dir or find_run_dir()
+        tables = load_tables(run_dir, FORECAST_TABLES)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    
+    result = hierarchical_forecast(tables, args.horizon, args.workers, args.method)
+    output_path = args.output or os.path.join(run_dir, FORECAST_CACHE_DIR, "hierarchical_forecasts.parquet")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    result.to_parquet(output_path, index=False)
+    
+    totals = result[result["Level"] != "Territory x Category"].pivot_table(
+        index=["Level", "Territory", "Category"], values="Forecast", aggfunc="sum", observed=True
+    )
+    print(totals.round(2).to_string())
+    print(f"Saved {len(result)} forecasts to {output_path}")
@@ -0,0 +1,140 @@
+# =============================================================================
+# Referential Integrity Check
+# =============================================================================
+#
+# Checks that the foreign keys of the cleaned tables resolve to their
+# parent tables. The null handler fills missing keys with the -1
+# sentinel (SalesPersonID, CreditCardID, CurrencyRateID,
+# ProductSubcategoryID, ProductModelID, ProductAssemblyID, TerritoryID);
+# sentinels and kept nulls are counted but not checked. Every other key
+# must exist in its parent, whose key index is hashed once and shared by
+# all the columns referencing it.
+#
+#   python integrity_check.py AdventureWorks_Clean_20250427120000
+
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cleaned_tables import load_tables
+
+# Keys the null handler writes in place of a missing reference
+SENTINEL_KEYS = [-1]
+
+# (child table, column) -> (parent table, key column)
+FOREIGN_KEYS = {
+    ("Sales SalesOrderDetail", "SalesOrderID"): ("Sales SalesOrderHeader", "SalesOrderID"),
+    ("Sales SalesOrderDetail", "ProductID"): ("Production Product", "ProductID"),
+    ("Sales SalesOrderHeader", "CustomerID"): ("Sales Customer", "CustomerID"),
+    ("Sales SalesOrderHeader", "SalesPersonID"): ("Sales SalesPerson", "BusinessEntityID"),
+    ("Sales SalesOrderHeader", "TerritoryID"): ("Sales SalesTerritory", "TerritoryID"),
+    ("Sales SalesOrderHeader", "CreditCardID"): ("Sales CreditCard", "CreditCardID"),
+    ("Sales SalesOrderHeader", "CurrencyRateID"): ("Sales CurrencyRate", "CurrencyRateID"),
+    ("Sales Customer", "TerritoryID"): ("Sales SalesTerritory", "TerritoryID"),
+    ("Sales Customer", "PersonID"): ("Person Person", "BusinessEntityID"),
+    ("Sales SalesPerson", "TerritoryID"): ("Sales SalesTerritory", "TerritoryID"),
+    ("Production Product", "ProductSubcategoryID"): ("Production ProductSubcategory", "ProductSubcategoryID"),
+    ("Production Product", "ProductModelID"): ("Production ProductModel", "ProductModelID"),
+    ("Production WorkOrder", "ProductID"): ("Production Product", "ProductID"),
+    ("Production ProductInventory", "ProductID"): ("Production Product", "ProductID"),
+    ("Production BillOfMaterials", "ProductAssemblyID"): ("Production Product", "ProductID"),
+    ("Production BillOfMaterials", "ComponentID"): ("Production Product", "ProductID")
+}
+
+# Orphan keys listed per column in the report
+ORPHAN_SAMPLE_SIZE = 5
+
+def integrity_tables(foreign_keys):
+    """Columns to read per table for a set of foreign keys"""
+    columns = {}
+    for (child, child_column), (parent, parent_column) in foreign_keys.items():
+        columns.setdefault(child, set()).add(child_column)
+        columns.setdefault(parent, set()).add(parent_column)
+    return {table_name: sorted(table_columns) for table_name, table_columns in columns.items()}
+
+def key_values(series):
+    """Key values as int64 when they are whole numbers, so 5.0 and 5 match"""
+    values = series.to_numpy()
+    if np.issubdtype(values.dtype, np.floating) and np.all(np.mod(values, 1) == 0):
+        return values.astype(np.int64)
+    return values
+
+def check_foreign_key(child_values, parent_index):
+    """Orphan row count and distinct orphan keys of a key column against a hashed parent index
+
+    Child keys are factorized first, so each distinct key is looked up
+    once however many rows repeat it.
+    """
+    codes, uniques = pd.factorize(child_values)
+    missing = parent_index.get_indexer(uniques) < 0
+    return int(missing[codes].sum()), uniques[missing]
+
+def validate_tables(tables, foreign_keys=None):
+    """Check every foreign key of the loaded tables and return one report row per key"""
+    foreign_keys = foreign_keys or FOREIGN_KEYS
+    parent_indexes = {}
+    report = []
+    for (child, child_column), (parent, parent_column) in foreign_keys.items():
+        row = {"table": child, "column": child_column, "parent": parent, "parent_column": parent_column}
+        if child not in tables or parent not in tables:
+            missing = child if child not in tables else parent
+            report.append(dict(row, status="skipped", note=f"{missing} not available"))
+            continue
+        
+        # One hashed index per parent key, shared by every child column
+        if (parent, parent_column) not in parent_indexes:
+            parent_indexes[parent, parent_column] = pd.Index(
+                pd.unique(key_values(tables[parent][parent_column].dropna()))
+            )
+        
+        column = tables[child][child_column]
+        nulls = column.isna().to_numpy()
+        sentinels = column.isin(SENTINEL_KEYS).to_numpy()
+        checked = column[~nulls & ~sentinels]
+        orphans, orphan_keys = check_foreign_key(key_values(checked), parent_indexes[parent, parent_column])
+        report.append(dict(
+            row,
+            status="orphans" if orphans else "ok",
+            rows=len(column),
+            null_rows=int(nulls.sum()),
+            sentinel_rows=int(sentinels.sum()),
+            checked_rows=len(checked),
+            orphan_rows=orphans,
+            orphan_keys=len(orphan_keys),
+            orphan_sample=", ".join(str(key) for key in orphan_keys[:ORPHAN_SAMPLE_SIZE]),
+            note=""
+        ))
+    report = pd.DataFrame(report)
+    # Skipped keys have no counts, which would otherwise turn the counts to float
+    counts = ["rows", "null_rows", "sentinel_rows", "checked_rows", "orphan_rows", "orphan_keys"]
+    return report.astype({column: "Int64" for column in counts if column in report})
+
+def validate_run(output_dir, source=None, foreign_keys=None):
+    """Load the tables of a null handler run and check their foreign keys"""
+    foreign_keys = foreign_keys or FOREIGN_KEYS
+    tables = load_tables(output_dir, integrity_tables(foreign_keys), source, missing_ok=True)
+    return validate_tables(tables, foreign_keys)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the foreign keys of a null handler run")
+    parser.add_argument("output_dir", help="directory the null handler wrote the cleaned tables to")
+    parser.add_argument("--source", help="workbook, table directory or database URL with the lookup tables "
+                                         "(default: the run's source)")
+    parser.add_argument("--output", metavar="PATH", help="write the report to PATH (.csv or .json)")
+    args = parser.parse_args()
+    
+    report = validate_run(args.output_dir, args.source)
+    columns = ["table", "column", "parent", "status", "checked_rows", "sentinel_rows", "orphan_rows",
+               "orphan_keys", "orphan_sample", "note"]
+    print(report.reindex(columns=columns).astype(object).fillna("").to_string(index=False))
+    if args.output:
+        if args.output.lower().endswith(".json"):
+            report.to_json(args.output, orient="records", indent=2)
+        else:
+            report.to_csv(args.output, index=False)
+        print(f"Integrity report saved to {args.output}")
+    
+    # Non-zero exit so a refresh pipeline can stop on orphaned keys
+    sys.exit(1 if (report["status"] == "orphans").any() else 0)
@@ -0,0 +1,104 @@
+# =============================================================================
+# Monthly Sales Series
+# =============================================================================
+#
+# Shared loader for the forecasting scripts in Machine Learning.zip. It
+# builds the monthly series they all use (Date index, MonthlySales as the
+# sum of TotalDue, OrderCount) straight from the cleaned SalesOrderHeader
+# and caches it as parquet next to the cleaned tables, rebuilt only when
+# the header file changes. The scripts replace their read_csv and
+# first_row block with:
+#
+#   from monthly_sales import monthly_sales
+#   df = monthly_sales()
+
+import json
+import os
+import sys
+
+import pandas as pd
+
+from cleaned_tables import REPO_DIR, load_tables, tables_fingerprint
+
+# Directory of the null handler run to read, overriding the search
+RUN_DIR_VARIABLE = "ADVENTUREWORKS_CLEAN_DIR"
+
+FORECAST_CACHE_DIR = "forecast_cache"
+SALES_TABLE = "Sales SalesOrderHeader"
+
+# Series built in this process, by cache key
+SERIES_MEMORY = {}
+
+def find_run_dir(search_dirs=None):
+    """The run named by ADVENTUREWORKS_CLEAN_DIR, else the newest AdventureWorks_Clean_* run"""
+    if os.environ.get(RUN_DIR_VARIABLE):
+        return os.environ[RUN_DIR_VARIABLE]
+    
+    runs = []
+    for search_dir in search_dirs or [os.getcwd(), REPO_DIR]:
+        if os.path.isdir(search_dir):
+            runs.extend(os.path.join(search_dir, name) for name in os.listdir(search_dir)
+                        if name.startswith("AdventureWorks_Clean_"))
+    if not runs:
+        raise FileNotFoundError(f"No AdventureWorks_Clean_* run found; set {RUN_DIR_VARIABLE} "
+                                "to the null handler's output directory")
+    # Run names end in a timestamp, so the newest sorts last
+    return max(runs, key=os.path.basename)
+
+def build_monthly_sales(orders):
+    """Sum TotalDue and count orders per calendar month, with empty months as zero"""
+    order_month = pd.to_datetime(orders["OrderDate"]).dt.to_period("M").dt.to_timestamp()
+    series = orders.groupby(order_month).agg(
+        MonthlySales=("TotalDue", "sum"),
+        OrderCount=("SalesOrderID", "count")
+    )
+    series = series.asfreq("MS", fill_value=0)
+    series.index.name = "Date"
+    return series
+
+def monthly_sales(run_dir=None, refresh=False):
+    """Monthly series of a null handler run, read from its cache when the header has not changed"""
+    run_dir = run_dir or find_run_dir()
+    key = tables_fingerprint(run_dir, [SALES_TABLE])
+    if not refresh and key in SERIES_MEMORY:
+        return SERIES_MEMORY[key].copy()
+    
+    cache_dir = os.path.join(run_dir, FORECAST_CACHE_DIR)
+    series_path = os.path.join(cache_dir, "monthly_sales.parquet")
+    key_path = os.path.join(cache_dir, "monthly_sales.json")
+    series = None
+    if not refresh and os.path.exists(key_path):
+        with open(key_path) as handle:
+            if json.load(handle).get("key") == key and os.path.exists(series_path):
+                series = pd.read_parquet(series_path)
+                series.index.freq = "MS"
+    
+    if series is None:
+        orders = load_tables(run_dir, {SALES_TABLE: ["SalesOrderID", "OrderDate", "TotalDue"]})[SALES_TABLE]
+        series = build_monthly_sales(orders)
+        os.makedirs(cache_dir, exist_ok=True)
+        series.to_parquet(series_path)
+        with open(key_path, "w") as handle:
+            json.dump({"key": key, "months": len(series)}, handle, indent=2)
+    
+    SERIES_MEMORY[key] = series
+    return series.copy()
+
+def read_monthly_sales_csv(csv_path):
+    """Read the legacy headerless monthly_sales.csv export into the same shape
+
+    The scripts read it with header=None and then prepended a hard-coded
+    copy of the first row, which counted May 2011 twice.
+    """
+    series = pd.read_csv(csv_path, header=None, names=["Date", "MonthlySales", "OrderCount"],
+                         encoding="utf-8-sig", parse_dates=["Date"], index_col="Date")
+    return series.asfreq("MS", fill_value=0)
+
+if __name__ == "__main__":
+    run_dir = sys.argv[1] if len(sys.argv) > 1 else None
+    try:
+        series = monthly_sales(run_dir, refresh="--refresh" in sys.argv)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    print(series.to_string())
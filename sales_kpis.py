@@ -0,0 +1,210 @@
+# =============================================================================
+# Sales KPIs
+# =============================================================================
+#
+# Computes the analyses of SQLQueryfinal.sql from the cleaned tables of a
+# null handler run: revenue by month, year, category, subcategory and
+# territory, orders per month and year, and purchase frequency per
+# customer, customer type and territory. The joins are built once and
+# shared by every KPI, and the results are cached next to the cleaned
+# tables so dashboards and forecast scripts read them instead of
+# querying again.
+#
+#   python sales_kpis.py AdventureWorks_Clean_20250427120000
+
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+from cleaned_tables import load_tables, tables_fingerprint
+
+# Columns each KPI input is read with
+KPI_TABLES = {
+    "Sales SalesOrderHeader": ["SalesOrderID", "OrderDate", "CustomerID", "TerritoryID", "TotalDue"],
+    "Sales SalesOrderDetail": ["SalesOrderID", "ProductID", "OrderQty", "LineTotal"],
+    "Sales Customer": ["CustomerID", "StoreID"],
+    "Production Product": ["ProductID", "Name", "ProductSubcategoryID"],
+    "Production ProductSubcategory": ["ProductSubcategoryID", "ProductCategoryID", "Name"],
+    "Production ProductCategory": ["ProductCategoryID", "Name"],
+    "Sales SalesTerritory": ["TerritoryID", "Name"]
+}
+
+KPI_CACHE_DIR = "kpi_cache"
+KPI_CACHE_KEY = "cache_key.json"
+# Bump when a KPI definition changes so older caches are recomputed
+KPI_VERSION = 2
+
+# Results computed in this process, by cache key
+KPI_MEMORY = {}
+
+# =============================================================================
+# Shared Joins
+# =============================================================================
+
+def build_frames(tables):
+    """Build the order and order-line frames every KPI groups over"""
+    orders = tables["Sales SalesOrderHeader"].copy()
+    orders["OrderDate"] = pd.to_datetime(orders["OrderDate"])
+    orders["OrderYear"] = orders["OrderDate"].dt.year
+    orders["OrderMonth"] = orders["OrderDate"].dt.month
+    
+    territories = tables["Sales SalesTerritory"].set_index("TerritoryID")["Name"]
+    orders["Territory"] = orders["TerritoryID"].map(territories)
+    
+    # Product -> subcategory -> category; inner joins like the SQL, so
+    # products without a subcategory (-1 after cleaning) drop out
+    subcategories = tables["Production ProductSubcategory"].merge(
+        tables["Production ProductCategory"].rename(columns={"Name": "Category"}),
+        on="ProductCategoryID"
+    ).rename(columns={"Name": "Subcategory"})
+    products = tables["Production Product"].merge(subcategories, on="ProductSubcategoryID")
+    
+    lines = tables["Sales SalesOrderDetail"].merge(
+        orders[["SalesOrderID", "TotalDue"]], on="SalesOrderID"
+    ).merge(products[["ProductID", "Subcategory", "Category"]], on="ProductID")
+    
+    # CustomerType as the SQL defines it: Individual when StoreID is null,
+    # not the three-way CustomerType column the null handler derives
+    customers = tables["Sales Customer"].set_index("CustomerID")["StoreID"].isna().map(
+        {True: "Individual", False: "Store"}
+    )
+    return orders, lines, customers
+
+# =============================================================================
+# KPIs
+# =============================================================================
+
+def compute_kpis(tables):
+    """Compute every KPI from the loaded tables as {name: DataFrame}"""
+    orders, lines, customers = build_frames(tables)
+    kpis = {}
+    
+    # One groupby feeds the monthly and yearly revenue and order counts
+    monthly = orders.groupby(["OrderYear", "OrderMonth"]).agg(
+        MonthlyRevenue=("TotalDue", "sum"),
+        TotalOrders=("SalesOrderID", "count")
+    ).reset_index()
+    kpis["monthly_revenue"] = monthly
+    kpis["yearly_revenue"] = monthly.groupby("OrderYear").agg(
+        YearlyRevenue=("MonthlyRevenue", "sum"),
+        TotalOrders=("TotalOrders", "sum"),
+        Months=("OrderMonth", "count")
+    ).reset_index().sort_values("YearlyRevenue", ascending=False, ignore_index=True)
+    
+    # TotalRevenue sums the header TotalDue once per order line, as the
+    # SQL joins do; LineRevenue is the sum of the lines themselves
+    for level in ("Category", "Subcategory"):
+        kpis[f"{level.lower()}_revenue"] = lines.groupby(level).agg(
+            TotalRevenue=("TotalDue", "sum"),
+            LineRevenue=("LineTotal", "sum"),
+            UnitsSold=("OrderQty", "sum")
+        ).reset_index().sort_values("TotalRevenue", ascending=False, ignore_index=True)
+    category = kpis["category_revenue"]
+    kpis["underperforming_categories"] = category[
+        category["TotalRevenue"] < category["TotalRevenue"].mean() * 0.5
+    ].sort_values("TotalRevenue", ignore_index=True)
+    
+    kpis["territory_revenue"] = orders.groupby("Territory").agg(
+        TotalRevenue=("TotalDue", "sum"),
+        TotalOrders=("SalesOrderID", "count")
+    ).reset_index().sort_values("TotalRevenue", ascending=False, ignore_index=True)
+    
+    # Orders per customer, shared by the frequency KPIs
+    customer_orders = orders.groupby("CustomerID").size().rename("OrderCount").reset_index()
+    customer_orders["CustomerType"] = customer_orders["CustomerID"].map(customers)
+    kpis["customer_type_frequency"] = customer_orders.groupby("CustomerType").agg(
+        TotalCustomers=("CustomerID", "count"),
+        AvgOrdersPerCustomer=("OrderCount", "mean")
+    ).reset_index()
+    
+    territory_orders = orders.groupby(["Territory", "CustomerID"]).size().rename("OrderCount").reset_index()
+    kpis["territory_frequency"] = territory_orders.groupby("Territory").agg(
+        TotalCustomers=("CustomerID", "count"),
+        AvgOrdersPerCustomer=("OrderCount", "mean")
+    ).reset_index().sort_values("AvgOrdersPerCustomer", ascending=False, ignore_index=True)
+    
+    kpis["summary"] = pd.DataFrame([{
+        "TotalRevenue": orders["TotalDue"].sum(),
+        "TotalOrders": len(orders),
+        "TotalCustomers": len(customer_orders),
+        "AvgOrdersPerCustomer": customer_orders["OrderCount"].mean(),
+        "AvgOrdersPerMonth": monthly["TotalOrders"].mean(),
+        "AvgOrdersPerYear": kpis["yearly_revenue"]["TotalOrders"].mean()
+    }])
+    return kpis
+
+# =============================================================================
+# Caching
+# =============================================================================
+
+def read_kpi_cache(cache_dir, key):
+    """Load cached KPIs when they were computed from the same inputs, else None"""
+    key_path = os.path.join(cache_dir, KPI_CACHE_KEY)
+    if not os.path.exists(key_path):
+        return None
+    with open(key_path) as handle:
+        cached = json.load(handle)
+    if cached.get("key") != key:
+        return None
+    try:
+        return {name: pd.read_parquet(os.path.join(cache_dir, f"{name}.parquet"))
+                for name in cached["kpis"]}
+    except OSError:
+        return None
+
+def write_kpi_cache(cache_dir, key, kpis):
+    """Store the KPIs as one parquet file each, with the key written last"""
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, df in kpis.items():
+        df.to_parquet(os.path.join(cache_dir, f"{name}.parquet"), index=False)
+    with open(os.path.join(cache_dir, KPI_CACHE_KEY), "w") as handle:
+        json.dump({"key": key, "kpis": list(kpis)}, handle, indent=2)
+
+def sales_kpis(output_dir, source=None, refresh=False):
+    """Return the KPIs of a null handler run, computing them only when its tables changed
+
+    source overrides where the lookup tables are read from; by default
+    it is the source recorded in the run's manifest. refresh ignores
+    the caches.
+    """
+    key = f"{KPI_VERSION}:{tables_fingerprint(output_dir, KPI_TABLES, source)}"
+    cache_dir = os.path.join(output_dir, KPI_CACHE_DIR)
+    
+    if not refresh:
+        if key in KPI_MEMORY:
+            return KPI_MEMORY[key]
+        kpis = read_kpi_cache(cache_dir, key)
+        if kpis is not None:
+            KPI_MEMORY[key] = kpis
+            return kpis
+    
+    kpis = compute_kpis(load_tables(output_dir, KPI_TABLES, source))
+    write_kpi_cache(cache_dir, key, kpis)
+    KPI_MEMORY[key] = kpis
+    return kpis
+
+def print_kpis(kpis):
+    """Print every KPI table"""
+    for name, df in kpis.items():
+        print(f"\n{'='*50}")
+        print(name.replace("_", " ").title())
+        print(f"{'='*50}")
+        print(df.to_string(index=False))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute the SQLQueryfinal.sql KPIs from a null handler run")
+    parser.add_argument("output_dir", help="directory the null handler wrote the cleaned tables to")
+    parser.add_argument("--source", help="workbook, table directory or database URL with the lookup tables "
+                                         "(default: the run's source)")
+    parser.add_argument("--refresh", action="store_true", help="recompute even when the cache is current")
+    args = parser.parse_args()
+    
+    try:
+        kpis = sales_kpis(args.output_dir, args.source, args.refresh)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    print_kpis(kpis)
@@ -0,0 +1,301 @@
+# =============================================================================
+# Star Schema Extract
+# =============================================================================
+#
+# Writes the cleaned tables of a null handler run as a star schema of
+# Parquet files for the Power BI and Tableau workbooks, so a refresh
+# scans pre-joined, narrow tables instead of joining the wide ones:
+#
+#   fact_sales_line      one row per SalesOrderDetail line
+#   fact_sales_monthly   lines rolled up by month, product, territory,
+#                        salesperson and CustomerType
+#   dim_date, dim_product, dim_customer, dim_territory, dim_salesperson
+#
+# Dimensions get dense integer surrogate keys starting at 1, in the
+# narrowest integer type that holds them. Key 0 is the Unknown member,
+# which the -1 fills of the null handler (orders without a salesperson,
+# products without a subcategory) and unmatched IDs point to. Dates are
+# keyed as yyyymmdd and months as yyyymm.
+#
+#   python star_schema.py AdventureWorks_Clean_20250427120000
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from cleaned_tables import load_null_handler, load_tables, tables_fingerprint
+
+STAR_DIR = "AdventureWorks_Star"
+STAR_KEY = "star_key.json"
+# Bump when a table definition changes so older extracts are rebuilt
+STAR_VERSION = 1
+
+# Columns each input is read with
+STAR_TABLES = {
+    "Sales SalesOrderHeader": ["SalesOrderID", "OrderDate", "CustomerID", "SalesPersonID", "TerritoryID",
+                               "OnlineOrderFlag"],
+    "Sales SalesOrderDetail": ["SalesOrderID", "SalesOrderDetailID", "ProductID", "OrderQty", "UnitPrice",
+                               "UnitPriceDiscount", "LineTotal"],
+    "Sales Customer": ["CustomerID", "PersonID", "StoreID", "TerritoryID", "AccountNumber", "CustomerType"],
+    "Production Product": ["ProductID", "Name", "ProductNumber", "Color", "Size", "ProductLine", "Class",
+                           "Style", "StandardCost", "ListPrice", "ProductSubcategoryID"],
+    "Production ProductSubcategory": ["ProductSubcategoryID", "ProductCategoryID", "Name"],
+    "Production ProductCategory": ["ProductCategoryID", "Name"],
+    "Sales SalesTerritory": ["TerritoryID", "Name", "CountryRegionCode", "Group"],
+    "Sales SalesPerson": ["BusinessEntityID", "TerritoryID", "SalesQuota"],
+    # Only used for names; the extract is built without them when missing
+    "Sales vSalesPerson": ["BusinessEntityID", "FirstName", "LastName", "JobTitle"],
+    "Sales vIndividualCustomer": ["BusinessEntityID", "FirstName", "LastName"],
+    "Sales vStoreWithAddresses": ["BusinessEntityID", "Name"]
+}
+NAME_TABLES = ["Sales vSalesPerson", "Sales vIndividualCustomer", "Sales vStoreWithAddresses"]
+
+# Label of the key 0 member of every dimension
+UNKNOWN_MEMBER = "Unknown"
+
+# =============================================================================
+# Keys
+# =============================================================================
+
+def key_dtype(size):
+    """Narrowest signed integer type for keys 0..size"""
+    for dtype in (np.int16, np.int32):
+        if size <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+def nullable_dtype(dtype):
+    """Nullable extension type of a NumPy integer type, e.g. uint8 -> UInt8"""
+    return pd.api.types.pandas_dtype(dtype.name.replace("uint", "UInt").replace("int", "Int"))
+
+def add_surrogate_key(dim, natural_key, key_name, unknown):
+    """Sort a dimension by its natural key, number it from 1 and prepend the Unknown row
+
+    unknown holds the column values of the key 0 row.
+    """
+    dim = dim.drop_duplicates(natural_key).sort_values(natural_key, ignore_index=True)
+    dtypes = dim.dtypes
+    dim = pd.concat([pd.DataFrame([unknown]), dim], ignore_index=True)[list(dtypes.index)]
+    # Integer columns the Unknown row leaves empty become nullable; the
+    # nullable ones already hold <NA> and only get their type back
+    for column, dtype in dtypes.items():
+        if pd.api.types.is_integer_dtype(dtype):
+            keep = column in unknown or pd.api.types.is_extension_array_dtype(dtype)
+            dim[column] = dim[column].astype(dtype if keep else nullable_dtype(dtype))
+    dim.insert(0, key_name, np.arange(len(dim), dtype=key_dtype(len(dim))))
+    return dim
+
+def lookup_keys(dim, natural_key, key_name, values):
+    """Surrogate key of every natural key value, 0 when it is not in the dimension"""
+    known = dim[dim[key_name] > 0]
+    positions = pd.Index(known[natural_key]).get_indexer(pd.Series(values))
+    keys = np.where(positions >= 0, known[key_name].to_numpy()[positions], 0)
+    return keys.astype(dim[key_name].dtype)
+
+def date_keys(dates):
+    """yyyymmdd integer key of every date"""
+    dates = pd.to_datetime(pd.Series(dates))
+    return (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).to_numpy(dtype=np.int32)
+
+# =============================================================================
+# Dimensions
+# =============================================================================
+
+def build_dim_date(order_dates):
+    """One row per calendar day between the first and last order"""
+    dates = pd.to_datetime(pd.Series(order_dates)).dt.normalize()
+    days = pd.Series(pd.date_range(dates.min(), dates.max(), freq="D"))
+    return pd.DataFrame({
+        "DateKey": date_keys(days),
+        "Date": days,
+        "Year": days.dt.year.astype(np.int16),
+        "Quarter": days.dt.quarter.astype(np.int8),
+        "Month": days.dt.month.astype(np.int8),
+        "MonthName": pd.Categorical(days.dt.month_name()),
+        "MonthKey": (days.dt.year * 100 + days.dt.month).astype(np.int32),
+        "Day": days.dt.day.astype(np.int8),
+        "DayOfWeek": pd.Categorical(days.dt.day_name())
+    })
+
+def build_dim_product(tables):
+    """Products with their subcategory and category, Uncategorized for the -1 fills"""
+    subcategories = tables["Production ProductSubcategory"].merge(
+        tables["Production ProductCategory"].rename(columns={"Name": "Category"}),
+        on="ProductCategoryID"
+    ).rename(columns={"Name": "Subcategory"})
+    products = tables["Production Product"].merge(
+        subcategories[["ProductSubcategoryID", "Subcategory", "Category"]],
+        on="ProductSubcategoryID", how="left"
+    ).drop(columns="ProductSubcategoryID")
+    products[["Subcategory", "Category"]] = products[["Subcategory", "Category"]].fillna("Uncategorized")
+    products = products.rename(columns={"Name": "Product"})
+    return add_surrogate_key(products, "ProductID", "ProductKey", {"ProductID": -1, "Product": UNKNOWN_MEMBER,
+                                                                   "Subcategory": UNKNOWN_MEMBER,
+                                                                   "Category": UNKNOWN_MEMBER})
+
+def full_names(first, last):
+    """First and last names joined, also when a compact run stored them as categoricals"""
+    return first.astype(object) + " " + last.astype(object)
+
+def build_dim_territory(tables):
+    """Sales territories"""
+    territories = tables["Sales SalesTerritory"].rename(columns={"Name": "Territory"})
+    return add_surrogate_key(territories, "TerritoryID", "TerritoryKey",
+                             {"TerritoryID": -1, "Territory": UNKNOWN_MEMBER, "Group": UNKNOWN_MEMBER})
+
+def build_dim_customer(tables):
+    """Customers with their CustomerType and, when the views are there, a display name"""
+    customers = tables["Sales Customer"].copy()
+    customers["CustomerType"] = customers["CustomerType"].astype(object)
+    
+    # Individuals are named after their person, stores after the store
+    name = pd.Series(pd.NA, index=customers.index, dtype=object)
+    if "Sales vIndividualCustomer" in tables:
+        people = tables["Sales vIndividualCustomer"].drop_duplicates("BusinessEntityID").set_index("BusinessEntityID")
+        name = name.fillna(customers["PersonID"].map(full_names(people["FirstName"], people["LastName"])))
+    if "Sales vStoreWithAddresses" in tables:
+        stores = tables["Sales vStoreWithAddresses"].drop_duplicates("BusinessEntityID").set_index("BusinessEntityID")
+        name = name.fillna(customers["StoreID"].map(stores["Name"]))
+    customers.insert(1, "CustomerName", name)
+    
+    customers = add_surrogate_key(customers, "CustomerID", "CustomerKey",
+                                  {"CustomerID": -1, "CustomerName": UNKNOWN_MEMBER, "CustomerType": UNKNOWN_MEMBER})
+    customers["CustomerType"] = customers["CustomerType"].astype("category")
+    return customers
+
+def build_dim_salesperson(tables, dim_territory):
+    """Salespeople with their territory and, when vSalesPerson is there, their name"""
+    salespeople = tables["Sales SalesPerson"].rename(columns={"BusinessEntityID": "SalesPersonID"})
+    if "Sales vSalesPerson" in tables:
+        names = tables["Sales vSalesPerson"].rename(columns={"BusinessEntityID": "SalesPersonID"})
+        salespeople = salespeople.merge(names.drop_duplicates("SalesPersonID"), on="SalesPersonID", how="left")
+        salespeople.insert(1, "SalesPerson", full_names(salespeople.pop("FirstName"), salespeople.pop("LastName")))
+    salespeople.insert(1, "TerritoryKey", lookup_keys(dim_territory, "TerritoryID", "TerritoryKey",
+                                                      salespeople.pop("TerritoryID")))
+    # Orders with the -1 fill of SalesPersonID were placed online, without a salesperson
+    return add_surrogate_key(salespeople, "SalesPersonID", "SalesPersonKey",
+                             {"SalesPersonID": -1, "SalesPerson": "No salesperson", "TerritoryKey": 0})
+
+# =============================================================================
+# Facts
+# =============================================================================
+
+def build_fact_sales_line(tables, dims):
+    """Order lines with the surrogate keys of their order's date, customer, territory and salesperson"""
+    orders = tables["Sales SalesOrderHeader"]
+    lines = tables["Sales SalesOrderDetail"].merge(orders, on="SalesOrderID")
+    return pd.DataFrame({
+        "SalesOrderID": pd.to_numeric(lines["SalesOrderID"], downcast="integer").to_numpy(),
+        "SalesOrderDetailID": pd.to_numeric(lines["SalesOrderDetailID"], downcast="integer").to_numpy(),
+        "DateKey": date_keys(lines["OrderDate"]),
+        "ProductKey": lookup_keys(dims["dim_product"], "ProductID", "ProductKey", lines["ProductID"]),
+        "CustomerKey": lookup_keys(dims["dim_customer"], "CustomerID", "CustomerKey", lines["CustomerID"]),
+        "TerritoryKey": lookup_keys(dims["dim_territory"], "TerritoryID", "TerritoryKey", lines["TerritoryID"]),
+        "SalesPersonKey": lookup_keys(dims["dim_salesperson"], "SalesPersonID", "SalesPersonKey",
+                                      lines["SalesPersonID"]),
+        "OnlineOrderFlag": lines["OnlineOrderFlag"].astype(bool).to_numpy(),
+        "OrderQty": pd.to_numeric(lines["OrderQty"], downcast="integer").to_numpy(),
+        "UnitPrice": lines["UnitPrice"].to_numpy(),
+        "UnitPriceDiscount": lines["UnitPriceDiscount"].to_numpy(),
+        "LineTotal": lines["LineTotal"].to_numpy()
+    })
+
+def build_fact_sales_monthly(fact, dim_customer):
+    """Lines rolled up by month, product, territory, salesperson and CustomerType"""
+    customer_types = dim_customer.set_index("CustomerKey")["CustomerType"]
+    monthly = fact.assign(
+        MonthKey=(fact["DateKey"] // 100).astype(np.int32),
+        CustomerType=pd.Categorical(customer_types.reindex(fact["CustomerKey"]).to_numpy()),
+        # The narrow OrderQty type would overflow when summed
+        OrderQty=fact["OrderQty"].astype(np.int64)
+    )
+    monthly = monthly.groupby(["MonthKey", "ProductKey", "TerritoryKey", "SalesPersonKey", "CustomerType"],
+                              observed=True, sort=True).agg(
+        Revenue=("LineTotal", "sum"),
+        UnitsSold=("OrderQty", "sum"),
+        Orders=("SalesOrderID", "nunique"),
+        Lines=("SalesOrderDetailID", "size")
+    ).reset_index()
+    for column in ("UnitsSold", "Orders", "Lines"):
+        monthly[column] = pd.to_numeric(monthly[column], downcast="integer")
+    return monthly
+
+def build_star_schema(tables):
+    """Build every dimension and fact table as {name: DataFrame}"""
+    missing = [name for name in STAR_TABLES if name not in tables and name not in NAME_TABLES]
+    if missing:
+        raise FileNotFoundError(f"Star schema inputs not found: {', '.join(missing)}")
+    
+    star = {
+        "dim_date": build_dim_date(tables["Sales SalesOrderHeader"]["OrderDate"]),
+        "dim_product": build_dim_product(tables),
+        "dim_territory": build_dim_territory(tables),
+        "dim_customer": build_dim_customer(tables)
+    }
+    star["dim_salesperson"] = build_dim_salesperson(tables, star["dim_territory"])
+    star["fact_sales_line"] = build_fact_sales_line(tables, star)
+    star["fact_sales_monthly"] = build_fact_sales_monthly(star["fact_sales_line"], star["dim_customer"])
+    return star
+
+# =============================================================================
+# Extract
+# =============================================================================
+
+def write_star_schema(star, star_dir, key):
+    """Write one Parquet file per table, with the key file written last"""
+    os.makedirs(star_dir, exist_ok=True)
+    for name, df in star.items():
+        df.to_parquet(os.path.join(star_dir, f"{name}.parquet"), index=False)
+    with open(os.path.join(star_dir, STAR_KEY), "w") as handle:
+        json.dump({"key": key, "tables": list(star)}, handle, indent=2)
+
+def star_schema(output_dir, source=None, refresh=False):
+    """Write the star schema of a run next to its cleaned tables and return its directory
+
+    The extract is only rebuilt when an input table changed since it was
+    written, or with refresh.
+    """
+    star_dir = os.path.join(output_dir, STAR_DIR)
+    key = f"{STAR_VERSION}:{tables_fingerprint(output_dir, STAR_TABLES, source)}"
+    key_path = os.path.join(star_dir, STAR_KEY)
+    
+    if not refresh and os.path.exists(key_path):
+        with open(key_path) as handle:
+            if json.load(handle).get("key") == key:
+                print(f"Star schema in {star_dir} is current")
+                return star_dir
+    
+    star = build_star_schema(load_tables(output_dir, STAR_TABLES, source, missing_ok=True))
+    write_star_schema(star, star_dir, key)
+    print(f"Star schema written to {star_dir}")
+    return star_dir
+
+def print_star_schema(star_dir):
+    """Rows and file size of every table of an extract"""
+    import pyarrow.parquet as pq
+    nh = load_null_handler()
+    with open(os.path.join(star_dir, STAR_KEY)) as handle:
+        names = json.load(handle)["tables"]
+    for name in names:
+        path = os.path.join(star_dir, f"{name}.parquet")
+        rows = pq.ParquetFile(path).metadata.num_rows
+        print(f"  {name}: {rows} rows, {nh.format_bytes(os.path.getsize(path))}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a star schema extract of a null handler run")
+    parser.add_argument("output_dir", help="directory the null handler wrote the cleaned tables to")
+    parser.add_argument("--source", help="workbook, table directory or database URL with the lookup tables "
+                                         "(default: the run's source)")
+    parser.add_argument("--refresh", action="store_true", help="rebuild even when the extract is current")
+    args = parser.parse_args()
+    
+    try:
+        star_dir = star_schema(args.output_dir, args.source, args.refresh)
+    except (FileNotFoundError, KeyError) as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    print_star_schema(star_dir)
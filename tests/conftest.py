@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# The scripts live at the repository root and in benchmarks/, not in a package
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "benchmarks")]
+
+@pytest.fixture(scope="session")
+def null_handler():
+    from cleaned_tables import load_null_handler
+    return load_null_handler()
+
+def synthetic_source(tmp_path_factory, name, output_format):
+    from synthetic_workbook import generate_workbook
+    path = str(tmp_path_factory.mktemp("source") / name)
+    generate_workbook(path, scale=0.02, output_format=output_format)
+    return path
+
+@pytest.fixture(scope="session")
+def workbook(tmp_path_factory):
+    """Small synthetic AdventureWorks workbook"""
+    return synthetic_source(tmp_path_factory, "synthetic.xlsx", "xlsx")
+
+@pytest.fixture(scope="session")
+def csv_source(tmp_path_factory):
+    """The same tables as a directory of csv files"""
+    return synthetic_source(tmp_path_factory, "synthetic_csv", "csv")
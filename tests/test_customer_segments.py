@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import customer_segments as cs
+
+def make_orders(customer_ids, first_order_id, start="2013-01-01"):
+    """One order per entry of customer_ids, a day apart, with spend tied in steps of 100"""
+    customer_ids = np.asarray(customer_ids)
+    return pd.DataFrame({
+        "SalesOrderID": np.arange(first_order_id, first_order_id + len(customer_ids)),
+        "CustomerID": customer_ids,
+        "OrderDate": pd.Timestamp(start) + pd.to_timedelta(np.arange(len(customer_ids)) % 30, unit="D"),
+        "TotalDue": (customer_ids % 3 + 1) * 100.0
+    })
+
+def tied_orders():
+    """200 customers, most with a single order, so Frequency ties across several quintiles"""
+    customers = np.arange(1, 201)
+    repeat = np.concatenate([customers[customers % 4 == 0], customers[customers % 10 == 0]])
+    return make_orders(np.concatenate([customers, repeat]), 1)
+
+def test_tied_values_share_a_score():
+    state = cs.build_rfm(tied_orders())
+    customers = state["customers"]
+    for measure, score in (("Frequency", "F"), ("Monetary", "M"), ("LastOrderDate", "R")):
+        assert customers.groupby(measure)[score].nunique().max() == 1
+
+def test_incremental_update_matches_rescore():
+    orders = tied_orders()
+    state = cs.build_rfm(orders)
+    
+    # New single-order customers tie with the existing ones; growth stays
+    # under RESCORE_GROWTH, so the batch is scored against the stored edges
+    batch = make_orders([201, 202, 203, 4, 8], orders["SalesOrderID"].max() + 1)
+    cs.update_rfm(state, batch)
+    assert state["scored_customers"] == 200
+    
+    rescored = cs.score_customers(state["customers"].copy(), state["edges"])
+    pd.testing.assert_frame_equal(state["customers"], rescored)
+    single = state["customers"][state["customers"]["Frequency"] == 1]
+    assert single["F"].nunique() == 1
@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+
+# Tables with all-null chunks, mixed-type and numeric-looking text columns
+STREAMED_TABLES = [
+    "Production WorkOrder",
+    "Production Product",
+    "Sales SalesOrderHeader",
+    "Sales Customer",
+    "HumanResources Employee",
+    "Person Address"
+]
+
+@pytest.mark.parametrize("output_format", ["parquet", "csv"])
+@pytest.mark.parametrize("source", ["workbook", "csv_source"])
+@pytest.mark.parametrize("table_name", STREAMED_TABLES)
+def test_streamed_output_matches_whole_table(request, null_handler, tmp_path, table_name, source, output_format):
+    source_path = request.getfixturevalue(source)
+    whole_path = str(tmp_path / f"whole.{output_format}")
+    streamed_path = str(tmp_path / f"streamed.{output_format}")
+    null_handler.clean_table(table_name, source_path, whole_path, output_format=output_format, report=False)
+    null_handler.stream_clean_table(source_path, table_name, streamed_path, output_format, chunk_rows=50)
+    
+    read = pd.read_parquet if output_format == "parquet" else pd.read_csv
+    whole, streamed = read(whole_path), read(streamed_path)
+    assert streamed.dtypes.to_dict() == whole.dtypes.to_dict()
+    pd.testing.assert_frame_equal(streamed, whole)